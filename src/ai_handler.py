@@ -12,6 +12,14 @@ Changes:
 - 支援多種回應風格
 - 動態調整語氣和主題
 - 整合新的說話模式模組
+- 快取改由快取登記中心建立並以位元組限制容量
+- 情感分析優先使用本地詞典評分，信心不足時才呼叫 AI 服務
+- 低溫度的 AI 請求回應保存在磁碟快取，重新啟動後不需重新請求
+- 文本清理改用共用的文本正規化模組，單次掃描完成
+- 句子檢查改用預先編譯的內容驗證器
+- 主題偵測與擷取改用共用的多關鍵詞自動機，一次掃描完成
+- 主題比對器保存在處理器上，說話模式的主題關鍵詞變更時才重建
+- 磁碟快取只保存解析成功的回應，鍵值包含提示詞與請求參數的版本
 """
 
 import logging
@@ -23,12 +31,17 @@ import hashlib
 import os
 import asyncio
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union
+from typing import Callable, Dict, List, Any, Optional, Set, TypeVar, Union
 import pytz
 import aiohttp
 from openai import AsyncOpenAI
-from cachetools import TTLCache
+from src.cache_manager import cache_registry
 from src.speaking_patterns import SpeakingPatterns
+from src.sentiment import LexiconSentimentAnalyzer
+from src.disk_cache import DiskCache, cache_key
+from src.text_processing import ADDRESS_REPLACEMENTS, TextNormalizer
+from src.content_validator import get_validator
+from src.keyword_matcher import KeywordMatcher
 
 # 導入性能監視器
 try:
@@ -50,6 +63,9 @@ except ImportError:
     performance_monitor = DummyPerformanceMonitor()
 
 # 輔助函數
+_sanitizer = TextNormalizer(collapse_punctuation=False)
+_content_normalizer = TextNormalizer(phrases=ADDRESS_REPLACEMENTS, max_emojis=2)
+
 def sanitize_text(text: str, max_length: int = 280) -> str:
     """清理文本
     
@@ -60,78 +76,8 @@ def sanitize_text(text: str, max_length: int = 280) -> str:
     Returns:
         str: 清理後的文本
     """
-    if not text:
-        return ""
-        
-    # 移除多餘的空白
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # 英文替換詞典
-    english_to_chinese = {
-        'hey': '嗨',
-        'hello': '你好',
-        'hi': '嗨',
-        'ok': '好的',
-        'yes': '是的',
-        'no': '不',
-        'good': '好',
-        'bad': '不好',
-        'game': '遊戲',
-        'play': '玩',
-        'love': '愛',
-        'like': '喜歡',
-        'bye': '再見',
-        'see': '看',
-        'you': '你',
-        'me': '我',
-        'my': '我的',
-        'your': '你的',
-        'so': '非常',
-        'very': '很',
-        'happy': '開心',
-        'sad': '難過',
-        'cute': '可愛',
-        'cool': '酷',
-        'nice': '好',
-        'wow': '哇',
-        'omg': '天啊',
-        'lol': '哈哈',
-        'great': '棒',
-        'thanks': '謝謝',
-        'thank': '謝謝',
-        'welcome': '歡迎',
-    }
-    
-    # 檢測並替換英文單詞
-    english_pattern = re.compile(r'\b[a-zA-Z]+\b')
-    english_words = english_pattern.findall(text)
-    
-    for word in english_words:
-        word_lower = word.lower()
-        if word_lower in english_to_chinese:
-            text = text.replace(word, english_to_chinese[word_lower])
-        else:
-            # 如果沒有對應翻譯，直接移除
-            text = text.replace(word, '')
-    
-    # 縮短過長的文本
-    if len(text) > max_length:
-        # 尋找適合截斷的位置
-        truncate_pos = text.rfind('.', 0, max_length)
-        if truncate_pos == -1:
-            truncate_pos = text.rfind('!', 0, max_length)
-        if truncate_pos == -1:
-            truncate_pos = text.rfind('?', 0, max_length)
-        if truncate_pos == -1:
-            truncate_pos = max_length
-            
-        text = text[:truncate_pos+1]
-    
-    # 確保以完整句子結尾
-    if not text.endswith(('.', '!', '?', '。', '！', '？')):
-        text = text + '。'
-        
-    return text
+    # 「～」不是有效的結尾，與原本的清理方式相同
+    return _sanitizer.normalize(text, max_length, valid_endings=('.', '!', '?', '。', '！', '？'))
 
 # 設定 token 使用量的 logger
 token_logger = logging.getLogger('token_usage')
@@ -179,7 +125,52 @@ if os.path.exists(token_log_path):
 # 快取設定
 PERSONALITY_CACHE_TTL = 3600  # 人設快取時間（1小時）
 SENTIMENT_CACHE_TTL = 300    # 情感分析快取時間（5分鐘）
-CACHE_MAXSIZE = 100         # 快取最大容量
+CACHE_MAX_BYTES = 1024 * 1024  # 快取預設容量（1MB）
+
+# 磁碟快取設定（保存低溫度請求的回應，重新啟動後仍可使用）
+AI_DISK_CACHE_ENABLED = os.getenv("AI_DISK_CACHE_ENABLED", "true").lower() == "true"
+AI_DISK_CACHE_PATH = os.getenv("AI_DISK_CACHE_PATH", "data/ai_cache.db")
+AI_DISK_CACHE_MAX_BYTES = int(os.getenv("AI_DISK_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))  # 預設 16MB
+AI_DISK_CACHE_TTL = int(os.getenv("AI_DISK_CACHE_TTL", str(30 * 24 * 3600)))  # 預設 30 天
+
+# 情感分析提示詞，{text} 代入要分析的文本；修改後磁碟快取會使用新的鍵值
+SENTIMENT_SYSTEM_PROMPT = "你是一個情感分析專家。請分析文本的情感，並以JSON格式返回正面、中性、負面各佔的百分比。"
+SENTIMENT_USER_PROMPT = "請分析這段文字的情感，並以JSON格式返回正面、中性、負面的百分比（三者加總應為100）：{text}"
+SENTIMENT_JSON_USER_PROMPT = "請分析以下文本的情感，以JSON格式返回正面、中性、負面情感各佔百分比：\n\n{text}"
+
+# 無法取得情感分析結果時的預設值
+NEUTRAL_SENTIMENT = {"positive": 33.33, "neutral": 33.33, "negative": 33.33}
+
+T = TypeVar("T")
+
+# 本地情感分析設定
+SENTIMENT_LOCAL_CONFIDENCE = float(os.getenv("SENTIMENT_LOCAL_CONFIDENCE", "0.5"))  # 本地結果的最低信心值
+SENTIMENT_REMOTE_FALLBACK = os.getenv("SENTIMENT_REMOTE_FALLBACK", "true").lower() == "true"  # 信心不足時是否改用 AI 分析
+
+# 主題比對的關鍵詞來源
+TOPIC_SOURCES = ("interest", "acg", "tech", "topic", "keyword", "speaking")
+
+# ACG 相關主題關鍵詞
+ACG_KEYWORDS = ["漫畫", "動畫", "遊戲", "輕小說", "同人", "聲優", "角色", "劇情"]
+
+# 科技相關主題：分類 -> 關鍵詞
+TECH_KEYWORDS = {
+    "iPhone": ["iPhone", "手機", "iOS"],
+    "AI": ["AI", "人工智慧", "智能"],
+    "Switch": ["Switch", "任天堂", "NS"],
+    "Quest": ["Quest", "VR", "虛擬實境"],
+    "Macbook": ["Macbook", "Mac", "蘋果"]
+}
+
+# 文章主題：主題 -> 關鍵詞
+TOPIC_KEYWORDS = {
+    '遊戲': ['遊戲', '玩', 'Switch', 'Steam', '手遊', '寶可夢'],
+    '動漫': ['動漫', '二次元', 'ACG', '漫畫', '角色'],
+    '科技': ['科技', '電腦', '程式', 'AI', '人工智慧', '虛擬'],
+    '心情': ['寂寞', '開心', '興奮', '好奇', '分享', '感動'],
+    '社交': ['聊天', '朋友', '大家', '一起', '分享'],
+    '夢想': ['夢想', '未來', '目標', '希望', '期待']
+}
 
 class AIError(Exception):
     """AI 相關錯誤"""
@@ -204,6 +195,9 @@ class AIHandler:
         self.model = os.getenv("OPENAI_MODEL", "gpt-4-turbo-preview")
         self.performance_monitor = performance_monitor
         self.speaking_patterns = None  # 將在 main.py 中設置
+        self._sentence_validator = None  # 第一次檢查句子時編譯
+        self._topic_keyword_matcher = None  # 第一次比對主題時建立
+        self._topic_keyword_source = None  # 建立比對器時的 (說話模式, 主題關鍵詞版本)
         
         # 輔助函數：清理環境變數值中的註釋
         def clean_env(env_name, default_value):
@@ -223,9 +217,12 @@ class AIHandler:
         self.request_count = request_count
         
         # 初始化快取
-        self._personality_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=PERSONALITY_CACHE_TTL)
-        self._sentiment_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=SENTIMENT_CACHE_TTL)
-        self._context_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=300)
+        self._personality_cache = cache_registry.create_ttl_cache("ai_personality", CACHE_MAX_BYTES, ttl=PERSONALITY_CACHE_TTL)
+        self._sentiment_cache = cache_registry.create_ttl_cache("ai_sentiment", CACHE_MAX_BYTES // 4, ttl=SENTIMENT_CACHE_TTL)
+        self._context_cache = cache_registry.create_ttl_cache("ai_context", CACHE_MAX_BYTES, ttl=300)
+        self._disk_cache = None
+        if AI_DISK_CACHE_ENABLED:
+            self._disk_cache = DiskCache(AI_DISK_CACHE_PATH, AI_DISK_CACHE_MAX_BYTES, AI_DISK_CACHE_TTL, name="ai_completions")
         
         # 設定關鍵詞和情感詞典
         self.keywords = {
@@ -269,6 +266,8 @@ class AIHandler:
                 "厭煩", "煩躁", "不爽", "不開心", "不好", "不行", "不可以"
             ]
         }
+        self.sentiment_analyzer = LexiconSentimentAnalyzer(self.sentiment_dict)
+        self.sentiment_stats = {"local": 0, "remote": 0}
 
     @track_performance("ai_handler_initialize")
     async def initialize(self):
@@ -290,6 +289,9 @@ class AIHandler:
         try:
             if hasattr(self, 'openai_client'):
                 await self.openai_client.close()
+            if self._disk_cache is not None:
+                self.logger.info(f"AI 磁碟快取統計：{self._disk_cache.get_stats()}")
+                await self._disk_cache.close()
             self.logger.info("AI 處理器已關閉")
         except Exception as e:
             self.logger.error(f"關閉 AI 處理器時發生錯誤：{str(e)}")
@@ -303,77 +305,14 @@ class AIHandler:
         Returns:
             bool: 是否為完整句子
         """
-        if not text:
-            self.logger.warning("文本為空")
-            return False
-            
-        # 定義表情符號
-        emojis = "🎨🎭🎬💕💖💫💭💡🙈✨😊🎮🎵❤️😓🌙🌃"
-        
-        # 移除結尾的表情符號以檢查標點
-        text_without_ending_emoji = text
-        while text_without_ending_emoji and text_without_ending_emoji[-1] in emojis:
-            text_without_ending_emoji = text_without_ending_emoji[:-1]
-            
-        # 檢查結尾標點
-        if not any(text_without_ending_emoji.endswith(p) for p in ["！", "。", "？", "～"]):
-            self.logger.warning(f"結尾標點不符合要求：{text_without_ending_emoji[-1] if text_without_ending_emoji else ''}")
-            return False
-            
-        # 檢查開頭詞
-        valid_starts = [
-            # 中文開頭詞
-            "欸", "啊", "咦", "哇", "唔", "呼",
-            "天啊", "不會吧", "我的天", "嘿嘿",
-            "大家好", "哇哦", "今天",
-            "好想", "好喜歡", "最近", "深夜",
-            # 日語開頭詞
-            "あれ", "ねえ", "えっと", "わあ",
-            "うーん", "あのね", "みなさん",
-            "今日", "最近", "こんにちは"
-        ]
-        
-        # 移除開頭的表情符號以檢查開頭詞
-        text_without_emoji = text
-        for emoji in emojis:
-            text_without_emoji = text_without_emoji.replace(emoji, '')
-            
-        if not any(text_without_emoji.strip().startswith(start) for start in valid_starts):
-            self.logger.warning(f"開頭詞不符合要求：{text[:5] if len(text) >= 5 else text}")
-            return False
-            
-        # 檢查表情符號數量
-        emoji_count = len([c for c in text if c in emojis])
-        if emoji_count < 1 or emoji_count > 3:  # 允許最多3個表情符號
-            self.logger.warning(f"表情符號數量不符合要求：{emoji_count}")
-            return False
-            
-        # 檢查字數（不包含表情符號）
-        text_length = len(text_without_emoji.strip())
-        if not (15 <= text_length <= 100):  # 放寬字數限制
-            self.logger.warning(f"字數不符合要求：{text_length}")
+        if self._sentence_validator is None:
+            patterns = self.speaking_patterns or SpeakingPatterns()
+            self._sentence_validator = get_validator(patterns.get_sentence_validation_criteria())
+        result = self._sentence_validator.validate(text)
+        if not result["valid"]:
+            self.logger.warning(result["message"])
             return False
             
-        # 檢查是否包含常見的不完整句子模式
-        incomplete_patterns = [
-            r'對我的$',
-            r'這麼$',
-            r'好想$',
-            r'不行$',
-            r'好棒$',
-            r'好可愛$',
-            r'好厲害$',
-            r'好喜歡$',
-            r'好期待$',
-            r'好興奮$'
-        ]
-        
-        text_for_pattern = text_without_emoji.rstrip("！。？～")
-        for pattern in incomplete_patterns:
-            if re.search(pattern, text_for_pattern):
-                self.logger.warning(f"檢測到不完整句子模式：{pattern}")
-                return False
-            
         self.logger.info("句子檢查通過")
         return True
 
@@ -573,6 +512,134 @@ class AIHandler:
             self.logger.error(f"獲取當前心情時發生錯誤：{str(e)}")
             raise AIError("獲取當前心情失敗")
 
+    async def _cached_completion(self, kind: str, text: str, parse: Callable[[str], T],
+                                 system_prompt: str, user_prompt: str, **request) -> T:
+        """呼叫 AI 服務並將回應保存在磁碟快取，只用於低溫度、結果固定的請求
+        
+        只有 parse 成功的回應才會寫入快取，無法解析的回應下次會重新請求。
+        提示詞與請求參數的雜湊值加入快取鍵值，修改提示詞後不會沿用舊的回應。
+        
+        Args:
+            kind: 請求類型，與模型及文本組成快取鍵值
+            text: 請求分析的文本
+            parse: 解析回應的函數，無法解析時拋出 ValueError
+            system_prompt: 系統提示詞
+            user_prompt: 使用者提示詞模板，{text} 代入請求分析的文本
+            **request: chat.completions.create 的其餘參數
+            
+        Returns:
+            T: parse 解析後的結果
+            
+        Raises:
+            ValueError: 回應無法解析
+        """
+        key = None
+        if self._disk_cache is not None:
+            version = hashlib.blake2b(
+                json.dumps([system_prompt, user_prompt, request], ensure_ascii=False, sort_keys=True).encode("utf-8"),
+                digest_size=8
+            ).hexdigest()
+            key = cache_key(self.model, f"{kind}:{version}", text)
+            cached = await self._disk_cache.get(key)
+            if cached is not None:
+                return parse(cached)
+        
+        response = await self.openai_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt.format(text=text)}
+            ],
+            **request
+        )
+        content = response.choices[0].message.content
+        result = parse(content or "")
+        if key is not None:
+            await self._disk_cache.set(key, content)
+        return result
+
+    @staticmethod
+    def _parse_sentiment_reply(sentiment_text: str) -> Dict[str, float]:
+        """解析情感分析回應中的 JSON 或「正面/中性/負面」數字
+        
+        Args:
+            sentiment_text: AI 回應
+            
+        Returns:
+            Dict[str, float]: 情感分析結果（百分比）
+            
+        Raises:
+            ValueError: 回應中沒有 JSON 也沒有情感數字
+        """
+        # 嘗試從回應中提取JSON
+        sentiment_match = re.search(r'\{.*\}', sentiment_text)
+        if sentiment_match:
+            sentiment_json = json.loads(sentiment_match.group())
+            if not isinstance(sentiment_json, dict):
+                raise ValueError(f"情感分析結果不是 JSON 物件：{sentiment_text}")
+            try:
+                return {
+                    "positive": float(sentiment_json.get("positive", 0)),
+                    "neutral": float(sentiment_json.get("neutral", 0)),
+                    "negative": float(sentiment_json.get("negative", 0))
+                }
+            except TypeError as e:
+                raise ValueError(str(e))
+        
+        # 如果找不到JSON，嘗試從文本中提取數字
+        positive = float(re.search(r'正面.*?(\d+)', sentiment_text).group(1)) if re.search(r'正面.*?(\d+)', sentiment_text) else 0
+        neutral = float(re.search(r'中性.*?(\d+)', sentiment_text).group(1)) if re.search(r'中性.*?(\d+)', sentiment_text) else 0
+        negative = float(re.search(r'負面.*?(\d+)', sentiment_text).group(1)) if re.search(r'負面.*?(\d+)', sentiment_text) else 0
+        
+        total = positive + neutral + negative
+        if total == 0:
+            raise ValueError(f"回應中沒有情感分數：{sentiment_text}")
+        return {
+            "positive": (positive / total) * 100,
+            "neutral": (neutral / total) * 100,
+            "negative": (negative / total) * 100
+        }
+
+    @staticmethod
+    def _parse_sentiment_json(content: str) -> Dict[str, float]:
+        """解析 JSON 格式的情感分析回應
+        
+        Args:
+            content: AI 回應
+            
+        Returns:
+            Dict[str, float]: 情感分析結果
+            
+        Raises:
+            ValueError: 回應不是 JSON 物件
+        """
+        sentiment = json.loads(content)
+        if not isinstance(sentiment, dict):
+            raise ValueError(f"情感分析結果不是 JSON 物件：{content}")
+        # 確保結果為固定格式
+        return {
+            "positive": sentiment.get("正面", 0) if isinstance(sentiment.get("正面", 0), (int, float)) else 0,
+            "neutral": sentiment.get("中性", 0) if isinstance(sentiment.get("中性", 0), (int, float)) else 0,
+            "negative": sentiment.get("負面", 0) if isinstance(sentiment.get("負面", 0), (int, float)) else 0,
+        }
+
+    def _local_sentiment(self, text: str) -> Optional[Dict[str, float]]:
+        """以本地詞典分析情感，信心不足時返回 None 表示需要改用 AI 分析
+        
+        Args:
+            text: 要分析的文本
+            
+        Returns:
+            Optional[Dict[str, float]]: 情感分析結果（百分比）
+        """
+        scores, confidence = self.sentiment_analyzer.analyze(text)
+        if confidence < SENTIMENT_LOCAL_CONFIDENCE and SENTIMENT_REMOTE_FALLBACK:
+            self.sentiment_stats["remote"] += 1
+            self.logger.debug(f"本地情感分析信心不足（{confidence}），改用 AI 分析")
+            return None
+        self.sentiment_stats["local"] += 1
+        return scores
+
     async def _analyze_sentiment(self, text: str) -> Dict[str, float]:
         """分析文本的情感，將情感分為正面、中性、負面三種
         
@@ -589,56 +656,33 @@ class AIHandler:
         # 檢查快取
         if cache_key in self._sentiment_cache:
             return self._sentiment_cache[cache_key]
+        
+        local_scores = self._local_sentiment(text)
+        if local_scores is not None:
+            self._sentiment_cache[cache_key] = local_scores
+            return local_scores
             
         try:
-            response = await self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一個情感分析專家。請分析文本的情感，並以JSON格式返回正面、中性、負面各佔的百分比。"},
-                    {"role": "user", "content": f"請分析這段文字的情感，並以JSON格式返回正面、中性、負面的百分比（三者加總應為100）：{text}"}
-                ],
+            sentiment_scores = await self._cached_completion(
+                "sentiment",
+                text,
+                self._parse_sentiment_reply,
+                SENTIMENT_SYSTEM_PROMPT,
+                SENTIMENT_USER_PROMPT,
                 temperature=0.3,
                 max_tokens=100
             )
-            
-            # 解析回應
-            sentiment_text = response.choices[0].message.content
-            try:
-                # 嘗試從回應中提取JSON
-                sentiment_match = re.search(r'\{.*\}', sentiment_text)
-                if sentiment_match:
-                    sentiment_json = json.loads(sentiment_match.group())
-                    sentiment_scores = {
-                        "positive": float(sentiment_json.get("positive", 0)),
-                        "neutral": float(sentiment_json.get("neutral", 0)),
-                        "negative": float(sentiment_json.get("negative", 0))
-                    }
-                else:
-                    # 如果找不到JSON，嘗試從文本中提取數字
-                    positive = float(re.search(r'正面.*?(\d+)', sentiment_text).group(1)) if re.search(r'正面.*?(\d+)', sentiment_text) else 0
-                    neutral = float(re.search(r'中性.*?(\d+)', sentiment_text).group(1)) if re.search(r'中性.*?(\d+)', sentiment_text) else 0
-                    negative = float(re.search(r'負面.*?(\d+)', sentiment_text).group(1)) if re.search(r'負面.*?(\d+)', sentiment_text) else 0
-                    
-                    total = positive + neutral + negative
-                    if total == 0:
-                        sentiment_scores = {"positive": 33.33, "neutral": 33.33, "negative": 33.33}
-                    else:
-                        sentiment_scores = {
-                            "positive": (positive / total) * 100,
-                            "neutral": (neutral / total) * 100,
-                            "negative": (negative / total) * 100
-                        }
-            except Exception as e:
-                self.logger.error(f"解析情感分析結果時發生錯誤: {str(e)}")
-                sentiment_scores = {"positive": 33.33, "neutral": 33.33, "negative": 33.33}
-            
-            # 更新快取
-            self._sentiment_cache[cache_key] = sentiment_scores
-            return sentiment_scores
-            
+        except ValueError as e:
+            # 無法解析的回應不寫入磁碟快取，只在記憶體快取中保留預設值
+            self.logger.error(f"解析情感分析結果時發生錯誤: {str(e)}")
+            sentiment_scores = dict(NEUTRAL_SENTIMENT)
         except Exception as e:
             self.logger.error(f"情感分析失敗: {str(e)}")
-            return {"positive": 33.33, "neutral": 33.33, "negative": 33.33}
+            return dict(NEUTRAL_SENTIMENT)
+        
+        # 更新快取
+        self._sentiment_cache[cache_key] = sentiment_scores
+        return sentiment_scores
 
     def _validate_sentiment(self, current_sentiment: Dict[str, float], mood: str) -> bool:
         """驗證情感分析結果是否符合當前心情
@@ -701,6 +745,52 @@ class AIHandler:
             self.logger.error(f"添加互動記錄時發生錯誤：{str(e)}")
             raise
 
+    def _topic_matcher(self) -> KeywordMatcher:
+        """取得主題比對器，說話模式的主題關鍵詞有變更時才重建
+        
+        Returns:
+            KeywordMatcher: 分類為 (來源, 名稱) 的比對器
+        """
+        patterns = self.speaking_patterns
+        source = (patterns, patterns.topics_keywords_version if patterns is not None else None)
+        if self._topic_keyword_matcher is not None and self._topic_keyword_source == source:
+            return self._topic_keyword_matcher
+        
+        interests = []
+        if self.config and hasattr(self.config, 'CHARACTER_CONFIG'):
+            interests = self.config.CHARACTER_CONFIG["基本資料"]["興趣"]
+        
+        groups = {("interest", interest): [interest] for interest in interests}
+        groups.update({("acg", keyword): [keyword] for keyword in ACG_KEYWORDS})
+        groups.update({("tech", category): keywords for category, keywords in TECH_KEYWORDS.items()})
+        groups.update({("topic", topic): keywords for topic, keywords in TOPIC_KEYWORDS.items()})
+        groups.update({("keyword", category): keywords for category, keywords in self.keywords.items()})
+        if patterns is not None:
+            groups.update({
+                ("speaking", category): keywords
+                for category, keywords in patterns.topics_keywords.items()
+            })
+        # 角色興趣不區分英文大小寫
+        self._topic_keyword_matcher = KeywordMatcher(groups, [("interest", interest) for interest in interests])
+        self._topic_keyword_source = source
+        return self._topic_keyword_matcher
+
+    def match_topics(self, text: str) -> Dict[str, Set[str]]:
+        """一次掃描找出文本在各關鍵詞來源中比對到的主題
+        
+        Args:
+            text: 要分析的文本
+            
+        Returns:
+            Dict[str, Set[str]]: 來源 -> 主題，來源為 interest（角色興趣）、acg、tech、
+            topic（文章主題）、keyword（AI 關鍵詞）、speaking（說話模式主題）
+        """
+        hits = {source: set() for source in TOPIC_SOURCES}
+        if text:
+            for source, name in self._topic_matcher().match(text):
+                hits[source].add(name)
+        return hits
+
     async def _extract_topics(self, text: str) -> List[str]:
         """從文本中提取話題
         
@@ -713,36 +803,10 @@ class AIHandler:
         if not text:
             return []
         
-        topics = []
-        
-        # 安全地獲取興趣列表
-        interests = []
-        if self.config and hasattr(self.config, 'CHARACTER_CONFIG'):
-            interests = self.config.CHARACTER_CONFIG["基本資料"]["興趣"]
-        
-        # 檢查基本興趣相關主題
-        for interest in interests:
-            if interest.lower() in text.lower():
-                topics.append(interest)
-        
-        # 檢查 ACG 相關主題
-        acg_keywords = ["漫畫", "動畫", "遊戲", "輕小說", "同人", "聲優", "角色", "劇情"]
-        for keyword in acg_keywords:
-            if keyword in text:
-                topics.append(f"ACG-{keyword}")
-                
-        # 檢查科技相關主題
-        tech_keywords = {
-            "iPhone": ["iPhone", "手機", "iOS"],
-            "AI": ["AI", "人工智慧", "智能"],
-            "Switch": ["Switch", "任天堂", "NS"],
-            "Quest": ["Quest", "VR", "虛擬實境"],
-            "Macbook": ["Macbook", "Mac", "蘋果"]
-        }
-        
-        for category, keywords in tech_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                topics.append(f"科技-{category}")
+        hits = self.match_topics(text)
+        topics = list(hits["interest"])
+        topics.extend(f"ACG-{keyword}" for keyword in hits["acg"])
+        topics.extend(f"科技-{category}" for category in hits["tech"])
         
         return list(set(topics))  # 去除重複主題
 
@@ -925,24 +989,7 @@ class AIHandler:
         Returns:
             List[str]: 檢測到的主題列表
         """
-        detected_topics = []
-        
-        # 建立主題關鍵字對應表
-        topic_keywords = {
-            '遊戲': ['遊戲', '玩', 'Switch', 'Steam', '手遊', '寶可夢'],
-            '動漫': ['動漫', '二次元', 'ACG', '漫畫', '角色'],
-            '科技': ['科技', '電腦', '程式', 'AI', '人工智慧', '虛擬'],
-            '心情': ['寂寞', '開心', '興奮', '好奇', '分享', '感動'],
-            '社交': ['聊天', '朋友', '大家', '一起', '分享'],
-            '夢想': ['夢想', '未來', '目標', '希望', '期待']
-        }
-        
-        # 檢查每個主題的關鍵字
-        for topic, keywords in topic_keywords.items():
-            for keyword in keywords:
-                if keyword in content:
-                    detected_topics.append(topic)
-                    break
+        detected_topics = list(self.match_topics(content)["topic"])
                     
         # 如果沒有檢測到主題，返回預設主題
         if not detected_topics:
@@ -961,106 +1008,15 @@ class AIHandler:
         """
         if not content:
             return None
-            
-        # 移除多餘的空白
-        content = ' '.join(content.split())
-        
-        # 替換不當稱呼
-        content = content.replace('哥哥們', '大家')
-        content = content.replace('哥哥', '朋友')
-        content = content.replace('弟弟們', '大家')
-        content = content.replace('弟弟', '朋友')
-        
-        # 移除英文單字或短語
-        # 簡單的英文單字或短語的模式
-        english_pattern = re.compile(r'\b[a-zA-Z]+\b')
-        english_words = english_pattern.findall(content)
-        
-        # 英文替換詞
-        english_to_chinese = {
-            'hey': '嗨',
-            'hello': '你好',
-            'hi': '嗨',
-            'ok': '好的',
-            'yes': '是的',
-            'no': '不',
-            'good': '好',
-            'bad': '不好',
-            'game': '遊戲',
-            'play': '玩',
-            'love': '愛',
-            'like': '喜歡',
-            'bye': '再見',
-            'see': '看',
-            'you': '你',
-            'me': '我',
-            'my': '我的',
-            'your': '你的',
-            'so': '非常',
-            'very': '很',
-            'happy': '開心',
-            'sad': '難過',
-            'cute': '可愛',
-            'cool': '酷',
-            'nice': '好',
-            'wow': '哇',
-            'omg': '天啊',
-            'lol': '哈哈',
-            'great': '棒',
-            'thanks': '謝謝',
-            'thank': '謝謝',
-            'welcome': '歡迎',
-        }
-        
-        # 替換英文單字
-        for word in english_words:
-            word_lower = word.lower()
-            if word_lower in english_to_chinese:
-                content = content.replace(word, english_to_chinese[word_lower])
-            else:
-                # 如果沒有對應翻譯，直接移除
-                content = content.replace(word, '')
-        
-        # 移除多餘的標點符號
-        content = re.sub(r'[!！]{2,}', '！', content)
-        content = re.sub(r'[?？]{2,}', '？', content)
-        content = re.sub(r'[.。]{2,}', '。', content)
-        content = re.sub(r'[~～]{2,}', '～', content)
-        
-        # 移除多餘的表情符號
-        emoji_pattern = re.compile("["
-            u"\U0001F600-\U0001F64F"  # emoticons
-            u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-            u"\U0001F680-\U0001F6FF"  # transport & map symbols
-            u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-            u"\U00002702-\U000027B0"
-            u"\U000024C2-\U0001F251"
-            "]+", flags=re.UNICODE)
-        
-        # 限制表情符號數量
-        emoji_matches = emoji_pattern.finditer(content)
-        emoji_positions = [m.span() for m in emoji_matches]
-        if len(emoji_positions) > 2:  # 最多保留兩個表情符號
-            content = ''.join([
-                content[:emoji_positions[0][0]],  # 開頭到第一個表情符號
-                content[emoji_positions[0][0]:emoji_positions[0][1]],  # 第一個表情符號
-                content[emoji_positions[-1][0]:emoji_positions[-1][1]],  # 最後一個表情符號
-                content[emoji_positions[-1][1]:]  # 最後一個表情符號到結尾
-            ])
         
         # 確保內容長度適中
         max_length = 280  # 預設長度限制
         if self.config and hasattr(self.config, 'MAX_RESPONSE_LENGTH'):
             max_length = self.config.MAX_RESPONSE_LENGTH
         
-        if len(content) > max_length:
-            content = content[:max_length]
-        
-        # 確保結尾有適當的標點符號
-        if not any(content.endswith(p) for p in ['！', '？', '。', '～']):
-            content += '！'
-            
-        return content
+        # 替換稱呼與英文單字、整理標點與表情符號並截斷，結尾補上適當的標點符號
+        return _content_normalizer.normalize(content, max_length, ending='！',
+                                             valid_endings=('！', '？', '。', '～'))
 
     async def _generate_content(self, context: Dict[str, Any]) -> str:
         """生成內容
@@ -1200,36 +1156,28 @@ class AIHandler:
         Returns:
             Dict[str, float]: 情感分析結果
         """
+        local_scores = self._local_sentiment(text)
+        if local_scores is not None:
+            return local_scores
+        
         try:
-            response = await self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一個情感分析專家。請分析文本的情感，並以JSON格式返回正面、中性、負面各佔的百分比。"},
-                    {"role": "user", "content": f"請分析以下文本的情感，以JSON格式返回正面、中性、負面情感各佔百分比：\n\n{text}"}
-                ],
+            return await self._cached_completion(
+                "sentiment_json",
+                text,
+                self._parse_sentiment_json,
+                SENTIMENT_SYSTEM_PROMPT,
+                SENTIMENT_JSON_USER_PROMPT,
                 response_format={"type": "json_object"},
                 temperature=0.5,
                 max_tokens=150
             )
-            
-            content = response.choices[0].message.content
-            
-            # 解析JSON格式的回應
-            try:
-                sentiment = json.loads(content)
-                # 確保結果為固定格式
-                normalized = {
-                    "positive": sentiment.get("正面", 0) if isinstance(sentiment.get("正面", 0), (int, float)) else 0,
-                    "neutral": sentiment.get("中性", 0) if isinstance(sentiment.get("中性", 0), (int, float)) else 0,
-                    "negative": sentiment.get("負面", 0) if isinstance(sentiment.get("負面", 0), (int, float)) else 0,
-                }
-                return normalized
-            except json.JSONDecodeError:
-                self.logger.error(f"情感分析 JSON 解析失敗: {content}")
-                return {"positive": 33.33, "neutral": 33.33, "negative": 33.33}
+        except ValueError as e:
+            # json.JSONDecodeError 也是 ValueError
+            self.logger.error(f"情感分析 JSON 解析失敗: {str(e)}")
+            return dict(NEUTRAL_SENTIMENT)
         except Exception as e:
             self.logger.error(f"情感分析失敗: {str(e)}")
-            return {"positive": 33.33, "neutral": 33.33, "negative": 33.33}
+            return dict(NEUTRAL_SENTIMENT)
 
     async def _get_luna_personality(self, context: str = None) -> Dict[str, Any]:
         """獲取Luna的人設特徵，根據不同場景返回相應的性格特徵
@@ -0,0 +1,188 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 發文分析，以 MongoDB 聚合管線在伺服器端計算發文統計
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 每小時、每日發文數量，主題出現次數與內容長度統計
+- 只傳回聚合結果，不將文章內容讀回程式
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pytz
+
+from src.performance_monitor import performance_monitor
+
+# 統計的時區，與每日發文計數相同
+ANALYTICS_TIMEZONE = "Asia/Taipei"
+
+
+class PostAnalytics:
+    """發文分析
+
+    統計來源為 articles 集合（每篇發布的文章一筆），依 (persona, created_at)
+    索引篩選時間範圍，分組與計數都在資料庫中完成。
+    """
+
+    def __init__(self, db, persona_id: Optional[str] = None):
+        """初始化發文分析
+
+        Args:
+            db: 資料庫實例 (AsyncIOMotorDatabase)
+            persona_id: 人設 ID，為 None 時統計所有人設
+        """
+        self.db = db
+        self.persona_id = persona_id
+        self.logger = logging.getLogger(__name__)
+
+    def _match(self, days: int) -> Dict[str, Any]:
+        """建立時間範圍與人設的篩選條件
+
+        Args:
+            days: 統計最近幾天
+
+        Returns:
+            Dict[str, Any]: $match 條件
+        """
+        match = {"created_at": {"$gte": datetime.now(pytz.UTC) - timedelta(days=days)}}
+        if self.persona_id is not None:
+            # 舊資料沒有 persona 欄位，視為目前的人設
+            match["$or"] = [{"persona": self.persona_id}, {"persona": {"$exists": False}}]
+        return match
+
+    async def _aggregate(self, name: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """執行聚合管線並記錄操作
+
+        Args:
+            name: 統計名稱
+            pipeline: 聚合管線
+
+        Returns:
+            List[Dict[str, Any]]: 聚合結果
+        """
+        try:
+            results = await self.db.articles.aggregate(pipeline).to_list(length=None)
+            performance_monitor.record_db_operation("query", True, collection="articles",
+                                                   query=f"aggregate({name})")
+            return results
+        except Exception as e:
+            self.logger.error(f"發文分析 {name} 失敗：{str(e)}")
+            performance_monitor.record_db_operation("query", False, collection="articles",
+                                                   query=f"aggregate({name})")
+            raise
+
+    async def posts_per_hour(self, days: int = 30) -> Dict[int, int]:
+        """各小時（台北時間）的發文數量
+
+        Args:
+            days: 統計最近幾天
+
+        Returns:
+            Dict[int, int]: 小時 (0-23) -> 發文數量
+        """
+        results = await self._aggregate("posts_per_hour", [
+            {"$match": self._match(days)},
+            {"$group": {
+                "_id": {"$hour": {"date": "$created_at", "timezone": ANALYTICS_TIMEZONE}},
+                "count": {"$sum": 1}
+            }},
+            {"$sort": {"_id": 1}}
+        ])
+        return {doc["_id"]: doc["count"] for doc in results}
+
+    async def posts_per_day(self, days: int = 30) -> Dict[str, int]:
+        """每日（台北時間）的發文數量
+
+        Args:
+            days: 統計最近幾天
+
+        Returns:
+            Dict[str, int]: 日期 (YYYY-MM-DD) -> 發文數量
+        """
+        results = await self._aggregate("posts_per_day", [
+            {"$match": self._match(days)},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at", "timezone": ANALYTICS_TIMEZONE}},
+                "count": {"$sum": 1}
+            }},
+            {"$sort": {"_id": 1}}
+        ])
+        return {doc["_id"]: doc["count"] for doc in results}
+
+    async def topic_frequency(self, days: int = 30, limit: int = 20) -> List[Dict[str, Any]]:
+        """主題出現次數，依次數排序
+
+        Args:
+            days: 統計最近幾天
+            limit: 最多返回的主題數量
+
+        Returns:
+            List[Dict[str, Any]]: [{"topic": 主題, "count": 次數}, ...]
+        """
+        results = await self._aggregate("topic_frequency", [
+            {"$match": self._match(days)},
+            {"$project": {"_id": 0, "topics": 1}},
+            {"$unwind": "$topics"},
+            {"$sortByCount": "$topics"},
+            {"$limit": limit}
+        ])
+        return [{"topic": doc["_id"], "count": doc["count"]} for doc in results]
+
+    async def content_length(self, days: int = 30) -> Dict[str, Any]:
+        """內容長度統計（以字元計算）
+
+        Args:
+            days: 統計最近幾天
+
+        Returns:
+            Dict[str, Any]: 文章數量與平均、最短、最長字數
+        """
+        results = await self._aggregate("content_length", [
+            {"$match": {**self._match(days), "content": {"$type": "string"}}},
+            {"$project": {"_id": 0, "length": {"$strLenCP": "$content"}}},
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "avg": {"$avg": "$length"},
+                "min": {"$min": "$length"},
+                "max": {"$max": "$length"}
+            }}
+        ])
+        if not results:
+            return {"count": 0, "avg": 0, "min": 0, "max": 0}
+        return {
+            "count": results[0]["count"],
+            "avg": round(results[0]["avg"], 1),
+            "min": results[0]["min"],
+            "max": results[0]["max"]
+        }
+
+    async def summary(self, days: int = 30, topic_limit: int = 20) -> Dict[str, Any]:
+        """並行執行所有統計
+
+        Args:
+            days: 統計最近幾天
+            topic_limit: 最多返回的主題數量
+
+        Returns:
+            Dict[str, Any]: 各項統計結果
+        """
+        per_hour, per_day, topics, length = await asyncio.gather(
+            self.posts_per_hour(days),
+            self.posts_per_day(days),
+            self.topic_frequency(days, topic_limit),
+            self.content_length(days)
+        )
+        return {
+            "days": days,
+            "posts_per_hour": per_hour,
+            "posts_per_day": per_day,
+            "topics": topics,
+            "content_length": length
+        }
@@ -0,0 +1,216 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 快取管理模組，統一登記各模組的快取並以估算的位元組數限制容量
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 快取容量改以估算的物件大小（位元組）計算
+- 記錄各快取的命中、未命中與淘汰次數
+"""
+
+import logging
+import os
+import sys
+import threading
+from typing import Any, Dict
+
+from cachetools import LRUCache, TTLCache
+
+# 估算物件大小時最多遞迴的層數
+MAX_SIZE_DEPTH = 8
+
+
+def estimate_size(obj: Any, _depth: int = 0) -> int:
+    """估算物件佔用的記憶體位元組數（包含容器內的元素）
+
+    Args:
+        obj: 要估算的物件
+
+    Returns:
+        int: 估算的位元組數
+    """
+    size = sys.getsizeof(obj)
+    if _depth >= MAX_SIZE_DEPTH:
+        return size
+    if isinstance(obj, dict):
+        size += sum(
+            estimate_size(key, _depth + 1) + estimate_size(value, _depth + 1)
+            for key, value in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in obj)
+    return size
+
+
+class _ManagedCacheMixin:
+    """為 cachetools 快取加上統計
+
+    命中與未命中在 `in` 檢查時記錄（本專案的快取都以 `key in cache` 後取值的方式使用），
+    cachetools 內部的 `in` 檢查不計入。超出容量被移除的項目記為淘汰，
+    單一項目超過容量時不存入並記為拒絕。
+    """
+
+    def _init_stats(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+        self._internal = 0  # 大於 0 時表示正在執行 cachetools 內部操作
+
+    def __contains__(self, key) -> bool:
+        found = super().__contains__(key)
+        if not self._internal:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def __getitem__(self, key):
+        self._internal += 1
+        try:
+            return super().__getitem__(key)
+        finally:
+            self._internal -= 1
+
+    def __setitem__(self, key, value):
+        self._internal += 1
+        try:
+            super().__setitem__(key, value)
+        except ValueError:
+            # 單一項目大於快取容量
+            self.rejected += 1
+        finally:
+            self._internal -= 1
+
+    def pop(self, key, *args):
+        self._internal += 1
+        try:
+            return super().pop(key, *args)
+        finally:
+            self._internal -= 1
+
+    def popitem(self):
+        self._internal += 1
+        try:
+            item = super().popitem()
+        finally:
+            self._internal -= 1
+        self.evictions += 1
+        return item
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得快取統計"""
+        lookups = self.hits + self.misses
+        return {
+            "items": len(self),
+            "bytes": self.currsize,
+            "max_bytes": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rejected": self.rejected,
+            "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0
+        }
+
+
+class ManagedTTLCache(_ManagedCacheMixin, TTLCache):
+    """以位元組限制容量並記錄統計的 TTL 快取"""
+
+    def __init__(self, name: str, max_bytes: int, ttl: float):
+        TTLCache.__init__(self, maxsize=max_bytes, ttl=ttl, getsizeof=estimate_size)
+        self._init_stats(name)
+
+
+class ManagedLRUCache(_ManagedCacheMixin, LRUCache):
+    """以位元組限制容量並記錄統計的 LRU 快取"""
+
+    def __init__(self, name: str, max_bytes: int):
+        LRUCache.__init__(self, maxsize=max_bytes, getsizeof=estimate_size)
+        self._init_stats(name)
+
+
+class CacheRegistry:
+    """快取登記中心
+
+    各模組透過 create_ttl_cache / create_lru_cache 建立快取，容量可用
+    CACHE_MAX_BYTES_<名稱> 環境變數覆寫，統計由 PerformanceMonitor.summary() 輸出。
+    """
+
+    def __init__(self):
+        """初始化快取登記中心"""
+        self.logger = logging.getLogger(__name__)
+        self._caches: Dict[str, _ManagedCacheMixin] = {}
+        self._lock = threading.Lock()
+
+    def _max_bytes(self, name: str, default_bytes: int) -> int:
+        """取得快取容量設定
+
+        Args:
+            name: 快取名稱
+            default_bytes: 預設容量
+
+        Returns:
+            int: 容量（位元組）
+        """
+        return int(os.getenv(f"CACHE_MAX_BYTES_{name.upper()}", str(default_bytes)))
+
+    def register(self, cache: _ManagedCacheMixin) -> _ManagedCacheMixin:
+        """登記快取，同名快取會被取代
+
+        Args:
+            cache: 快取實例
+
+        Returns:
+            快取實例
+        """
+        with self._lock:
+            self._caches[cache.name] = cache
+        return cache
+
+    def create_ttl_cache(self, name: str, default_bytes: int, ttl: float) -> ManagedTTLCache:
+        """建立並登記 TTL 快取
+
+        Args:
+            name: 快取名稱
+            default_bytes: 預設容量（位元組）
+            ttl: 過期秒數
+
+        Returns:
+            ManagedTTLCache: 快取實例
+        """
+        return self.register(ManagedTTLCache(name, self._max_bytes(name, default_bytes), ttl))
+
+    def create_lru_cache(self, name: str, default_bytes: int) -> ManagedLRUCache:
+        """建立並登記 LRU 快取
+
+        Args:
+            name: 快取名稱
+            default_bytes: 預設容量（位元組）
+
+        Returns:
+            ManagedLRUCache: 快取實例
+        """
+        return self.register(ManagedLRUCache(name, self._max_bytes(name, default_bytes)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得所有快取的統計
+
+        Returns:
+            Dict[str, Any]: 各快取統計與總使用量
+        """
+        with self._lock:
+            caches = dict(self._caches)
+        stats = {name: cache.get_stats() for name, cache in caches.items()}
+        return {
+            "total_bytes": sum(cache_stats["bytes"] for cache_stats in stats.values()),
+            "total_max_bytes": sum(cache_stats["max_bytes"] for cache_stats in stats.values()),
+            "caches": stats
+        }
+
+
+# 全局快取登記中心
+cache_registry = CacheRegistry()
@@ -90,6 +90,11 @@ class Config:
         self.MONGODB_URI = kwargs.get("MONGODB_URI", clean_env("MONGODB_URI", "mongodb://localhost:27017"))
         self.MONGODB_DB_NAME = kwargs.get("MONGODB_DB_NAME", clean_env("MONGODB_DB_NAME", "threads_poster"))
         self.MONGODB_COLLECTION = kwargs.get("MONGODB_COLLECTION", clean_env("MONGODB_COLLECTION", "posts"))
+        self.PERSONA_ID = kwargs.get("PERSONA_ID", clean_env("PERSONA_ID", "default"))  # 多個人設共用資料庫時區分發文計數
+
+        # 資料庫後端設定：mongodb 或 sqlite
+        self.DB_BACKEND = kwargs.get("DB_BACKEND", clean_env("DB_BACKEND", "mongodb")).lower()
+        self.SQLITE_PATH = kwargs.get("SQLITE_PATH", clean_env("SQLITE_PATH", "data/threadsposter.db"))
 
         # 系統運行參數
         self.CHECK_INTERVAL = int(kwargs.get("CHECK_INTERVAL", clean_env("CHECK_INTERVAL", "60")))  # 檢查新回覆的間隔（秒）
@@ -0,0 +1,170 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 內容指紋與重複發文檢查
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 以正規化後的內容計算指紋，忽略空白、標點符號與表情符號的差異
+- 以 Bloom filter 在記憶體中先行判斷，只有可能重複時才查詢資料庫
+- Bloom filter 以完整的發文歷史預熱，預熱完成前每次都向資料庫確認
+"""
+
+import hashlib
+import logging
+import math
+import os
+import unicodedata
+from typing import Awaitable, Callable, Iterable, Optional
+
+
+def normalize_content(content: str) -> str:
+    """正規化內容，只保留文字與數字
+
+    Args:
+        content: 原始內容
+
+    Returns:
+        str: 正規化後的內容
+    """
+    normalized = unicodedata.normalize("NFKC", content).casefold()
+    # 空白、標點符號與表情符號等不影響內容是否相同
+    return "".join(char for char in normalized if unicodedata.category(char)[0] in ("L", "N"))
+
+
+def content_fingerprint(content: str) -> str:
+    """計算內容指紋
+
+    Args:
+        content: 原始內容
+
+    Returns:
+        str: 32 個字元的十六進位指紋
+    """
+    return hashlib.blake2b(normalize_content(content).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BloomFilter:
+    """以指紋為輸入的 Bloom filter"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        """初始化 Bloom filter
+
+        Args:
+            capacity: 預期的元素數量
+            error_rate: 誤判率
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint: str) -> Iterable[int]:
+        """由指紋的兩半計算各雜湊位置 (double hashing)"""
+        h1 = int(fingerprint[:16], 16)
+        h2 = int(fingerprint[16:], 16) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, fingerprint: str):
+        """加入指紋
+
+        Args:
+            fingerprint: 內容指紋
+        """
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(fingerprint))
+
+
+class DuplicateGuard:
+    """發文前的重複內容檢查
+
+    Bloom filter 判斷不存在時直接放行，不需任何資料庫查詢；
+    判斷可能存在時先比對本程序發布過的指紋，再向資料庫確認。
+    資料庫的唯一索引涵蓋所有發文，因此 Bloom filter 需以完整的歷史預熱；
+    預熱完成前（或預熱失敗時）每次都向資料庫確認。
+    """
+
+    def __init__(self, capacity: Optional[int] = None, error_rate: Optional[float] = None):
+        """初始化重複內容檢查
+
+        Args:
+            capacity: Bloom filter 預期的元素數量
+            error_rate: Bloom filter 誤判率
+        """
+        self.logger = logging.getLogger(__name__)
+        self.capacity = capacity or int(os.getenv("DUPLICATE_GUARD_CAPACITY", "10000"))
+        self.error_rate = error_rate or float(os.getenv("DUPLICATE_GUARD_ERROR_RATE", "0.001"))
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        # 本程序發布過的指紋，寫入佇列尚未寫入資料庫時也能判斷
+        self._published = set()
+        # Bloom filter 是否已包含所有發文的指紋
+        self.warmed = False
+        self.stats = {"checks": 0, "bloom_negative": 0, "db_checks": 0, "duplicates": 0}
+
+    def warm(self, fingerprints: Iterable[str]) -> int:
+        """以所有發文的指紋預熱，之後 Bloom filter 判斷不存在時不再查詢資料庫
+
+        指紋數量超過預期容量時以兩倍的容量重建 Bloom filter，維持誤判率。
+
+        Args:
+            fingerprints: 所有發文與文章的指紋
+
+        Returns:
+            int: 加入的指紋數量
+        """
+        fingerprints = set(fingerprints)
+        if len(fingerprints) > self.capacity:
+            self.capacity = len(fingerprints) * 2
+            self.bloom = BloomFilter(self.capacity, self.error_rate)
+            fingerprints |= self._published
+        for fingerprint in fingerprints:
+            self.bloom.add(fingerprint)
+        self.warmed = True
+        self.logger.info(f"重複內容檢查已載入 {len(fingerprints)} 筆發文指紋")
+        return len(fingerprints)
+
+    def add(self, content: str) -> str:
+        """記錄已發布的內容
+
+        Args:
+            content: 發布的內容
+
+        Returns:
+            str: 內容指紋
+        """
+        fingerprint = content_fingerprint(content)
+        self.bloom.add(fingerprint)
+        self._published.add(fingerprint)
+        return fingerprint
+
+    async def is_duplicate(self, content: str,
+                           exists: Callable[[str], Awaitable[bool]]) -> bool:
+        """檢查內容是否已發布過
+
+        Args:
+            content: 要發布的內容
+            exists: 向資料庫確認指紋是否存在的協程函數
+
+        Returns:
+            bool: 是否重複
+        """
+        self.stats["checks"] += 1
+        fingerprint = content_fingerprint(content)
+        if self.warmed and fingerprint not in self.bloom:
+            self.stats["bloom_negative"] += 1
+            return False
+
+        if fingerprint in self._published:
+            duplicate = True
+        else:
+            self.stats["db_checks"] += 1
+            duplicate = await exists(fingerprint)
+
+        if duplicate:
+            self.stats["duplicates"] += 1
+        return duplicate
@@ -15,12 +15,14 @@ Changes:
 - 優化並行處理能力
 - 實現內容快取機制
 - 引入獨立的說話模式模組
+- 內容快取改由快取登記中心建立
+- 快取的預先生成內容只使用一次
+- 內容驗證改用預先編譯的內容驗證器
 """
 
 import logging
 import json
 import random
-import re
 from typing import Optional, Dict, Any, List, Tuple
 import aiohttp
 import os
@@ -29,8 +31,9 @@ from datetime import datetime, timedelta
 import pytz
 from src.exceptions import AIError, ContentGeneratorError
 from src.performance_monitor import performance_monitor, track_performance
-from src.speaking_patterns import SpeakingPatterns
-from cachetools import TTLCache
+from src.speaking_patterns import INCOMPLETE_PATTERNS, SpeakingPatterns
+from src.cache_manager import cache_registry
+from src.content_validator import get_validator
 
 class ContentGenerator:
     """內容生成器類別"""
@@ -54,7 +57,7 @@ class ContentGenerator:
         self.threads_handler = None  # 將在 main.py 中設置
         
         # 內容快取，用於避免短時間內生成重複內容
-        self.content_cache = TTLCache(maxsize=100, ttl=3600 * 24)  # 24小時快取
+        self.content_cache = cache_registry.create_ttl_cache("generated_content", 512 * 1024, ttl=3600 * 24)  # 24小時快取
         self.generation_lock = asyncio.Lock()  # 鎖，避免並發請求造成重複生成
         
         # 載入預設主題和提示詞
@@ -156,7 +159,8 @@ class ContentGenerator:
             # 檢查快取中是否有內容
             cache_key = f"{topic}"
             if cache_key in self.content_cache:
-                content = self.content_cache[cache_key]
+                # 預先生成的內容只使用一次，避免同一主題重複發布相同內容
+                content = self.content_cache.pop(cache_key)
                 self.logger.info("使用快取的內容 - 主題：%s", topic)
                 return content
             
@@ -403,57 +407,13 @@ class ContentGenerator:
                 "min_emoticons": 1,
                 "max_emoticons": 3,
                 "required_ending_chars": ["！", "。", "？", "～", "!", "?", "~"],
-                "incomplete_patterns": [
-                    r'對我的$',
-                    r'這麼$',
-                    r'好想$',
-                    r'不行$',
-                    r'好棒$',
-                    r'好可愛$',
-                    r'好厲害$',
-                    r'好喜歡$',
-                    r'好期待$',
-                    r'好興奮$'
-                ]
+                "incomplete_patterns": INCOMPLETE_PATTERNS
             }
         
-        # 移除表情符號以檢查文本長度
-        text_without_emoji = content
-        for c in text_without_emoji:
-            if ord(c) > 0x1F000:
-                text_without_emoji = text_without_emoji.replace(c, '')
-        
-        # 檢查文本長度
-        if len(text_without_emoji) < criteria["min_length"]:
-            self.logger.warning(f"文本太短：{len(text_without_emoji)} 字符")
-            return False
-            
-        if len(content) > criteria["max_length"]:
-            self.logger.warning(f"文本太長：{len(content)} 字符")
-            return False
-            
-        # 檢查表情符號數量
-        emoji_count = sum(1 for c in content if ord(c) > 0x1F000)
-        if emoji_count < criteria["min_emoticons"]:
-            self.logger.warning(f"表情符號太少：{emoji_count}")
+        result = get_validator(criteria).validate(content)
+        if not result["valid"]:
+            self.logger.warning(result["message"])
             return False
-            
-        if emoji_count > criteria["max_emoticons"]:
-            self.logger.warning(f"表情符號太多：{emoji_count}")
-            return False
-            
-        # 檢查結尾字符
-        if not any(content.endswith(char) for char in criteria["required_ending_chars"]):
-            self.logger.warning(f"缺少結尾標點：{content[-1]}")
-            return False
-            
-        # 檢查不完整句子模式
-        text_for_pattern = content.rstrip("！。？～!?~")
-        for pattern in criteria["incomplete_patterns"]:
-            if re.search(pattern, text_for_pattern):
-                self.logger.warning(f"檢測到不完整句子模式：{pattern}")
-                return False
-                
         return True
         
     async def pre_generate_content(self, count: int = 3) -> List[str]:
@@ -0,0 +1,239 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 內容驗證器，將驗證標準預先編譯，以單次掃描檢查生成的內容
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 不完整句子的結尾以後綴比對或單一正規表示式檢查，開頭詞以字典樹比對
+- 表情符號以集合判斷，一次掃描同時計算數量與去除表情符號的文本
+- 返回失敗原因代碼並統計各原因的次數，支援一次驗證多個候選內容
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 失敗原因代碼
+REASON_EMPTY = "empty"
+REASON_ENDING = "ending"
+REASON_START = "start"
+REASON_EMOJI_COUNT = "emoji_count"
+REASON_TOO_SHORT = "too_short"
+REASON_TOO_LONG = "too_long"
+REASON_INCOMPLETE = "incomplete"
+
+# 沒有指定表情符號時，碼位大於此值的字元視為表情符號
+EMOJI_CODEPOINT_MIN = 0x1F000
+
+# 正規表示式的特殊字元，不含這些字元的模式可以直接以後綴比對
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+
+# 字典樹中標記詞語結尾的鍵
+_TRIE_END = ""
+
+
+def _build_trie(words: Iterable[str]) -> Dict[str, Any]:
+    """建立開頭詞字典樹
+
+    Args:
+        words: 開頭詞
+
+    Returns:
+        Dict[str, Any]: 字典樹，詞語結尾以空字串為鍵
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_TRIE_END] = True
+    return trie
+
+
+class ContentValidator:
+    """內容驗證器
+
+    驗證標準格式與 SpeakingPatterns.get_content_validation_criteria() 相同：
+    min_length、max_length（不含表情符號與前後空白的字數）、min_emoticons、max_emoticons、
+    required_ending_chars、incomplete_patterns，另可包含 valid_starts（開頭詞）與
+    emoticons（表情符號字元；未指定時以碼位判斷）。
+    """
+
+    def __init__(self, criteria: Dict[str, Any]):
+        """編譯驗證標準
+
+        Args:
+            criteria: 驗證標準
+        """
+        self.min_length = criteria.get("min_length", 0)
+        self.max_length = criteria.get("max_length")
+        self.min_emoticons = criteria.get("min_emoticons", 0)
+        self.max_emoticons = criteria.get("max_emoticons")
+        self.ending_chars = tuple(criteria.get("required_ending_chars", ()))
+        self._ending_strip = "".join(self.ending_chars)
+
+        emoticons = criteria.get("emoticons")
+        self.emoticons = frozenset(emoticons) if emoticons is not None else None
+
+        starts = criteria.get("valid_starts")
+        self._start_trie = _build_trie(starts) if starts else None
+
+        # 純文字的結尾模式（例如「好想$」）以 endswith 比對，其餘合併為一個正規表示式
+        literal_suffixes = []
+        regex_patterns = []
+        for pattern in criteria.get("incomplete_patterns", []):
+            body = pattern[:-1] if pattern.endswith("$") else None
+            if body and not REGEX_METACHARACTERS.intersection(body):
+                literal_suffixes.append(body)
+            else:
+                regex_patterns.append(pattern)
+        self._incomplete_suffixes = tuple(literal_suffixes)
+        self._incomplete_pattern = (
+            re.compile("|".join(f"(?:{pattern})" for pattern in regex_patterns)) if regex_patterns else None
+        )
+
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.failures = Counter()
+
+    def _is_emoji(self, char: str) -> bool:
+        """判斷字元是否為表情符號"""
+        if self.emoticons is not None:
+            return char in self.emoticons
+        return ord(char) > EMOJI_CODEPOINT_MIN
+
+    def _matches_start(self, text: str) -> bool:
+        """以字典樹檢查文本是否以任一開頭詞開頭"""
+        node = self._start_trie
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                return False
+            if _TRIE_END in node:
+                return True
+        return False
+
+    def _check(self, text: str) -> Optional[Tuple[str, str]]:
+        """依序檢查各項標準
+
+        Returns:
+            Optional[Tuple[str, str]]: 失敗時為 (原因代碼, 說明)，通過時為 None
+        """
+        if not text:
+            return REASON_EMPTY, "文本為空"
+
+        # 一次掃描同時去除表情符號並計算數量
+        if self.emoticons is not None:
+            emoticons = self.emoticons
+            plain = "".join([char for char in text if char not in emoticons])
+        else:
+            plain = "".join([char for char in text if ord(char) <= EMOJI_CODEPOINT_MIN])
+        emoji_count = len(text) - len(plain)
+        plain = plain.strip()
+
+        # 只略過結尾的表情符號，表情符號前的空白仍視為缺少結尾標點
+        end = len(text)
+        while end and self._is_emoji(text[end - 1]):
+            end -= 1
+        if self.ending_chars and not text.endswith(self.ending_chars, 0, end):
+            return REASON_ENDING, f"結尾標點不符合要求：{text[end - 1] if end else ''}"
+
+        if self._start_trie is not None and not self._matches_start(plain):
+            return REASON_START, f"開頭詞不符合要求：{text[:5]}"
+
+        if emoji_count < self.min_emoticons or (self.max_emoticons is not None and emoji_count > self.max_emoticons):
+            return REASON_EMOJI_COUNT, f"表情符號數量不符合要求：{emoji_count}"
+
+        if len(plain) < self.min_length:
+            return REASON_TOO_SHORT, f"文本太短：{len(plain)} 字符"
+        if self.max_length is not None and len(plain) > self.max_length:
+            return REASON_TOO_LONG, f"文本太長：{len(plain)} 字符"
+
+        text_for_pattern = plain.rstrip(self._ending_strip)
+        if self._incomplete_suffixes and text_for_pattern.endswith(self._incomplete_suffixes):
+            return REASON_INCOMPLETE, f"檢測到不完整句子：{text_for_pattern[-5:]}"
+        if self._incomplete_pattern is not None:
+            match = self._incomplete_pattern.search(text_for_pattern)
+            if match:
+                return REASON_INCOMPLETE, f"檢測到不完整句子：{match.group(0)}"
+        return None
+
+    def validate(self, text: str) -> Dict[str, Any]:
+        """驗證單一內容
+
+        Args:
+            text: 要驗證的內容
+
+        Returns:
+            Dict[str, Any]: {"valid": 是否通過, "reason": 失敗原因代碼, "message": 說明}
+        """
+        failure = self._check(text)
+        with self._lock:
+            self.checked += 1
+            if failure is not None:
+                self.failures[failure[0]] += 1
+        if failure is None:
+            return {"valid": True, "reason": None, "message": ""}
+        return {"valid": False, "reason": failure[0], "message": failure[1]}
+
+    def validate_many(self, texts: Iterable[str]) -> List[Dict[str, Any]]:
+        """一次驗證多個候選內容
+
+        Args:
+            texts: 候選內容
+
+        Returns:
+            List[Dict[str, Any]]: 與輸入順序相同的驗證結果
+        """
+        return [self.validate(text) for text in texts]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得驗證統計
+
+        Returns:
+            Dict[str, Any]: 驗證次數與各失敗原因的次數
+        """
+        with self._lock:
+            return {"checked": self.checked, "failures": dict(self.failures)}
+
+
+_validators: Dict[str, ContentValidator] = {}
+_validators_lock = threading.Lock()
+
+
+def get_validator(criteria: Dict[str, Any]) -> ContentValidator:
+    """取得驗證標準對應的驗證器，相同的標準只編譯一次
+
+    Args:
+        criteria: 驗證標準
+
+    Returns:
+        ContentValidator: 驗證器
+    """
+    key = json.dumps(criteria, sort_keys=True, ensure_ascii=False, default=list)
+    with _validators_lock:
+        validator = _validators.get(key)
+        if validator is None:
+            validator = _validators[key] = ContentValidator(criteria)
+        return validator
+
+
+def get_validation_stats() -> Dict[str, Any]:
+    """取得所有驗證器的失敗原因統計
+
+    Returns:
+        Dict[str, Any]: 驗證次數與各失敗原因的合計次數
+    """
+    with _validators_lock:
+        validators = list(_validators.values())
+    failures = Counter()
+    checked = 0
+    for validator in validators:
+        stats = validator.get_stats()
+        checked += stats["checked"]
+        failures.update(stats["failures"])
+    return {"checked": checked, "failures": dict(failures)}
@@ -14,18 +14,671 @@ Changes:
 - 整合性能監控
 - 優化連接池設定
 - 改進快取機制
+- 新增 write-behind 寫入佇列，合併同集合的待寫入操作為單次 bulk_write
+- 新增每日發文計數文檔 (daily_counters)，取代 count_documents 範圍查詢
+- 新增跨程序快取同步（change stream / updated_at 輪詢）
+- 資料庫流量改由 CommandListener 記錄實際大小，並由定期任務彙整
+- 流量大小改為採樣估計值，並彙整游標指令返回的文檔數量
+- 以結構版本文檔管理索引，版本相同時略過 create_index
+- 資料清理改由保留管理器分批刪除（或 TTL 索引），只移除受影響的快取項目
+- 快取未命中時合併同一鍵值的並行查詢 (single-flight)
+- 快取改由快取登記中心建立，以位元組限制容量並記錄命中統計
+- 發文與文章記錄內容指紋，提供重複內容查詢
+- 用戶對話記錄改以 $push/$slice 附加並限制筆數，讀取時只取最近幾輪
+- 記錄各集合/指令與連線池等待的耗時分佈，慢指令取樣執行 explain 並寫入慢指令日誌
+- 資料庫無法連線時寫入改存本地日誌，恢復連線後重放
+- 文檔數量改由寫入路徑遞增維護的統計快照提供，不再執行 count_documents 全集合計數
+- 各集合依政策表設定寫入確認與讀取偏好，可重建的資料只需 w=1，統計讀取可使用次要節點
+- 支援 zstd/snappy/zlib 傳輸壓縮，關閉時記錄各集合指令的操作組合供連線池基準測試重放
+- 發文與文章支援以 (時間, _id) 游標分頁及串流讀取，每頁成本固定
+- 新增合併的發文記錄寫入 (save_post_record)；articles 遷移為 posts 的檢視後文章改存於 posts
+- 每日發文計數改依寫入結果中實際新增的文章遞增，寫入失敗或重複的文章不會被計數
+- 資料庫離線時讀取立即失敗，每日計數以最後已知的計數加上佇列與本地日誌中的增減估計
 """
 
+import asyncio
+import json
 import logging
+import time
 import motor.motor_asyncio
 from datetime import datetime, timedelta
 import pytz
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Awaitable, Callable, AsyncIterator, Tuple
 import os
-from cachetools import TTLCache, LRUCache
+from src.cache_manager import cache_registry
+from pymongo import UpdateOne
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+from pymongo.errors import BulkWriteError, ConnectionFailure
 from src.exceptions import DatabaseError
 from src.performance_monitor import performance_monitor, track_performance
-from collections import defaultdict
+from src.db_watcher import CacheWatcher
+from src.db_monitoring import (
+    CommandTrafficListener, PoolWaitListener, LatencyHistogram, READ_COMMANDS, WRITE_COMMANDS,
+    setup_slow_op_logger, summarize_explain
+)
+from src.db_schema import (
+    ensure_schema, build_stats_snapshot, STATS_SNAPSHOT_COLLECTION, STATS_SNAPSHOT_ID, STATS_SNAPSHOT_FIELDS
+)
+from src.db_retention import RetentionManager
+from src.content_fingerprint import content_fingerprint
+from src.write_journal import WriteJournal
+from collections import defaultdict, deque, OrderedDict
+
+
+def _apply_push(values: Optional[List[Any]], push: Dict[str, Any]) -> List[Any]:
+    """在本地套用 {"$each": [...], "$slice": n} 形式的 $push
+
+    Args:
+        values: 原有的陣列
+        push: $push 的欄位值
+
+    Returns:
+        List[Any]: 套用後的陣列
+    """
+    result = list(values or []) + list(push["$each"])
+    limit = push.get("$slice")
+    if limit is not None:
+        result = result[limit:] if limit < 0 else result[:limit]
+    return result
+
+
+def _merge_update(base: Dict[str, Dict[str, Any]], newer: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """合併同一文檔的兩個更新操作，後者優先
+
+    Args:
+        base: 較早的更新操作
+        newer: 較新的更新操作
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 合併後的更新操作
+    """
+    merged = {op: dict(fields) for op, fields in base.items()}
+    for op, fields in newer.items():
+        target = merged.setdefault(op, {})
+        if op == "$set":
+            target.update(fields)
+        elif op == "$setOnInsert":
+            # 只有第一次插入的值會生效
+            for field, value in fields.items():
+                target.setdefault(field, value)
+        elif op == "$inc":
+            for field, value in fields.items():
+                target[field] = target.get(field, 0) + value
+        elif op == "$push":
+            base_set = merged.get("$set", {})
+            for field, value in fields.items():
+                if field in base_set:
+                    # 較早的操作已整個設定此欄位，直接把新項目加入設定值
+                    base_set[field] = _apply_push(base_set[field], value)
+                elif field in target:
+                    target[field] = {
+                        "$each": target[field]["$each"] + value["$each"],
+                        **({"$slice": value["$slice"]} if "$slice" in value else {})
+                    }
+                else:
+                    target[field] = value
+        else:
+            raise ValueError(f"寫入佇列不支援的更新運算子：{op}")
+
+    # $set 會覆蓋 $setOnInsert 與 $push 的同名欄位，避免 MongoDB 的欄位衝突錯誤
+    for op in ("$setOnInsert", "$push"):
+        if "$set" in merged and op in merged:
+            for field in merged["$set"]:
+                merged[op].pop(field, None)
+
+    return {op: fields for op, fields in merged.items() if fields}
+
+
+# MongoDB 違反唯一索引的錯誤代碼
+DUPLICATE_KEY_ERROR = 11000
+
+
+# 各集合的寫入確認 (w) 與讀取偏好 (read, max_staleness 秒)，未列出的設定沿用 DEFAULT_COLLECTION_POLICY。
+# 發文與文章等無法重建的資料需要 majority；計數、統計快照與對話記錄遺失時可校正或重建，只需 w=1
+COLLECTION_POLICIES: Dict[str, Dict[str, Any]] = {
+    "articles": {"w": "majority"},
+    "posts": {"w": "majority"},
+    "personality_memories": {"w": "majority"},
+    "speaking_patterns": {"w": 1},
+    "user_history": {"w": 1},
+    "daily_counters": {"w": 1},
+    STATS_SNAPSHOT_COLLECTION: {"w": 1, "read": "secondaryPreferred", "max_staleness": 90}
+}
+DEFAULT_COLLECTION_POLICY: Dict[str, Any] = {"w": "majority", "read": "primary"}
+
+# 統計用途的讀取（例如 estimated_document_count）可讀取次要節點
+STATS_READ_POLICY: Dict[str, Any] = {"read": "secondaryPreferred", "max_staleness": 90}
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
+
+
+def _read_preference(policy: Dict[str, Any]):
+    """依政策建立讀取偏好
+
+    Args:
+        policy: 包含 read 與 max_staleness 的政策
+
+    Returns:
+        讀取偏好實例
+    """
+    if policy["read"] == "primary":
+        return Primary()
+    return READ_PREFERENCES[policy["read"]](max_staleness=policy.get("max_staleness", -1))
+
+
+# 傳輸壓縮格式與所需的套件（zlib 為標準函式庫）
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def resolve_compressors(names: str) -> List[str]:
+    """解析傳輸壓縮設定，略過未安裝套件的格式
+
+    Args:
+        names: 以逗號分隔的壓縮格式，依偏好順序排列
+
+    Returns:
+        List[str]: 可用的壓縮格式
+    """
+    compressors = []
+    for name in (name.strip().lower() for name in names.split(",")):
+        if not name or name == "none":
+            continue
+        module = COMPRESSOR_MODULES.get(name)
+        if module is None:
+            logging.getLogger(__name__).warning(f"不支援的傳輸壓縮格式：{name}")
+            continue
+        try:
+            __import__(module)
+        except ImportError:
+            logging.getLogger(__name__).warning(f"傳輸壓縮格式 {name} 需要安裝 {module}，已略過")
+            continue
+        compressors.append(name)
+    return compressors
+
+
+# 分頁排序欄位：集合 -> 時間欄位，以 (時間, _id) 作為分頁游標
+PAGINATION_FIELDS = {"posts": "timestamp", "articles": "created_at"}
+
+
+def _page_projection(projection: Optional[Dict[str, Any]], field: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """確保投影包含分頁游標需要的欄位
+
+    Args:
+        projection: 呼叫者指定的投影
+        field: 分頁排序欄位
+
+    Returns:
+        Tuple: (實際查詢的投影, 返回前需移除的欄位)
+    """
+    if projection is None:
+        return None, []
+    projection = dict(projection)
+    inclusive = any(value for key, value in projection.items() if key != "_id")
+    strip = []
+    for key in ("_id", field):
+        if key in projection and not projection[key]:
+            # 呼叫者排除的游標欄位仍需查詢，返回前移除
+            projection.pop(key)
+            strip.append(key)
+        elif inclusive and key != "_id" and key not in projection:
+            projection[key] = 1
+            strip.append(key)
+    return projection, strip
+
+
+class WriteBehindQueue:
+    """資料庫寫入佇列 (write-behind)
+
+    將待寫入操作依集合與文檔鍵值合併，於達到批次大小、超過等待時間
+    或關閉時以單次 bulk_write 寫入，減少寫入往返次數。
+    """
+
+    def __init__(self, database, max_batch_size: int = 50, max_delay: float = 1.0, max_retries: int = 3):
+        """初始化寫入佇列
+
+        Args:
+            database: Database 實例
+            max_batch_size: 累積多少筆待寫入文檔時立即寫入
+            max_delay: 最早一筆待寫入操作最多等待的秒數
+            max_retries: 寫入失敗時的最大重試次數
+        """
+        self.database = database
+        self.logger = logging.getLogger(__name__)
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+
+        # 集合名稱 -> {文檔鍵值: 待寫入操作}
+        self._pending = defaultdict(OrderedDict)
+        # 正在寫入中的操作，讓讀取仍能看到自己的寫入
+        self._inflight = {}
+        self._pending_count = 0
+        self._oldest_enqueued = None
+
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._closed = False
+
+        self.stats = {
+            "enqueued": 0,
+            "merged": 0,
+            "flushes": 0,
+            "bulk_writes": 0,
+            "documents_written": 0,
+            "failures": 0,
+            "dropped": 0,
+            "journaled": 0
+        }
+
+    def start(self):
+        """啟動背景寫入任務"""
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._task = asyncio.ensure_future(self._run())
+
+    def enqueue(self, collection: str, key_field: str, key: Any, update: Dict[str, Dict[str, Any]]):
+        """加入一筆待寫入操作，同一文檔的操作會合併
+
+        Args:
+            collection: 集合名稱
+            key_field: 文檔鍵值欄位，如 "post_id"
+            key: 文檔鍵值
+            update: MongoDB 更新操作，如 {"$set": {...}}
+        """
+        if self._closed:
+            raise DatabaseError("寫入佇列已關閉", collection=collection, operation="enqueue")
+
+        # _id 不可被更新，從更新內容中移除
+        update = {
+            op: {field: value for field, value in fields.items() if field != "_id"}
+            for op, fields in update.items()
+        }
+
+        entries = self._pending[collection]
+        if key in entries:
+            entries[key]["update"] = _merge_update(entries[key]["update"], update)
+            self.stats["merged"] += 1
+        else:
+            entries[key] = {"filter": {key_field: key}, "update": _merge_update({}, update), "attempts": 0}
+            self._pending_count += 1
+            if self._oldest_enqueued is None:
+                self._oldest_enqueued = time.monotonic()
+
+        self.stats["enqueued"] += 1
+        self._wakeup.set()
+
+    def get_pending_document(self, collection: str, key: Any) -> Optional[Dict[str, Any]]:
+        """取得尚未寫入資料庫的文檔內容
+
+        Args:
+            collection: 集合名稱
+            key: 文檔鍵值
+
+        Returns:
+            Optional[Dict[str, Any]]: 待寫入的文檔內容，如果沒有則返回 None
+        """
+        document = None
+        for source in (self._inflight, self._pending):
+            entry = source.get(collection, {}).get(key)
+            if entry is None:
+                continue
+            if document is None:
+                document = dict(entry["filter"])
+            for field, value in entry["update"].get("$setOnInsert", {}).items():
+                document.setdefault(field, value)
+            document.update(entry["update"].get("$set", {}))
+        return document
+
+    def apply_pending(self, collection: str, key: Any, document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """將尚未寫入的操作套用到從資料庫讀取的文檔上
+
+        Args:
+            collection: 集合名稱
+            key: 文檔鍵值
+            document: 資料庫中的文檔，不存在時為 None
+
+        Returns:
+            Optional[Dict[str, Any]]: 套用後的文檔
+        """
+        for source in (self._inflight, self._pending):
+            entry = source.get(collection, {}).get(key)
+            if entry is None:
+                continue
+            if document is None:
+                document = dict(entry["filter"])
+                for field, value in entry["update"].get("$setOnInsert", {}).items():
+                    document.setdefault(field, value)
+            else:
+                document = dict(document)
+            document.update(entry["update"].get("$set", {}))
+            for field, value in entry["update"].get("$push", {}).items():
+                document[field] = _apply_push(document.get(field), value)
+        return document
+
+    def get_pending_increment(self, collection: str, key: Any, field: str) -> int:
+        """取得尚未寫入資料庫的 $inc 累計值
+
+        Args:
+            collection: 集合名稱
+            key: 文檔鍵值
+            field: 欄位名稱
+
+        Returns:
+            int: 尚未寫入的累計值
+        """
+        total = 0
+        for source in (self._inflight, self._pending):
+            entry = source.get(collection, {}).get(key)
+            if entry is not None:
+                total += entry["update"].get("$inc", {}).get(field, 0)
+        return total
+
+    def pending_keys(self, collection: str) -> List[Any]:
+        """取得集合中仍有待寫入操作的文檔鍵值
+
+        Args:
+            collection: 集合名稱
+
+        Returns:
+            List[Any]: 文檔鍵值
+        """
+        keys = dict.fromkeys(self._inflight.get(collection, {}))
+        keys.update(dict.fromkeys(self._pending.get(collection, {})))
+        return list(keys)
+
+    def get_pending_update(self, collection: str, key: Any) -> Optional[Dict[str, Dict[str, Any]]]:
+        """取得文檔尚未寫入的更新操作（寫入中與佇列中的操作合併）
+
+        Args:
+            collection: 集合名稱
+            key: 文檔鍵值
+
+        Returns:
+            Optional[Dict[str, Dict[str, Any]]]: 更新操作，沒有時返回 None
+        """
+        update = None
+        for source in (self._inflight, self._pending):
+            entry = source.get(collection, {}).get(key)
+            if entry is not None:
+                update = entry["update"] if update is None else _merge_update(update, entry["update"])
+        return update
+
+    def is_pending(self, collection: str, key: Any) -> bool:
+        """檢查文檔是否仍有待寫入的操作"""
+        return key in self._pending.get(collection, {}) or key in self._inflight.get(collection, {})
+
+    @property
+    def pending_count(self) -> int:
+        """待寫入的文檔數量"""
+        return self._pending_count
+
+    async def _run(self):
+        """背景寫入循環：依批次大小與等待時間觸發寫入"""
+        while not self._closed:
+            try:
+                if not self._pending_count:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                remaining = self.max_delay - (time.monotonic() - self._oldest_enqueued)
+                if remaining > 0 and self._pending_count < self.max_batch_size:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"寫入佇列背景任務發生錯誤：{str(e)}")
+                await asyncio.sleep(self.max_delay)
+
+    async def flush(self) -> Dict[str, bool]:
+        """立即寫入所有待寫入操作
+
+        Returns:
+            Dict[str, bool]: 各集合是否寫入成功
+        """
+        async with self._flush_lock:
+            if not self._pending_count:
+                return {}
+
+            self._inflight = self._pending
+            self._pending = defaultdict(OrderedDict)
+            self._pending_count = 0
+            self._oldest_enqueued = None
+
+            try:
+                collections = list(self._inflight.keys())
+                if self.database.offline and self.database.journal is not None:
+                    # 資料庫離線時直接寫入本地日誌，不等待伺服器選擇逾時
+                    results = [
+                        await self._spill(collection, self._inflight[collection])
+                        for collection in collections
+                    ]
+                else:
+                    results = await asyncio.gather(*[
+                        self._write_collection(collection, self._inflight[collection])
+                        for collection in collections
+                    ])
+            finally:
+                self._inflight = {}
+
+            self.stats["flushes"] += 1
+            return dict(zip(collections, results))
+
+    async def _write_collection(self, collection: str, entries: "OrderedDict[Any, Dict[str, Any]]") -> bool:
+        """將單一集合的待寫入操作以 bulk_write 寫入
+
+        Args:
+            collection: 集合名稱
+            entries: 待寫入操作
+
+        Returns:
+            bool: 是否全部寫入成功
+        """
+        keys = list(entries.keys())
+        operations = [
+            UpdateOne(entries[key]["filter"], entries[key]["update"], upsert=True)
+            for key in keys
+        ]
+
+        try:
+            result = await self.database._collection(collection).bulk_write(operations, ordered=False)
+            # 已寫入資料庫，讀取不再需要寫入中的操作（衍生的計數寫入會放入新的佇列）
+            self._inflight.pop(collection, None)
+            self.database._on_writes_flushed(collection, {key: entries[key]["update"] for key in keys})
+            self.database._on_upserted(
+                collection, [entries[keys[index]]["update"] for index in result.upserted_ids]
+            )
+
+            self.stats["bulk_writes"] += 1
+            self.stats["documents_written"] += len(operations)
+            self.database.performance_monitor.record_db_operation(
+                "update", True, count=len(operations), collection=collection,
+                query=f"bulk_write(write_behind, ops={len(operations)})"
+            )
+            self.database._record_db_access(collection, "write", doc_count=len(operations))
+            return True
+
+        except Exception as e:
+            self._inflight.pop(collection, None)
+            self.stats["failures"] += 1
+            self.logger.error(f"批次寫入 {collection} 失敗：{str(e)}")
+            self.database.performance_monitor.record_db_operation(
+                "update", False, count=len(operations), collection=collection,
+                query=f"bulk_write(write_behind, ops={len(operations)})"
+            )
+
+            # 無法連線（或寫入期間已判定離線）時改存本地日誌，由背景任務在恢復後重放
+            if (isinstance(e, ConnectionFailure) or self.database.offline) and self.database.journal is not None:
+                self.database._set_offline(str(e))
+                return await self._spill(collection, entries)
+
+            # 非順序批次寫入只需重試失敗的操作
+            failed_keys = keys
+            if isinstance(e, BulkWriteError):
+                self.database._on_upserted(
+                    collection, [entries[keys[item["index"]]]["update"] for item in e.details.get("upserted", [])]
+                )
+                write_errors = e.details.get("writeErrors", [])
+                failed_indexes = {error["index"] for error in write_errors}
+                # 違反唯一索引（例如重複的內容指紋）重試也不會成功
+                duplicate_indexes = {error["index"] for error in write_errors if error.get("code") == DUPLICATE_KEY_ERROR}
+                if duplicate_indexes:
+                    self.stats["dropped"] += len(duplicate_indexes)
+                    self.logger.error(
+                        f"寫入 {collection} 違反唯一索引，放棄 {len(duplicate_indexes)} 筆："
+                        f"{[keys[index] for index in sorted(duplicate_indexes)]}"
+                    )
+                failed_keys = [keys[index] for index in sorted(failed_indexes - duplicate_indexes)]
+                self.database._on_writes_flushed(collection, {
+                    key: entries[key]["update"] for index, key in enumerate(keys) if index not in failed_indexes
+                })
+
+            self._requeue(collection, {key: entries[key] for key in failed_keys})
+            return False
+
+    async def _spill(self, collection: str, entries: "OrderedDict[Any, Dict[str, Any]]") -> bool:
+        """將單一集合的待寫入操作寫入本地日誌
+
+        Args:
+            collection: 集合名稱
+            entries: 待寫入操作
+
+        Returns:
+            bool: 是否已寫入本地日誌
+        """
+        try:
+            await self.database.journal.append([
+                {"collection": collection, "filter": entry["filter"], "update": entry["update"]}
+                for entry in entries.values()
+            ])
+        except OSError as e:
+            self.logger.error(f"寫入本地日誌失敗（{collection}）：{str(e)}")
+            self._requeue(collection, dict(entries))
+            return False
+
+        self.stats["journaled"] += len(entries)
+        self.database._on_journaled(collection, list(entries.values()))
+        return True
+
+    def _requeue(self, collection: str, entries: Dict[Any, Dict[str, Any]]):
+        """將寫入失敗的操作放回佇列，超過重試次數則放棄
+
+        Args:
+            collection: 集合名稱
+            entries: 寫入失敗的操作
+        """
+        pending = self._pending[collection]
+        for key, entry in entries.items():
+            entry["attempts"] += 1
+            if entry["attempts"] > self.max_retries:
+                self.stats["dropped"] += 1
+                self.logger.error(f"寫入 {collection}（{key}）已重試 {self.max_retries} 次仍失敗，放棄寫入")
+                continue
+
+            if key in pending:
+                # 佇列中已有較新的操作，以較新的為優先
+                entry["update"] = _merge_update(entry["update"], pending[key]["update"])
+            else:
+                self._pending_count += 1
+            pending[key] = entry
+
+        if self._pending_count and self._oldest_enqueued is None:
+            self._oldest_enqueued = time.monotonic()
+
+    async def close(self):
+        """停止背景任務並寫入所有剩餘操作"""
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception as e:
+                self.logger.error(f"停止寫入佇列背景任務時發生錯誤：{str(e)}")
+            self._task = None
+
+        for _ in range(self.max_retries + 1):
+            if not self._pending_count:
+                break
+            await self.flush()
+
+        if self._pending_count:
+            self.logger.error(f"寫入佇列關閉時仍有 {self._pending_count} 筆資料未寫入")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得寫入佇列統計"""
+        return {**self.stats, "pending": self._pending_count}
+
+
+class SingleFlight:
+    """合併同一鍵值的並行查詢 (single-flight)
+
+    第一個快取未命中的呼叫負責查詢資料庫，查詢期間相同鍵值的其他呼叫
+    等待同一個結果，不再各自送出查詢。
+    """
+
+    def __init__(self):
+        """初始化並行查詢合併器"""
+        # (集合名稱, 鍵值) -> 查詢中的任務
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0}
+        self.collection_stats = defaultdict(lambda: {"executions": 0, "coalesced": 0})
+
+    async def do(self, collection: str, key: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """執行查詢，若相同鍵值已在查詢中則等待其結果
+
+        Args:
+            collection: 集合名稱
+            key: 文檔鍵值
+            loader: 實際查詢的協程函數
+
+        Returns:
+            Any: 查詢結果
+        """
+        self.stats["calls"] += 1
+        flight_key = (collection, key)
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            self.collection_stats[collection]["coalesced"] += 1
+        else:
+            self.stats["executions"] += 1
+            self.collection_stats[collection]["executions"] += 1
+            # 以獨立任務執行，發起者被取消時不影響其他等待者
+            task = asyncio.ensure_future(loader())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda done: self._finish(flight_key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: tuple, task: asyncio.Task):
+        """查詢完成後移除記錄，並取出例外避免所有等待者都被取消時的未處理警告"""
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得並行查詢合併統計"""
+        return {
+            **self.stats,
+            "inflight": len(self._inflight),
+            "collections": {collection: dict(stats) for collection, stats in self.collection_stats.items()}
+        }
+
 
 class Database:
     def __init__(self, config):
@@ -47,14 +700,70 @@ class Database:
         self.server_selection_timeout_ms = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
         self.connection_timeout_ms = int(os.getenv("MONGODB_CONNECTION_TIMEOUT_MS", "30000"))
         
+        # 傳輸壓縮，伺服器不支援時自動不壓縮
+        self.compressors = resolve_compressors(os.getenv("MONGODB_COMPRESSORS", ""))
+        self.zlib_compression_level = int(os.getenv("MONGODB_ZLIB_COMPRESSION_LEVEL", "-1"))
+        
+        # 跨程序快取同步，啟用後監聽中的快取可使用較長的 TTL
+        self.cache_watch_enabled = os.getenv("DB_CACHE_WATCH_ENABLED", "false").lower() == "true"
+        self.cache_watch_poll_interval = float(os.getenv("DB_CACHE_WATCH_POLL_INTERVAL", "30"))
+        watched_cache_ttl = int(os.getenv("DB_WATCHED_CACHE_TTL", "86400"))
+        self.cache_watcher = None
+        
         # 初始化快取
         self.cache_ttl = int(os.getenv("MONGODB_CACHE_TTL", "300"))  # 5分鐘快取
-        self.posts_cache = TTLCache(maxsize=1000, ttl=self.cache_ttl)
-        self.count_cache = TTLCache(maxsize=100, ttl=60)  # 1分鐘快取計數
-        self.post_count_cache = TTLCache(maxsize=100, ttl=3600)  # 1小時過期
-        self.article_cache = LRUCache(maxsize=1000)  # 最多保存1000篇文章
-        self.personality_cache = TTLCache(maxsize=10, ttl=3600)  # 人設快取
-        self.pattern_cache = TTLCache(maxsize=20, ttl=3600)  # 說話模式快取，1小時過期
+        # 容量以位元組計算，可用 CACHE_MAX_BYTES_<快取名稱> 覆寫
+        self.posts_cache = cache_registry.create_ttl_cache(
+            "db_posts", 2 * 1024 * 1024, ttl=watched_cache_ttl if self.cache_watch_enabled else self.cache_ttl
+        )
+        self.count_cache = cache_registry.create_ttl_cache("db_counts", 64 * 1024, ttl=60)  # 1分鐘快取計數
+        self.article_cache = cache_registry.create_lru_cache("db_articles", 4 * 1024 * 1024)
+        self.personality_cache = cache_registry.create_ttl_cache(
+            "db_personality", 512 * 1024, ttl=watched_cache_ttl if self.cache_watch_enabled else 3600
+        )  # 人設快取
+        self.pattern_cache = cache_registry.create_ttl_cache(
+            "db_patterns", 4 * 1024 * 1024, ttl=watched_cache_ttl if self.cache_watch_enabled else 3600
+        )  # 說話模式快取，1小時過期
+        
+        # 每日發文計數
+        self.persona_id = getattr(config, "PERSONA_ID", "default")
+        self.timezone = pytz.timezone("Asia/Taipei")
+        self._counter_generation = 0  # 計數寫入後遞增，避免快取寫入前的舊值
+        self._last_daily_counts: Dict[str, int] = {}  # 最後已知的每日計數，不會過期
+        self._journaled_counts = defaultdict(int)  # 存入本地日誌、尚未寫入資料庫的每日計數增減
+        
+        # 文章所在的集合；遷移為合併的發文記錄後，articles 是 posts 的唯讀檢視，文章欄位存於 posts
+        self.articles_collection = "articles"
+        
+        # 資料保留
+        self.retention = RetentionManager(self)
+        
+        # 用戶對話記錄：讀取時返回的筆數與保存的上限
+        memory_config = getattr(config, "MEMORY_CONFIG", {})
+        self.memory_max_history = memory_config.get("max_history", 10)
+        self.memory_max_records = memory_config.get("max_records", 50)
+        
+        # 快取未命中時合併並行查詢
+        self.single_flight = SingleFlight()
+        
+        # 寫入佇列 (write-behind)
+        self.write_behind_enabled = os.getenv("DB_WRITE_BEHIND_ENABLED", "true").lower() == "true"
+        self.write_queue = WriteBehindQueue(
+            self,
+            max_batch_size=int(os.getenv("DB_WRITE_BATCH_SIZE", "50")),
+            max_delay=float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "1.0")),
+            max_retries=int(os.getenv("DB_WRITE_MAX_RETRIES", "3"))
+        )
+        
+        # 本地寫入日誌：資料庫無法連線時暫存寫入，恢復連線後重放
+        self.journal_enabled = os.getenv("DB_JOURNAL_ENABLED", "true").lower() == "true"
+        self.journal = WriteJournal(
+            os.getenv("DB_JOURNAL_DIR", "data/journal"),
+            segment_max_bytes=int(os.getenv("DB_JOURNAL_SEGMENT_BYTES", str(1024 * 1024)))
+        ) if self.journal_enabled else None
+        self.journal_replay_interval = float(os.getenv("DB_JOURNAL_REPLAY_INTERVAL", "10"))
+        self.offline = False
+        self._journal_task = None
         
         # 資料庫流量統計
         self.db_traffic_stats = {
@@ -62,23 +771,127 @@ class Database:
             "total_bytes_received": 0,
             "read_operations": 0,
             "write_operations": 0,
+            "failed_operations": 0,
+            "total_duration_us": 0,
             "cache_hit_count": 0,
             "cache_miss_count": 0,
-            "collection_stats": defaultdict(lambda: {"reads": 0, "writes": 0, "bytes": 0}),
+            "collection_stats": defaultdict(lambda: {
+                "reads": 0, "writes": 0, "failures": 0, "bytes": 0,
+                "bytes_sent": 0, "bytes_received": 0, "documents": 0, "duration_us": 0
+            }),
+            "command_stats": defaultdict(lambda: {"count": 0, "failures": 0, "duration_us": 0}),
             "start_time": datetime.now(pytz.UTC)
         }
         self.traffic_log_interval = int(os.getenv("DB_TRAFFIC_LOG_INTERVAL", "3600"))  # 默認每小時記錄一次
         self.last_traffic_log_time = datetime.now(pytz.UTC)
+        self._traffic_stats_task = None
         
-        # 估算每種文檔的平均大小 (位元組)
-        self.doc_size_estimates = {
-            "posts": 2000,
-            "articles": 5000,
-            "personality_memories": 3000,
-            "speaking_patterns": 20000,
-            "user_history": 4000
-        }
+        # 資料庫指令監控，記錄實際的請求與回應大小
+        self.command_monitoring_enabled = os.getenv("DB_COMMAND_MONITORING_ENABLED", "true").lower() == "true"
+        self.command_listener = CommandTrafficListener(
+            slow_threshold_ms=float(os.getenv("DB_SLOW_OP_THRESHOLD_MS", "100")),
+            slow_sample_rate=float(os.getenv("DB_SLOW_OP_SAMPLE_RATE", "1.0")),
+            slow_max_per_minute=int(os.getenv("DB_SLOW_OP_MAX_PER_MINUTE", "10")),
+            size_sample_rate=float(os.getenv("DB_COMMAND_SIZE_SAMPLE_RATE", "0.1"))
+        ) if self.command_monitoring_enabled else None
+        self.pool_listener = PoolWaitListener() if self.command_monitoring_enabled else None
+        
+        # 耗時分佈："集合.指令" -> 分佈；連線池取得連線的等待時間
+        self.latency_histograms = defaultdict(LatencyHistogram)
+        self.pool_wait_histogram = LatencyHistogram()
+        
+        # 慢指令分析
+        self.slow_op_explain_interval = float(os.getenv("DB_SLOW_OP_EXPLAIN_INTERVAL", "30"))
+        self.slow_ops = deque(maxlen=20)  # 最近分析過的慢指令
+        self._slow_op_task = None
+        self._slow_op_logger = None
         
+        # 關閉時記錄本次執行的操作組合，供 src/scripts/benchmark_db_pool.py 重放
+        self.op_mix_path = os.getenv("DB_OP_MIX_PATH", "logs/db_operations/op_mix.json")
+        
+        # 依政策設定的集合實例：(集合名稱, 是否為統計讀取) -> 集合
+        self._collections: Dict[tuple, Any] = {}
+        
+    def _collect_traffic_stats(self):
+        """彙整指令監聽器累計的流量統計"""
+        if self.command_listener is None:
+            return
+            
+        for (collection, command_name), counter in self.command_listener.drain().items():
+            stats = self.db_traffic_stats
+            stats["total_bytes_sent"] += counter["bytes_sent"]
+            stats["total_bytes_received"] += counter["bytes_received"]
+            stats["failed_operations"] += counter["failures"]
+            stats["total_duration_us"] += counter["duration_us"]
+            
+            collection_stats = stats["collection_stats"][collection]
+            collection_stats["bytes_sent"] += counter["bytes_sent"]
+            collection_stats["bytes_received"] += counter["bytes_received"]
+            collection_stats["bytes"] += counter["bytes_sent"] + counter["bytes_received"]
+            collection_stats["documents"] += counter["documents"]
+            collection_stats["failures"] += counter["failures"]
+            collection_stats["duration_us"] += counter["duration_us"]
+            
+            if command_name in READ_COMMANDS:
+                stats["read_operations"] += counter["count"]
+                collection_stats["reads"] += counter["count"]
+            elif command_name in WRITE_COMMANDS:
+                stats["write_operations"] += counter["count"]
+                collection_stats["writes"] += counter["count"]
+                
+            command_stats = stats["command_stats"][f"{collection}.{command_name}"]
+            command_stats["count"] += counter["count"]
+            command_stats["failures"] += counter["failures"]
+            command_stats["duration_us"] += counter["duration_us"]
+            self.latency_histograms[f"{collection}.{command_name}"].merge(counter["histogram"])
+            
+        if self.pool_listener is not None:
+            self.pool_wait_histogram.merge(self.pool_listener.drain())
+            
+    async def _slow_op_loop(self):
+        """定期分析監聽器記錄的慢指令"""
+        while True:
+            await asyncio.sleep(self.slow_op_explain_interval)
+            try:
+                await self._explain_slow_ops()
+            except Exception as e:
+                self.logger.error(f"分析慢指令時發生錯誤：{str(e)}")
+                
+    async def _explain_slow_ops(self):
+        """對記錄的慢指令執行 explain("executionStats") 並寫入慢指令日誌
+        
+        伺服器耗時接近指令耗時表示慢在查詢本身（索引），差距大則是網路或連線池
+        """
+        if self.command_listener is None:
+            return
+            
+        for slow_op in self.command_listener.drain_slow_ops():
+            command = slow_op.pop("explain")
+            if command is not None:
+                try:
+                    result = await self.db.command({"explain": command, "verbosity": "executionStats"})
+                    slow_op["plan"] = summarize_explain(result)
+                except Exception as e:
+                    slow_op["plan"] = {"error": str(e)}
+                    
+            self.slow_ops.append(slow_op)
+            if self._slow_op_logger is None:
+                self._slow_op_logger = setup_slow_op_logger()
+            self._slow_op_logger.info(json.dumps(slow_op, ensure_ascii=False, default=str))
+            self.logger.warning(
+                f"慢指令 {slow_op['collection']}.{slow_op['command']}：{slow_op['duration_ms']:.1f}ms，"
+                f"執行計畫：{slow_op.get('plan', {}).get('stages')}"
+            )
+            
+    async def _traffic_stats_loop(self):
+        """定期彙整並記錄資料庫流量統計"""
+        while True:
+            await asyncio.sleep(self.traffic_log_interval)
+            try:
+                self._log_traffic_stats(force=True)
+            except Exception as e:
+                self.logger.error(f"記錄資料庫流量統計時發生錯誤：{str(e)}")
+                
     def _log_traffic_stats(self, force=False):
         """記錄資料庫流量統計
         
@@ -89,6 +902,8 @@ class Database:
         time_elapsed = (now - self.last_traffic_log_time).total_seconds()
         
         if force or time_elapsed >= self.traffic_log_interval:
+            self._collect_traffic_stats()
+            
             # 計算時間區間
             duration = now - self.db_traffic_stats["start_time"]
             duration_str = str(duration).split('.')[0]  # 去除微秒部分
@@ -113,7 +928,7 @@ class Database:
             # 生成報告
             report = [
                 f"【資料庫流量統計】時間區間: {duration_str}",
-                f"總操作數: {total_operations} (讀取: {self.db_traffic_stats['read_operations']}, 寫入: {self.db_traffic_stats['write_operations']})",
+                f"總操作數: {total_operations} (讀取: {self.db_traffic_stats['read_operations']}, 寫入: {self.db_traffic_stats['write_operations']}, 失敗: {self.db_traffic_stats['failed_operations']})",
                 f"資料傳輸: 發送={format_bytes(self.db_traffic_stats['total_bytes_sent'])}, 接收={format_bytes(self.db_traffic_stats['total_bytes_received'])}",
                 f"快取命中率: {cache_hit_rate:.2f}%",
                 "各集合存取統計:"
@@ -121,18 +936,42 @@ class Database:
             
             # 添加集合統計
             for collection, stats in self.db_traffic_stats["collection_stats"].items():
-                report.append(f"  - {collection}: 讀取={stats['reads']}, 寫入={stats['writes']}, 流量={format_bytes(stats['bytes'])}")
+                report.append(
+                    f"  - {collection}: 讀取={stats['reads']}, 寫入={stats['writes']}, 失敗={stats['failures']}, "
+                    f"發送={format_bytes(stats['bytes_sent'])}, 接收={format_bytes(stats['bytes_received'])}, "
+                    f"返回文檔={stats['documents']}, "
+                    f"耗時={stats['duration_us'] / 1000:.1f}ms"
+                )
             
             # 輸出報告
             for line in report:
                 self.logger.info(line)
             
-            # 重置部分統計
-            self.db_traffic_stats["start_time"] = now
             self.last_traffic_log_time = now
             
+    def _save_op_mix(self):
+        """將本次執行各集合指令的次數寫入操作組合檔案"""
+        if not self.op_mix_path or not self.db_traffic_stats["command_stats"]:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.op_mix_path) or ".", exist_ok=True)
+            duration = datetime.now(pytz.UTC) - self.db_traffic_stats["start_time"]
+            with open(self.op_mix_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "recorded_at": datetime.now(pytz.UTC).isoformat(),
+                    "duration_seconds": int(duration.total_seconds()),
+                    "ops": {
+                        name: command["count"]
+                        for name, command in self.db_traffic_stats["command_stats"].items()
+                    }
+                }, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            self.logger.error(f"寫入操作組合檔案失敗：{str(e)}")
+            
     def _record_db_access(self, collection: str, operation_type: str, doc_count: int = 1, is_cache_hit: bool = False):
-        """記錄資料庫存取操作
+        """記錄資料庫存取的快取命中情況
+        
+        實際的資料庫流量由指令監聽器記錄，這裡只累計快取命中次數
         
         Args:
             collection: 集合名稱
@@ -140,36 +979,25 @@ class Database:
             doc_count: 文檔數量
             is_cache_hit: 是否命中快取
         """
-        # 估算文檔大小
-        doc_size = self.doc_size_estimates.get(collection, 1000)  # 默認1KB
-        total_size = doc_size * doc_count
-        
-        # 更新統計資料
         if operation_type == "read":
-            self.db_traffic_stats["read_operations"] += 1
-            self.db_traffic_stats["total_bytes_received"] += total_size
-            self.db_traffic_stats["collection_stats"][collection]["reads"] += 1
-            self.db_traffic_stats["collection_stats"][collection]["bytes"] += total_size
-            
             if is_cache_hit:
                 self.db_traffic_stats["cache_hit_count"] += 1
             else:
                 self.db_traffic_stats["cache_miss_count"] += 1
                 
-        elif operation_type == "write":
-            self.db_traffic_stats["write_operations"] += 1
-            self.db_traffic_stats["total_bytes_sent"] += total_size
-            self.db_traffic_stats["collection_stats"][collection]["writes"] += 1
-            self.db_traffic_stats["collection_stats"][collection]["bytes"] += total_size
-            
-        # 檢查是否需要記錄統計
-        self._log_traffic_stats()
-        
     @track_performance("db_initialize")
     async def initialize(self):
         """初始化資料庫連接"""
         try:
             # 建立資料庫連接
+            client_options = {}
+            if self.command_listener is not None:
+                client_options["event_listeners"] = [self.command_listener, self.pool_listener]
+            if self.compressors:
+                client_options["compressors"] = ",".join(self.compressors)
+                if "zlib" in self.compressors:
+                    client_options["zlibCompressionLevel"] = self.zlib_compression_level
+                
             self.client = motor.motor_asyncio.AsyncIOMotorClient(
                 self.config.MONGODB_URI,
                 maxPoolSize=self.max_pool_size,
@@ -178,20 +1006,36 @@ class Database:
                 serverSelectionTimeoutMS=self.server_selection_timeout_ms,
                 connectTimeoutMS=self.connection_timeout_ms,
                 retryWrites=True,
-                w="majority"  # 確保寫入成功
+                w="majority",  # 確保寫入成功
+                **client_options
             )
             self.db = self.client[self.config.MONGODB_DB_NAME]
-            
-            # 建立索引
-            await self.db.articles.create_index([("created_at", -1)])
-            await self.db.articles.create_index([("post_id", 1)], unique=True)
-            await self.db.personality_memories.create_index([("context", 1)], unique=True)
-            await self.db.posts.create_index([("post_id", 1)], unique=True)
-            await self.db.posts.create_index([("timestamp", -1)])
-            await self.db.speaking_patterns.create_index([("type", 1)], unique=True)
-            
-            # 檢查連接是否成功
-            await self.client.admin.command('ping')
+            self._collections = {}
+            
+            # 檢查結構版本，同時確認連接是否成功；版本不同時才建立索引
+            await ensure_schema(self.db)
+            self.articles_collection = await self._resolve_articles_collection()
+            
+            # 先重放上次離線時留下的寫入日誌，再接受新的寫入
+            if self.journal is not None:
+                await self.replay_journal()
+                if self._journal_task is None or self._journal_task.done():
+                    self._journal_task = asyncio.ensure_future(self._journal_replay_loop())
+            
+            # 啟動寫入佇列
+            self.write_queue.start()
+            
+            # 定期記錄流量統計
+            if self._traffic_stats_task is None or self._traffic_stats_task.done():
+                self._traffic_stats_task = asyncio.ensure_future(self._traffic_stats_loop())
+            if self.command_listener is not None and (self._slow_op_task is None or self._slow_op_task.done()):
+                self._slow_op_task = asyncio.ensure_future(self._slow_op_loop())
+                
+            # 啟動快取同步監聽器
+            if self.cache_watch_enabled:
+                if self.cache_watcher is None:
+                    self.cache_watcher = CacheWatcher(self, poll_interval=self.cache_watch_poll_interval)
+                self.cache_watcher.start()
             
             self.logger.info("資料庫連接成功")
             
@@ -205,14 +1049,306 @@ class Database:
         """關閉資料庫連接"""
         if self.client:
             try:
+                # 停止快取同步監聽器
+                if self.cache_watcher is not None:
+                    await self.cache_watcher.stop()
+                    
+                # 寫入所有待寫入的資料
+                await self.write_queue.close()
+                
+                if self._journal_task is not None:
+                    self._journal_task.cancel()
+                    self._journal_task = None
+                if self.journal is not None:
+                    await self.journal.close()
+                
+                if self._traffic_stats_task is not None:
+                    self._traffic_stats_task.cancel()
+                    self._traffic_stats_task = None
+                if self._slow_op_task is not None:
+                    self._slow_op_task.cancel()
+                    self._slow_op_task = None
+                
                 # 記錄最終的流量統計
                 self._log_traffic_stats(force=True)
+                self._save_op_mix()
                 
                 self.client.close()
                 self.logger.info("資料庫連接已關閉")
             except Exception as e:
                 self.logger.error(f"關閉資料庫連接時發生錯誤：{str(e)}")
                 
+    def _on_writes_flushed(self, collection: str, updates: Dict[Any, Dict[str, Dict[str, Any]]]):
+        """寫入佇列完成寫入後的回呼
+
+        Args:
+            collection: 集合名稱
+            updates: 已寫入的文檔鍵值 -> 更新操作
+        """
+        if collection == "daily_counters":
+            self._counter_generation += 1
+            for key, update in updates.items():
+                self.count_cache.pop(key, None)
+                # 同步最後已知的計數，資料庫離線時據此估計
+                if "count" in update.get("$set", {}):
+                    self._last_daily_counts[key] = update["$set"]["count"]
+                elif key in self._last_daily_counts:
+                    self._last_daily_counts[key] += update.get("$inc", {}).get("count", 0)
+                    
+    def _on_journaled(self, collection: str, entries: List[Dict[str, Any]]):
+        """寫入佇列將操作存入本地日誌後的回呼，記錄尚未寫入資料庫的每日計數
+
+        Args:
+            collection: 集合名稱
+            entries: 存入日誌的操作
+        """
+        for entry in entries:
+            update = entry["update"]
+            if collection == "daily_counters":
+                self._journaled_counts[entry["filter"]["_id"]] += update.get("$inc", {}).get("count", 0)
+            elif collection == self.articles_collection and update.get("$setOnInsert"):
+                # 文章重放新增後才會增加每日計數，在此之前先計入
+                self._journaled_counts[self._counter_key(update["$setOnInsert"].get("created_at"))] += 1
+                
+    async def _resolve_articles_collection(self) -> str:
+        """判斷文章所在的集合
+
+        Returns:
+            str: articles 為檢視（已合併發文記錄）時返回 posts，否則返回 articles
+        """
+        views = await self.db.list_collection_names(filter={"name": "articles", "type": "view"})
+        if views:
+            self.logger.info("articles 為 posts 的檢視，發文與文章以單一記錄寫入 posts")
+            return "posts"
+        return "articles"
+        
+    @property
+    def unified_posts(self) -> bool:
+        """發文與文章是否已合併為單一記錄"""
+        return self.articles_collection == "posts"
+        
+    def _collection(self, name: str, stats_read: bool = False):
+        """取得套用寫入確認與讀取偏好政策的集合
+
+        Args:
+            name: 集合名稱
+            stats_read: 是否為統計用途的讀取，使用 STATS_READ_POLICY 的讀取偏好
+
+        Returns:
+            AsyncIOMotorCollection: 集合實例
+        """
+        if self.offline:
+            # 資料庫離線時立即失敗，不等待伺服器選擇逾時；恢復連線由寫入日誌的重放任務判斷
+            raise DatabaseError("資料庫離線，略過資料庫操作", collection=name)
+            
+        cache_key = (name, stats_read)
+        collection = self._collections.get(cache_key)
+        if collection is None:
+            policy = {**DEFAULT_COLLECTION_POLICY, **COLLECTION_POLICIES.get(name, {})}
+            if stats_read:
+                policy.update(STATS_READ_POLICY)
+            collection = self.db[name].with_options(
+                write_concern=WriteConcern(w=policy["w"]),
+                read_preference=_read_preference(policy)
+            )
+            self._collections[cache_key] = collection
+        return collection
+        
+    def _set_offline(self, reason: str):
+        """標記資料庫離線，之後的寫入直接存入本地日誌
+
+        Args:
+            reason: 離線原因
+        """
+        if not self.offline:
+            self.offline = True
+            self.logger.warning(f"資料庫無法連線，寫入改存本地日誌：{reason}")
+            
+    async def replay_journal(self) -> int:
+        """資料庫可連線時重放本地寫入日誌並恢復線上狀態
+
+        Returns:
+            int: 重放的記錄數量
+        """
+        if not self.offline and not self.journal.has_entries():
+            return 0
+        
+        try:
+            await self.db.command("ping")
+        except ConnectionFailure:
+            return 0
+        
+        replayed = 0
+        try:
+            # 重放期間的新寫入仍存入日誌，全部重放完才恢復直接寫入，保持寫入順序
+            while self.journal.has_entries():
+                replayed += await self.journal.replay(
+                    self.db, batch_size=self.write_queue.max_batch_size, on_upserted=self._on_upserted
+                )
+        except ConnectionFailure as e:
+            self._set_offline(str(e))
+            return replayed
+        
+        # 日誌中的文章與計數已寫入資料庫
+        self._journaled_counts.clear()
+        if replayed:
+            # 每日計數可能已改變
+            self._counter_generation += 1
+            self.count_cache.clear()
+        if self.offline:
+            self.offline = False
+            self.logger.info(f"資料庫已恢復連線，重放 {replayed} 筆本地寫入日誌")
+        return replayed
+        
+    async def _journal_replay_loop(self):
+        """定期檢查資料庫是否恢復連線並重放寫入日誌"""
+        while True:
+            try:
+                await asyncio.sleep(self.journal_replay_interval)
+                await self.replay_journal()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"重放寫入日誌時發生錯誤：{str(e)}")
+                
+    def _on_upserted(self, collection: str, updates: List[Dict[str, Dict[str, Any]]]):
+        """寫入新增文檔後更新統計快照與每日發文計數
+
+        每日計數依實際新增的文章計算：文章以 $setOnInsert 寫入，重複儲存、寫入失敗
+        或因重複的內容指紋被放棄的文章都不會被計數。
+
+        Args:
+            collection: 集合名稱
+            updates: 新增文檔的更新操作
+        """
+        self._adjust_stats_snapshot(collection, len(updates))
+        if collection != self.articles_collection:
+            return
+        for update in updates:
+            article = update.get("$setOnInsert")
+            if article:
+                self._enqueue_counter_increment(article.get("created_at"), 1)
+                
+    def _pending_new_articles(self, key: str) -> int:
+        """寫入佇列中尚未寫入、屬於該日的文章數量
+
+        每日計數在文章寫入成功後才增加，寫入前以此補上，避免在寫入期間超過每日發文上限。
+        重複儲存的文章也會被計入，寫入完成後即以實際計數為準。
+
+        Args:
+            key: 計數文檔鍵值
+
+        Returns:
+            int: 文章數量
+        """
+        count = 0
+        for post_id in self.write_queue.pending_keys(self.articles_collection):
+            update = self.write_queue.get_pending_update(self.articles_collection, post_id)
+            article = update.get("$setOnInsert") if update else None
+            if article and self._counter_key(article.get("created_at")) == key:
+                count += 1
+        return count
+        
+    def _adjust_stats_snapshot(self, collection: str, amount: int):
+        """將集合文檔數量的增減放入寫入佇列
+
+        Args:
+            collection: 集合名稱
+            amount: 增減數量
+        """
+        field = STATS_SNAPSHOT_FIELDS.get(collection)
+        if field is None or not amount:
+            return
+        self.write_queue.enqueue(STATS_SNAPSHOT_COLLECTION, "_id", STATS_SNAPSHOT_ID, {"$inc": {field: amount}})
+        
+    async def get_stats_snapshot(self) -> Dict[str, int]:
+        """取得統計快照（單一文檔讀取），快照不存在時以完整計數建立
+
+        Returns:
+            Dict[str, int]: 各集合的文檔數量，包含寫入佇列中尚未寫入的增減
+        """
+        snapshot = await self._collection(STATS_SNAPSHOT_COLLECTION).find_one({"_id": STATS_SNAPSHOT_ID})
+        if snapshot is None:
+            return await self.rebuild_stats_snapshot()
+        counts = {
+            field: snapshot.get(field, 0) + self.write_queue.get_pending_increment(
+                STATS_SNAPSHOT_COLLECTION, STATS_SNAPSHOT_ID, field
+            )
+            for field in STATS_SNAPSHOT_FIELDS.values()
+        }
+        if self.unified_posts:
+            # 合併後每筆發文記錄即一篇文章，增減都記在 posts
+            counts[STATS_SNAPSHOT_FIELDS["articles"]] = counts[STATS_SNAPSHOT_FIELDS["posts"]]
+        return counts
+        
+    async def rebuild_stats_snapshot(self) -> Dict[str, int]:
+        """以完整計數重建統計快照（TTL 索引刪除的文檔不會反映在快照中，需定期重建）
+
+        Returns:
+            Dict[str, int]: 各集合的文檔數量
+        """
+        # 先寫入佇列中的增減，避免重建後重複計算
+        await self.write_queue.flush()
+        return await build_stats_snapshot(self.db)
+        
+    def add_cache_listener(self, callback):
+        """註冊其他程序修改資料時的通知函數
+        
+        Args:
+            callback: 監聽函數，參數為 (collection, key, document)
+        """
+        if self.cache_watcher is None:
+            self.cache_watcher = CacheWatcher(self, poll_interval=self.cache_watch_poll_interval)
+        self.cache_watcher.add_listener(callback)
+        
+    def _counter_key(self, day: Optional[datetime] = None) -> str:
+        """取得每日計數文檔的鍵值
+
+        Args:
+            day: 日期時間，預設為現在；以台北時間決定所屬日期
+
+        Returns:
+            str: 計數文檔鍵值，格式為 "人設:YYYY-MM-DD"
+        """
+        if day is None:
+            day = datetime.now(self.timezone)
+        elif day.tzinfo is None:
+            day = pytz.UTC.localize(day)
+        return f"{self.persona_id}:{day.astimezone(self.timezone).strftime('%Y-%m-%d')}"
+        
+    def _enqueue_counter_increment(self, day: Optional[datetime], amount: int):
+        """將每日發文計數的增減放入寫入佇列
+
+        Args:
+            day: 文章的建立時間
+            amount: 增減數量
+        """
+        key = self._counter_key(day)
+        self.write_queue.enqueue("daily_counters", "_id", key, {
+            "$setOnInsert": {"persona": self.persona_id, "day": key.rsplit(":", 1)[1]},
+            "$inc": {"count": amount}
+        })
+        
+    async def _write(self, collection: str, key_field: str, key: Any, update: Dict[str, Dict[str, Any]]) -> bool:
+        """透過寫入佇列寫入單一文檔
+
+        Args:
+            collection: 集合名稱
+            key_field: 文檔鍵值欄位
+            key: 文檔鍵值
+            update: MongoDB 更新操作
+
+        Returns:
+            bool: 是否成功；啟用 write-behind 時表示已放入佇列
+        """
+        self.write_queue.enqueue(collection, key_field, key, update)
+        if self.write_behind_enabled:
+            return True
+        
+        # 未啟用 write-behind 時立即寫入
+        await self.write_queue.flush()
+        return not self.write_queue.is_pending(collection, key)
+        
     @track_performance("db_save_post")
     async def save_post(self, post_data: dict) -> bool:
         """儲存發文資料
@@ -241,34 +1377,23 @@ class Database:
             if isinstance(post_data["timestamp"], datetime):
                 post_data["timestamp"] = post_data["timestamp"].astimezone(pytz.UTC)
             
-            # 插入資料
             if self.client is None:
                 await self.initialize()
                 
-            # 批量操作準備
-            operations = []
+            post_data["updated_at"] = datetime.now(pytz.UTC)
+            post_data.setdefault("fingerprint", content_fingerprint(post_data["content"]))
             
-            # 如果文章已存在，就更新
-            operations.append(
-                motor.motor_asyncio.UpdateOne(
-                    {"post_id": post_data["post_id"]},
-                    {"$set": post_data},
-                    upsert=True
-                )
+            # 放入寫入佇列，如果文章已存在，就更新
+            success = await self._write(
+                "posts", "post_id", post_data["post_id"], {"$set": post_data}
             )
             
-            # 執行批量操作
-            result = await self.db.posts.bulk_write(operations)
-            success = result.upserted_count > 0 or result.modified_count > 0
-            
             if success:
                 self.logger.info("成功儲存發文，ID：%s", post_data["post_id"])
                 # 更新快取
                 self.posts_cache[post_data["post_id"]] = post_data
-                self.performance_monitor.record_db_operation("insert", True)
             else:
-                self.logger.error("儲存發文失敗：無法獲取插入ID")
-                self.performance_monitor.record_db_operation("insert", False)
+                self.logger.error("儲存發文失敗：%s", post_data["post_id"])
                 
             return success
             
@@ -279,6 +1404,85 @@ class Database:
         finally:
             self.performance_monitor.end_operation("db_save_post")
             
+    @track_performance("db_save_post_record")
+    async def save_post_record(self, record: Dict[str, Any]) -> bool:
+        """以單一操作儲存發文與文章
+        
+        已合併發文記錄時只寫入一筆 posts 文檔（文章欄位以 $setOnInsert 寫入）。
+        尚未遷移時發文與文章仍是兩個集合，寫入佇列對每個集合各執行一次 bulk_write，
+        兩者並非原子寫入：其中一個失敗時會分別重試，期間兩邊的記錄可能不一致，
+        需執行 tools.py --migrate-unified-posts 才能以單一記錄寫入。
+        
+        Args:
+            record: 發文資料，需包含 post_id、content、timestamp，可包含 topics、status、sentiment 等
+            
+        Returns:
+            bool: 是否成功；啟用 write-behind 時表示已放入佇列
+        """
+        for field in ("post_id", "content", "timestamp"):
+            if field not in record:
+                self.logger.error(f"儲存發文記錄失敗：缺少必要欄位 {field}")
+                self.performance_monitor.record_db_operation("insert", False)
+                return False
+                
+        try:
+            if self.client is None:
+                await self.initialize()
+                
+            post_id = str(record["post_id"])
+            timestamp = record["timestamp"]
+            if isinstance(timestamp, datetime):
+                timestamp = timestamp.astimezone(pytz.UTC)
+            fingerprint = record.get("fingerprint") or content_fingerprint(record["content"])
+            
+            post = {
+                field: value for field, value in record.items()
+                if field not in ("topics", "created_at", "persona")
+            }
+            post.update({
+                "post_id": post_id,
+                "timestamp": timestamp,
+                "fingerprint": fingerprint,
+                "updated_at": datetime.now(pytz.UTC)
+            })
+            article = {
+                "post_id": post_id,
+                "content": record["content"],
+                "topics": record.get("topics", []),
+                "created_at": record.get("created_at", timestamp),
+                "persona": record.get("persona", self.persona_id),
+                "fingerprint": fingerprint
+            }
+            
+            if self.unified_posts:
+                success = await self._write("posts", "post_id", post_id, {
+                    "$set": post,
+                    "$setOnInsert": {field: value for field, value in article.items() if field not in post}
+                })
+                post = {**article, **post}
+                article = post
+            else:
+                # 舊的集合配置：發文與文章分別寫入（非原子）
+                self.write_queue.enqueue("articles", "post_id", post_id, {"$setOnInsert": article})
+                success = await self._write("posts", "post_id", post_id, {"$set": post})
+                if not self.write_behind_enabled:
+                    success = success and not self.write_queue.is_pending("articles", post_id)
+                
+            if not success:
+                self.logger.error("儲存發文記錄失敗：%s", post_id)
+                return False
+                
+            self.posts_cache[post_id] = post
+            self.article_cache[post_id] = article
+            self.logger.info("成功儲存發文記錄，ID：%s", post_id)
+            return True
+            
+        except Exception as e:
+            self.logger.error("儲存發文記錄失敗：%s", str(e))
+            self.performance_monitor.record_db_operation("insert", False, collection="posts",
+                                                       query=f"save_post_record(post_id={record.get('post_id')})")
+            return False
+            
     @track_performance("db_get_post_count")
     async def get_post_count(self) -> int:
         """獲取今日發文數量
@@ -286,48 +1490,133 @@ class Database:
         Returns:
             int: 今日發文數量
         """
+        return await self.get_daily_post_count()
+        
+    @track_performance("db_get_daily_post_count")
+    async def get_daily_post_count(self, day: Optional[datetime] = None) -> int:
+        """從每日計數文檔獲取發文數量
+        
+        Args:
+            day: 日期時間，預設為今日（台北時間）
+            
+        Returns:
+            int: 該日發文數量
+        """
+        key = self._counter_key(day)
         try:
             # 檢查快取
-            if "today_post_count" in self.post_count_cache:
-                self.performance_monitor.record_db_operation("query", True, True)
-                return self.post_count_cache["today_post_count"]
+            if self.offline:
+                # 資料庫離線時不查詢，以最後已知的計數加上本地日誌中尚未寫入的部分估計
+                count = self.count_cache.get(key, self._last_daily_counts.get(key, 0))
+                count += self._journaled_counts.get(key, 0)
+                self._record_db_access("daily_counters", "read", is_cache_hit=True)
+            elif key in self.count_cache:
+                count = self.count_cache[key]
+                self.performance_monitor.record_db_operation("query", True, from_cache=True,
+                                                          collection="daily_counters", query=f"find_one(_id={key})")
+                self._record_db_access("daily_counters", "read", is_cache_hit=True)
+            else:
+                if self.client is None:
+                    await self.initialize()
+                    
+                generation = self._counter_generation
+                counter = await self._collection("daily_counters").find_one({"_id": key}, {"count": 1})
+                count = counter.get("count", 0) if counter else 0
                 
-            # 計算今日發文數量
-            today_start = datetime.now(pytz.UTC).replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            today_end = today_start + timedelta(days=1)
-            
-            count = await self.count_articles_between(today_start, today_end)
-            
-            # 更新快取
-            self.post_count_cache["today_post_count"] = count
-            self.performance_monitor.record_db_operation("query", True, False)
-            
-            return count
+                # 查詢期間若有計數寫入完成，不快取可能過期的值
+                if generation == self._counter_generation:
+                    self.count_cache[key] = count
+                    self._last_daily_counts[key] = count
+                self.performance_monitor.record_db_operation("query", True, from_cache=False,
+                                                          collection="daily_counters", query=f"find_one(_id={key})")
+                self._record_db_access("daily_counters", "read")
+                
+            # 加上尚未寫入的計數與尚未寫入的文章
+            return (count + self.write_queue.get_pending_increment("daily_counters", key, "count")
+                    + self._pending_new_articles(key))
             
         except Exception as e:
-            self.logger.error(f"獲取今日發文數量時發生錯誤：{str(e)}")
-            self.performance_monitor.record_db_operation("query", False)
-            raise DatabaseError(f"獲取今日發文數量失敗：{str(e)}")
+            self.logger.error(f"獲取每日發文計數時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="daily_counters",
+                                                       query=f"find_one(_id={key})")
+            raise DatabaseError(f"獲取每日發文計數失敗：{str(e)}")
             
     @track_performance("db_increment_post_count")
     async def increment_post_count(self):
-        """增加發文計數"""
+        """增加發文計數
+        
+        每日計數在文章實際新增後寫入，此方法僅保留相容性
+        """
+        self.logger.info("發文計數已增加")
+        
+    @track_performance("db_reconcile_daily_counters")
+    async def reconcile_daily_counters(self, days: int = 7) -> Dict[str, Dict[str, int]]:
+        """依 articles 集合重建最近幾天的每日發文計數
+        
+        Args:
+            days: 要校正的天數（含今日）
+            
+        Returns:
+            Dict[str, Dict[str, int]]: 被修正的計數，鍵為日期，值包含原計數與實際數量
+        """
         try:
-            # 更新快取
-            if "today_post_count" in self.post_count_cache:
-                self.post_count_cache["today_post_count"] += 1
-            else:
-                await self.get_post_count()  # 重新載入快取
+            if self.client is None:
+                await self.initialize()
                 
-            self.logger.info("發文計數已增加")
-            self.performance_monitor.record_db_operation("update", True)
+            # 先寫入佇列中的計數，避免重複計算
+            await self.write_queue.flush()
+            
+            today_start = datetime.now(self.timezone).replace(hour=0, minute=0, second=0, microsecond=0)
+            start_time = today_start - timedelta(days=days - 1)
+            
+            # 依台北時間的日期分組計算實際文章數量
+            pipeline = [
+                {"$match": {
+                    "created_at": {"$gte": start_time},
+                    "$or": [{"persona": self.persona_id}, {"persona": {"$exists": False}}]
+                }},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at", "timezone": "Asia/Taipei"}},
+                    "count": {"$sum": 1}
+                }}
+            ]
+            actual = {}
+            async for doc in self._collection(self.articles_collection).aggregate(pipeline):
+                actual[f"{self.persona_id}:{doc['_id']}"] = doc["count"]
+                
+            keys = [self._counter_key(start_time + timedelta(days=offset)) for offset in range(days)]
+            stored = {}
+            async for doc in self._collection("daily_counters").find({"_id": {"$in": keys}}, {"count": 1}):
+                stored[doc["_id"]] = doc.get("count", 0)
+                
+            operations = []
+            corrections = {}
+            for key in keys:
+                expected = actual.get(key, 0)
+                if stored.get(key, 0) != expected:
+                    corrections[key.rsplit(":", 1)[1]] = {"stored": stored.get(key, 0), "actual": expected}
+                    operations.append(UpdateOne(
+                        {"_id": key},
+                        {"$set": {"count": expected, "persona": self.persona_id, "day": key.rsplit(":", 1)[1]}},
+                        upsert=True
+                    ))
+                    
+            if operations:
+                await self._collection("daily_counters").bulk_write(operations, ordered=False)
+                self._on_writes_flushed("daily_counters", {
+                    key: {"$set": {"count": actual.get(key, 0)}} for key in keys
+                })
+                self.logger.warning(f"已校正 {len(operations)} 筆每日發文計數：{corrections}")
+                
+            self.performance_monitor.record_db_operation("update", True, count=len(operations),
+                                                      collection="daily_counters", query=f"reconcile(days={days})")
+            return corrections
             
         except Exception as e:
-            self.logger.error(f"增加發文計數時發生錯誤：{str(e)}")
-            self.performance_monitor.record_db_operation("update", False)
-            raise DatabaseError(f"增加發文計數失敗：{str(e)}")
+            self.logger.error(f"校正每日發文計數時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="daily_counters",
+                                                       query=f"reconcile(days={days})")
+            raise DatabaseError(f"校正每日發文計數失敗：{str(e)}")
             
     @track_performance("db_get_post")
     async def get_post(self, post_id: str) -> Optional[Dict[str, Any]]:
@@ -347,10 +1636,18 @@ class Database:
                 self._record_db_access("posts", "read", is_cache_hit=True)
                 return self.posts_cache[post_id]
                 
+            # 檢查尚未寫入的資料
+            pending = self.write_queue.get_pending_document("posts", post_id)
+            if pending is not None:
+                self.performance_monitor.record_db_operation("query", True, from_cache=True,
+                                                          collection="posts", query=f"find_one(post_id={post_id})")
+                self._record_db_access("posts", "read", is_cache_hit=True)
+                return pending
+                
             if self.client is None:
                 await self.initialize()
                 
-            post = await self.db.posts.find_one({"post_id": post_id})
+            post = await self._collection("posts").find_one({"post_id": post_id})
             
             if post:
                 # 更新快取
@@ -385,7 +1682,7 @@ class Database:
             if self.client is None:
                 await self.initialize()
                 
-            cursor = self.db.posts.find().sort("timestamp", -1).limit(limit)
+            cursor = self._collection("posts").find().sort("timestamp", -1).limit(limit)
             posts = await cursor.to_list(length=limit)
             
             # 更新快取
@@ -402,12 +1699,150 @@ class Database:
                                                        query=f"find().sort().limit({limit})")
             return []
             
+    async def get_page(self, collection: str, after: Optional[Tuple[Any, Any]] = None, limit: int = 100,
+                       projection: Optional[Dict[str, Any]] = None,
+                       ascending: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, Any]]]:
+        """以 (時間, _id) 游標讀取一頁發文或文章，不使用 skip，每頁成本固定
+        
+        直接讀取資料庫，不包含寫入佇列中尚未寫入的資料，也不更新快取。
+        
+        Args:
+            collection: 集合名稱（posts 或 articles）
+            after: 上一頁返回的游標，None 表示第一頁
+            limit: 每頁數量
+            projection: 投影，游標需要的欄位會自動加入並在返回前移除
+            ascending: 是否由舊到新
+            
+        Returns:
+            Tuple: (文檔列表, 下一頁的游標；沒有下一頁時為 None)
+        """
+        field = PAGINATION_FIELDS[collection]
+        direction = 1 if ascending else -1
+        query = {}
+        if after is not None:
+            value, last_id = after
+            operator = "$gt" if ascending else "$lt"
+            query = {"$or": [{field: {operator: value}}, {field: value, "_id": {operator: last_id}}]}
+        fields, strip = _page_projection(projection, field)
+        
+        try:
+            if self.client is None:
+                await self.initialize()
+                
+            cursor = self._collection(collection).find(query, fields).sort(
+                [(field, direction), ("_id", direction)]
+            ).limit(limit)
+            documents = await cursor.to_list(length=limit)
+            self.performance_monitor.record_db_operation("query", True, count=len(documents), collection=collection,
+                                                      query=f"find(keyset).sort({field}, _id).limit({limit})")
+        except Exception as e:
+            self.logger.error(f"分頁讀取 {collection} 失敗：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection=collection,
+                                                       query=f"find(keyset).sort({field}, _id).limit({limit})")
+            raise DatabaseError(f"分頁讀取失敗：{str(e)}", collection=collection, operation="query")
+            
+        next_after = None
+        if len(documents) == limit:
+            next_after = (documents[-1].get(field), documents[-1]["_id"])
+        for document in documents:
+            for key in strip:
+                document.pop(key, None)
+        return documents, next_after
+        
+    async def iter_documents(self, collection: str, batch_size: int = 100,
+                             projection: Optional[Dict[str, Any]] = None, after: Optional[Tuple[Any, Any]] = None,
+                             ascending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """逐頁串流讀取集合中的所有發文或文章
+        
+        Args:
+            collection: 集合名稱（posts 或 articles）
+            batch_size: 每頁數量
+            projection: 投影
+            after: 起始游標，None 表示從頭開始
+            ascending: 是否由舊到新
+            
+        Yields:
+            Dict[str, Any]: 文檔
+        """
+        while True:
+            documents, after = await self.get_page(collection, after, batch_size, projection, ascending)
+            for document in documents:
+                yield document
+            if after is None:
+                break
+                
+    def iter_posts(self, batch_size: int = 100, projection: Optional[Dict[str, Any]] = None,
+                   ascending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """依 (timestamp, _id) 串流讀取所有發文"""
+        return self.iter_documents("posts", batch_size, projection, ascending=ascending)
+        
+    def iter_articles(self, batch_size: int = 100, projection: Optional[Dict[str, Any]] = None,
+                      ascending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """依 (created_at, _id) 串流讀取所有文章"""
+        return self.iter_documents("articles", batch_size, projection, ascending=ascending)
+        
+    @track_performance("db_get_recent_fingerprints")
+    async def get_recent_fingerprints(self, limit: int = 1000) -> List[str]:
+        """獲取最近文章的內容指紋
+        
+        Args:
+            limit: 返回的最大數量
+            
+        Returns:
+            List[str]: 內容指紋列表
+        """
+        try:
+            cursor = self._collection(self.articles_collection).find(
+                {}, {"_id": 0, "fingerprint": 1, "content": 1}
+            ).sort("created_at", -1).limit(limit)
+            fingerprints = []
+            async for article in cursor:
+                # 舊資料可能尚未記錄指紋
+                fingerprint = article.get("fingerprint")
+                if fingerprint is None and article.get("content"):
+                    fingerprint = content_fingerprint(article["content"])
+                if fingerprint:
+                    fingerprints.append(fingerprint)
+                    
+            self.performance_monitor.record_db_operation("query", True, from_cache=False, count=len(fingerprints),
+                                                      collection="articles", query=f"find(fingerprint).limit({limit})")
+            return fingerprints
+        except Exception as e:
+            self.logger.error(f"獲取內容指紋時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="articles",
+                                                       query=f"find(fingerprint).limit({limit})")
+            raise DatabaseError(f"獲取內容指紋失敗：{str(e)}")
+            
+    @track_performance("db_has_content_fingerprint")
+    async def has_content_fingerprint(self, fingerprint: str) -> bool:
+        """檢查是否已有相同內容指紋的發文或文章
+        
+        Args:
+            fingerprint: 內容指紋
+            
+        Returns:
+            bool: 是否存在
+        """
+        try:
+            collections = list(dict.fromkeys((self.articles_collection, "posts")))
+            results = await asyncio.gather(*[
+                self._collection(collection).find_one({"fingerprint": fingerprint}, {"_id": 1})
+                for collection in collections
+            ])
+            self.performance_monitor.record_db_operation("query", True, from_cache=False, count=len(collections),
+                                                      collection="articles", query=f"find_one(fingerprint={fingerprint})")
+            return any(result is not None for result in results)
+        except Exception as e:
+            self.logger.error(f"檢查內容指紋時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="articles",
+                                                       query=f"find_one(fingerprint={fingerprint})")
+            raise DatabaseError(f"檢查內容指紋失敗：{str(e)}")
+            
     @track_performance("db_clear_cache")
     async def clear_cache(self):
         """清除所有快取"""
         self.posts_cache.clear()
         self.count_cache.clear()
-        self.post_count_cache.clear()
         self.article_cache.clear()
         self.personality_cache.clear()
         self.pattern_cache.clear()
@@ -429,17 +1864,16 @@ class Database:
                 self.performance_monitor.record_db_operation("query", True, from_cache=True)
                 return self.personality_cache[context]
                 
-            # 查詢資料庫
-            memory = await self.db.personality_memories.find_one({"context": context})
-            
-            # 更新快取
-            if memory:
-                self.personality_cache[context] = memory
-                self.performance_monitor.record_db_operation("query", True, from_cache=False)
-            else:
+            # 查詢資料庫，同一上下文的並行查詢只送出一次
+            async def load():
+                memory = await self._collection("personality_memories").find_one({"context": context})
+                # 查詢期間已有新寫入時保留快取中的新值
+                if memory:
+                    self.personality_cache.setdefault(context, memory)
                 self.performance_monitor.record_db_operation("query", True, from_cache=False)
+                return memory
                 
-            return memory
+            return await self.single_flight.do("personality_memories", context, load)
             
         except Exception as e:
             self.logger.error(f"獲取人設記憶時發生錯誤：{str(e)}")
@@ -455,17 +1889,14 @@ class Database:
             memory: 人設記憶
         """
         try:
-            # 更新資料庫
-            await self.db.personality_memories.update_one(
-                {"context": context},
-                {"$set": memory},
-                upsert=True
-            )
+            # 放入寫入佇列
+            memory = {**memory, "updated_at": datetime.now(pytz.UTC)}
+            if not await self._write("personality_memories", "context", context, {"$set": memory}):
+                raise DatabaseError("寫入失敗", collection="personality_memories", operation="update")
             
             # 更新快取
             self.personality_cache[context] = memory
             self.logger.info(f"人設記憶儲存成功：{context}")
-            self.performance_monitor.record_db_operation("update", True)
             
         except Exception as e:
             self.logger.error(f"儲存人設記憶時發生錯誤：{str(e)}")
@@ -480,12 +1911,15 @@ class Database:
             article: 文章資料
         """
         try:
-            await self.db.articles.insert_one(article)
+            article.setdefault("persona", self.persona_id)
+            if "content" in article:
+                article.setdefault("fingerprint", content_fingerprint(article["content"]))
+            
+            # 以 $setOnInsert 寫入，重複儲存同一篇文章不會覆蓋原有資料；每日計數於實際新增後增加
+            if not await self._write(self.articles_collection, "post_id", article["post_id"], {"$setOnInsert": article}):
+                raise DatabaseError("寫入失敗", collection="articles", operation="insert")
             self.article_cache[article["post_id"]] = article
             self.logger.info(f"文章儲存成功：{article['post_id']}")
-            self.performance_monitor.record_db_operation("insert", True, collection="articles",
-                                                       query=f"insert_one(post_id={article['post_id']})")
-            self._record_db_access("articles", "write")
         except Exception as e:
             self.logger.error(f"儲存文章時發生錯誤：{str(e)}")
             self.performance_monitor.record_db_operation("insert", False, collection="articles",
@@ -510,21 +1944,31 @@ class Database:
                 self._record_db_access("articles", "read", is_cache_hit=True)
                 return self.article_cache[post_id]
                 
-            # 查詢資料庫
-            article = await self.db.articles.find_one({"post_id": post_id})
-            
-            # 更新快取
-            if article:
-                self.article_cache[post_id] = article
-                self.performance_monitor.record_db_operation("query", True, from_cache=False,
-                                                          collection="articles", query=f"find_one(post_id={post_id})")
-                self._record_db_access("articles", "read")
-            else:
-                self.performance_monitor.record_db_operation("query", True, from_cache=False,
+            # 檢查尚未寫入的資料
+            pending = self.write_queue.get_pending_document(self.articles_collection, post_id)
+            if pending is not None:
+                self.performance_monitor.record_db_operation("query", True, from_cache=True,
                                                           collection="articles", query=f"find_one(post_id={post_id})")
-                self._record_db_access("articles", "read", doc_count=0)
+                self._record_db_access("articles", "read", is_cache_hit=True)
+                return pending
+                
+            # 查詢資料庫，同一文章的並行查詢只送出一次
+            async def load():
+                article = await self._collection(self.articles_collection).find_one({"post_id": post_id})
                 
-            return article
+                # 更新快取
+                if article:
+                    self.article_cache.setdefault(post_id, article)
+                    self.performance_monitor.record_db_operation("query", True, from_cache=False,
+                                                              collection="articles", query=f"find_one(post_id={post_id})")
+                    self._record_db_access("articles", "read")
+                else:
+                    self.performance_monitor.record_db_operation("query", True, from_cache=False,
+                                                              collection="articles", query=f"find_one(post_id={post_id})")
+                    self._record_db_access("articles", "read", doc_count=0)
+                return article
+                
+            return await self.single_flight.do("articles", post_id, load)
             
         except Exception as e:
             self.logger.error(f"獲取文章時發生錯誤：{str(e)}")
@@ -544,7 +1988,7 @@ class Database:
             int: 文章數量
         """
         try:
-            count = await self.db.articles.count_documents({
+            count = await self._collection(self.articles_collection).count_documents({
                 "created_at": {
                     "$gte": start_time,
                     "$lt": end_time
@@ -569,24 +2013,34 @@ class Database:
         """
         try:
             # 獲取最舊的文章
-            cursor = self.db.articles.find().sort("created_at", 1).limit(count)
+            cursor = self._collection(self.articles_collection).find(
+                {"created_at": {"$exists": True}}, {"post_id": 1, "created_at": 1}
+            ).sort("created_at", 1).limit(count)
             
             # 收集要刪除的 IDs
             article_ids = []
             post_ids = []
+            created_times = []
             async for article in cursor:
                 article_ids.append(article["_id"])
                 post_ids.append(article["post_id"])
+                created_times.append(article.get("created_at"))
             
             # 批量刪除
             if article_ids:
-                result = await self.db.articles.delete_many({"_id": {"$in": article_ids}})
+                result = await self._collection(self.articles_collection).delete_many({"_id": {"$in": article_ids}})
                 deleted_count = result.deleted_count
                 
                 # 從快取中刪除
                 for post_id in post_ids:
                     if post_id in self.article_cache:
                         del self.article_cache[post_id]
+                        
+                # 扣除每日發文計數
+                for created_at in created_times:
+                    if isinstance(created_at, datetime):
+                        self._enqueue_counter_increment(created_at, -1)
+                self._adjust_stats_snapshot(self.articles_collection, -deleted_count)
                 
                 self.performance_monitor.record_db_operation("update", True)
                 return deleted_count
@@ -598,21 +2052,27 @@ class Database:
             raise DatabaseError(f"刪除文章失敗：{str(e)}")
             
     @track_performance("db_get_user_history")
-    async def get_user_history(self, user_id: str) -> Dict[str, Any]:
+    async def get_user_history(self, user_id: str, last_n: Optional[int] = None) -> Dict[str, Any]:
         """獲取用戶歷史記錄
         
         Args:
             user_id: 用戶 ID
+            last_n: 最多返回的對話筆數，預設為 MEMORY_CONFIG['max_history']
             
         Returns:
             Dict[str, Any]: 用戶歷史記錄
         """
         try:
-            history = await self.db.user_history.find_one({"user_id": user_id})
-            if history:
-                self.performance_monitor.record_db_operation("query", True)
-            else:
-                self.performance_monitor.record_db_operation("query", True)
+            last_n = last_n or self.memory_max_history
+            # 只傳回最近幾輪對話
+            history = await self._collection("user_history").find_one(
+                {"user_id": user_id}, {"conversations": {"$slice": -last_n}}
+            )
+            history = self.write_queue.apply_pending("user_history", user_id, history)
+            if history and len(history.get("conversations", [])) > last_n:
+                history["conversations"] = history["conversations"][-last_n:]
+            self.performance_monitor.record_db_operation("query", True, collection="user_history",
+                                                      query=f"find_one(user_id={user_id}, slice={last_n})")
             return history or {"conversations": []}
         except Exception as e:
             self.logger.error(f"獲取用戶歷史記錄時發生錯誤：{str(e)}")
@@ -628,38 +2088,68 @@ class Database:
             history: 歷史記錄
         """
         try:
-            await self.db.user_history.update_one(
-                {"user_id": user_id},
-                {"$set": history},
-                upsert=True
-            )
+            if not await self._write("user_history", "user_id", user_id, {"$set": history}):
+                raise DatabaseError("寫入失敗", collection="user_history", operation="update")
             self.logger.info(f"用戶歷史記錄儲存成功：{user_id}")
-            self.performance_monitor.record_db_operation("update", True)
         except Exception as e:
             self.logger.error(f"儲存用戶歷史記錄時發生錯誤：{str(e)}")
             self.performance_monitor.record_db_operation("update", False)
             raise DatabaseError(f"儲存用戶歷史記錄失敗：{str(e)}")
             
-    @track_performance("db_cleanup")
-    async def cleanup_old_data(self, days: int = 30):
-        """清理舊資料
+    @track_performance("db_append_user_interaction")
+    async def append_user_interaction(self, user_id: str, entry: Dict[str, Any]):
+        """附加一筆用戶對話，只保留最近 MEMORY_CONFIG['max_records'] 筆
         
         Args:
-            days: 保留的天數，預設30天
+            user_id: 用戶 ID
+            entry: 對話記錄
+        """
+        await self.append_user_interactions({user_id: [entry]})
+        
+    @track_performance("db_append_user_interactions")
+    async def append_user_interactions(self, interactions: Dict[str, List[Dict[str, Any]]]):
+        """批量附加多位用戶的對話，合併為單次批量寫入
+        
+        Args:
+            interactions: 用戶 ID -> 依時間排序的對話記錄
         """
         try:
-            cutoff_date = datetime.now(pytz.UTC) - timedelta(days=days)
+            now = datetime.now(pytz.UTC)
+            for user_id, entries in interactions.items():
+                entries = [{"timestamp": now, **entry} for entry in entries]
+                self.write_queue.enqueue("user_history", "user_id", user_id, {
+                    "$push": {"conversations": {"$each": entries, "$slice": -self.memory_max_records}},
+                    "$set": {"updated_at": now}
+                })
+                
+            if not self.write_behind_enabled:
+                await self.write_queue.flush()
+                failed = [user_id for user_id in interactions if self.write_queue.is_pending("user_history", user_id)]
+                if failed:
+                    raise DatabaseError(f"寫入失敗：{failed}", collection="user_history", operation="update")
+        except Exception as e:
+            self.logger.error(f"附加用戶對話時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="user_history")
+            raise DatabaseError(f"附加用戶對話失敗：{str(e)}")
             
-            # 刪除舊文章
-            result = await self.db.articles.delete_many({"created_at": {"$lt": cutoff_date}})
+    @track_performance("db_cleanup")
+    async def cleanup_old_data(self, days: Optional[int] = None) -> int:
+        """依保留設定清理舊資料
+        
+        Args:
+            days: 文章保留的天數，預設使用 DB_RETENTION_ARTICLES_DAYS
             
-            # 清理快取中可能的舊資料
-            await self.clear_cache()
+        Returns:
+            int: 刪除的資料筆數
+        """
+        try:
+            results = await self.retention.run({"articles": days} if days is not None else None)
+            deleted_count = sum(results.values())
             
-            self.logger.info(f"已清理 {result.deleted_count} 筆舊文章資料")
+            self.logger.info(f"已清理 {deleted_count} 筆舊資料")
             self.performance_monitor.record_db_operation("update", True)
             
-            return result.deleted_count
+            return deleted_count
         except Exception as e:
             self.logger.error(f"清理舊資料時發生錯誤：{str(e)}")
             self.performance_monitor.record_db_operation("update", False)
@@ -674,11 +2164,24 @@ class Database:
         try:
             stats = {}
             
-            # 文章數量
-            stats["articles_count"] = await self.db.articles.count_documents({})
-            
-            # 用戶數量
-            stats["users_count"] = await self.db.user_history.count_documents({})
+            # 文檔數量取自統計快照；estimated_document_count 只讀取集合中繼資料，作為交叉核對
+            # 合併發文記錄後 articles 為檢視，沒有集合中繼資料可讀取
+            collections = [
+                collection for collection in STATS_SNAPSHOT_FIELDS
+                if not (self.unified_posts and collection == "articles")
+            ]
+            snapshot, *estimated = await asyncio.gather(
+                self.get_stats_snapshot(),
+                *[self._collection(collection, stats_read=True).estimated_document_count() for collection in collections]
+            )
+            stats.update(snapshot)
+            stats["estimated_counts"] = {
+                STATS_SNAPSHOT_FIELDS[collection]: count for collection, count in zip(collections, estimated)
+            }
+            stats["snapshot_drift"] = {
+                field: count - snapshot[field]
+                for field, count in stats["estimated_counts"].items() if count != snapshot[field]
+            }
             
             # 文章內存佔用
             stats["cache"] = {
@@ -688,12 +2191,38 @@ class Database:
                 "pattern_cache_size": len(self.pattern_cache)
             }
             
+            # 寫入佇列統計
+            stats["write_queue"] = self.write_queue.get_stats()
+            
+            # 並行查詢合併統計
+            stats["single_flight"] = self.single_flight.get_stats()
+            
+            # 本地寫入日誌統計
+            if self.journal is not None:
+                stats["journal"] = {**self.journal.get_stats(), "offline": self.offline}
+            
+            # 快取同步統計
+            if self.cache_watcher is not None:
+                stats["cache_watcher"] = self.cache_watcher.get_stats()
+            
             # 流量統計
+            self._collect_traffic_stats()
+            total_operations = sum(
+                command["count"] for command in self.db_traffic_stats["command_stats"].values()
+            )
             stats["traffic"] = {
                 "total_bytes_sent": self.db_traffic_stats["total_bytes_sent"],
                 "total_bytes_received": self.db_traffic_stats["total_bytes_received"],
                 "read_operations": self.db_traffic_stats["read_operations"],
                 "write_operations": self.db_traffic_stats["write_operations"],
+                "failed_operations": self.db_traffic_stats["failed_operations"],
+                "avg_duration_ms": (
+                    self.db_traffic_stats["total_duration_us"] / total_operations / 1000
+                ) if total_operations > 0 else 0,
+                "collections": {
+                    collection: dict(collection_stats)
+                    for collection, collection_stats in self.db_traffic_stats["collection_stats"].items()
+                },
                 "cache_hit_rate": (
                     self.db_traffic_stats["cache_hit_count"] / (
                         self.db_traffic_stats["cache_hit_count"] + self.db_traffic_stats["cache_miss_count"]
@@ -701,6 +2230,13 @@ class Database:
                 ) if (self.db_traffic_stats["cache_hit_count"] + self.db_traffic_stats["cache_miss_count"]) > 0 else 0
             }
             
+            # 耗時分佈與慢指令
+            stats["latency"] = {
+                name: histogram.summary() for name, histogram in self.latency_histograms.items()
+            }
+            stats["pool_wait"] = self.pool_wait_histogram.summary()
+            stats["slow_ops"] = list(self.slow_ops)
+            
             # 性能監控器指標
             stats["performance"] = self.performance_monitor.summary()
             
@@ -719,7 +2255,7 @@ class Database:
         """
         try:
             # 更新資料庫
-            await self.db.speaking_patterns.update_one(
+            await self._collection("speaking_patterns").update_one(
                 {"type": pattern_type},
                 {"$set": {
                     **data,
@@ -763,21 +2299,23 @@ class Database:
                 self._record_db_access("speaking_patterns", "read", is_cache_hit=True)
                 return self.pattern_cache[pattern_type]
                 
-            # 查詢資料庫
-            pattern = await self.db.speaking_patterns.find_one({"type": pattern_type})
-            
-            # 更新快取
-            if pattern:
-                self.pattern_cache[pattern_type] = pattern
-                self.performance_monitor.record_db_operation("query", True, from_cache=False,
-                                                          collection="speaking_patterns", query=f"find_one(type={pattern_type})")
-                self._record_db_access("speaking_patterns", "read")
-            else:
-                self.performance_monitor.record_db_operation("query", True, from_cache=False,
-                                                          collection="speaking_patterns", query=f"find_one(type={pattern_type})")
-                self._record_db_access("speaking_patterns", "read", doc_count=0)
+            # 查詢資料庫，同一類型的並行查詢只送出一次
+            async def load():
+                pattern = await self._collection("speaking_patterns").find_one({"type": pattern_type})
+                
+                # 更新快取
+                if pattern:
+                    self.pattern_cache.setdefault(pattern_type, pattern)
+                    self.performance_monitor.record_db_operation("query", True, from_cache=False,
+                                                              collection="speaking_patterns", query=f"find_one(type={pattern_type})")
+                    self._record_db_access("speaking_patterns", "read")
+                else:
+                    self.performance_monitor.record_db_operation("query", True, from_cache=False,
+                                                              collection="speaking_patterns", query=f"find_one(type={pattern_type})")
+                    self._record_db_access("speaking_patterns", "read", doc_count=0)
+                return pattern
                 
-            return pattern
+            return await self.single_flight.do("speaking_patterns", pattern_type, load)
             
         except Exception as e:
             self.logger.error(f"獲取說話模式時發生錯誤：{str(e)}")
@@ -821,7 +2359,7 @@ class Database:
             if self.client is None:
                 await self.initialize()
                 
-            cursor = self.db.speaking_patterns.find({"type": {"$in": remaining_types}})
+            cursor = self._collection("speaking_patterns").find({"type": {"$in": remaining_types}})
             patterns = await cursor.to_list(length=None)
             
             # 更新結果和快取
@@ -879,7 +2417,7 @@ class Database:
             
             for pattern_type, data in patterns_data.items():
                 operations.append(
-                    motor.motor_asyncio.UpdateOne(
+                    UpdateOne(
                         {"type": pattern_type},
                         {"$set": {
                             **data,
@@ -898,7 +2436,7 @@ class Database:
             
             # 執行批量操作
             if operations:
-                result = await self.db.speaking_patterns.bulk_write(operations)
+                result = await self._collection("speaking_patterns").bulk_write(operations)
                 success = (result.modified_count + result.upserted_count) == len(operations)
                 
                 if success:
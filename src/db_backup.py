@@ -0,0 +1,313 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 資料庫備份與還原，串流匯出/匯入壓縮的 NDJSON 檔案
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 以固定批次大小的游標串流匯出集合，記憶體用量不隨集合大小增加
+- 支援 gzip 與 zstd (需安裝 zstandard) 壓縮
+- 並行批量匯入，以自然鍵 upsert，可重複執行
+- 略過檢視（合併發文記錄後的 articles），資料已包含在來源集合中
+- 以自然鍵匯入時保留原本的 _id
+"""
+
+import asyncio
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pytz
+from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import ReplaceOne, UpdateOne
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 備份的集合與其自然鍵
+BACKUP_COLLECTIONS = {
+    "posts": "post_id",
+    "articles": "post_id",
+    "user_history": "user_id",
+    "personality_memories": "context",
+    "speaking_patterns": "type"
+}
+
+DEFAULT_BACKUP_DIR = os.path.join("data", "backups")
+MANIFEST_FILE = "manifest.json"
+FILE_EXTENSIONS = {"gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+logger = logging.getLogger(__name__)
+
+
+def _open_writer(path: str, compression: str):
+    """開啟壓縮的文字寫入串流
+
+    Args:
+        path: 檔案路徑
+        compression: 壓縮格式 (gzip/zstd)
+
+    Returns:
+        文字寫入串流
+    """
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("使用 zstd 壓縮需要安裝 zstandard 套件")
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=3).stream_writer(raw), encoding="utf-8")
+    raise ValueError(f"不支援的壓縮格式：{compression}")
+
+
+def _open_reader(path: str):
+    """依副檔名開啟壓縮的文字讀取串流
+
+    Args:
+        path: 檔案路徑
+
+    Returns:
+        文字讀取串流
+    """
+    if path.endswith(FILE_EXTENSIONS["gzip"]):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(FILE_EXTENSIONS["zstd"]):
+        if zstandard is None:
+            raise RuntimeError("讀取 zstd 壓縮檔需要安裝 zstandard 套件")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    raise ValueError(f"無法辨識的備份檔案格式：{path}")
+
+
+def _read_lines(reader, count: int) -> List[str]:
+    """讀取最多 count 行（於執行緒中執行）"""
+    lines = []
+    for line in reader:
+        if line.strip():
+            lines.append(line)
+            if len(lines) >= count:
+                break
+    return lines
+
+
+async def export_collection(db, collection: str, path: str, compression: str = "gzip",
+                            batch_size: int = 1000) -> Dict[str, Any]:
+    """串流匯出單一集合
+
+    Args:
+        db: 資料庫實例
+        collection: 集合名稱
+        path: 輸出檔案路徑
+        compression: 壓縮格式
+        batch_size: 每批讀取與寫入的文檔數量
+
+    Returns:
+        Dict[str, Any]: 匯出統計，包含文檔數、位元組數與每秒文檔數
+    """
+    loop = asyncio.get_running_loop()
+    # RawBSONDocument 讓游標不需先把每筆文檔轉為 dict
+    source = db.get_collection(collection, codec_options=CodecOptions(document_class=RawBSONDocument))
+    cursor = source.find({}, batch_size=batch_size)
+
+    writer = await loop.run_in_executor(None, _open_writer, path, compression)
+    started = time.monotonic()
+    documents = 0
+    raw_bytes = 0
+    pending_write = None
+
+    try:
+        batch = []
+        async for document in cursor:
+            raw_bytes += len(document.raw)
+            batch.append(json_util.dumps(document, json_options=json_util.CANONICAL_JSON_OPTIONS))
+            if len(batch) >= batch_size:
+                # 同時最多只有一批在寫入，讀取與壓縮可以重疊
+                if pending_write is not None:
+                    await pending_write
+                pending_write = loop.run_in_executor(None, writer.write, "\n".join(batch) + "\n")
+                documents += len(batch)
+                batch = []
+
+        if pending_write is not None:
+            await pending_write
+        if batch:
+            await loop.run_in_executor(None, writer.write, "\n".join(batch) + "\n")
+            documents += len(batch)
+    finally:
+        await loop.run_in_executor(None, writer.close)
+
+    elapsed = time.monotonic() - started
+    stats = {
+        "collection": collection,
+        "file": os.path.basename(path),
+        "documents": documents,
+        "bson_bytes": raw_bytes,
+        "file_bytes": os.path.getsize(path),
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(documents / elapsed, 1) if elapsed > 0 else documents
+    }
+    logger.info(f"匯出 {collection}：{documents} 筆，{stats['docs_per_second']} docs/s")
+    return stats
+
+
+async def export_database(db, output_dir: str = DEFAULT_BACKUP_DIR, compression: str = "gzip",
+                          collections: Optional[List[str]] = None, batch_size: int = 1000) -> Dict[str, Any]:
+    """匯出多個集合到新的備份目錄
+
+    Args:
+        db: 資料庫實例
+        output_dir: 備份根目錄
+        compression: 壓縮格式 (gzip/zstd)
+        collections: 要匯出的集合，預設為所有備份集合
+        batch_size: 每批讀取與寫入的文檔數量
+
+    Returns:
+        Dict[str, Any]: 備份清單 (manifest)
+    """
+    collections = collections or list(BACKUP_COLLECTIONS.keys())
+    views = set(await db.list_collection_names(filter={"type": "view"}))
+    collections = [collection for collection in collections if collection not in views]
+    started_at = datetime.now(pytz.UTC)
+    backup_dir = os.path.join(output_dir, started_at.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(backup_dir, exist_ok=True)
+
+    results = await asyncio.gather(*[
+        export_collection(
+            db, collection,
+            os.path.join(backup_dir, collection + FILE_EXTENSIONS[compression]),
+            compression, batch_size
+        )
+        for collection in collections
+    ])
+
+    manifest = {
+        "created_at": started_at.isoformat(),
+        "compression": compression,
+        "collections": {result["collection"]: result for result in results}
+    }
+    with open(os.path.join(backup_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    manifest["path"] = backup_dir
+    return manifest
+
+
+async def import_collection(db, collection: str, path: str, batch_size: int = 1000,
+                            concurrency: int = 4) -> Dict[str, Any]:
+    """串流匯入單一集合，以自然鍵 upsert
+
+    有自然鍵的集合以 $set 寫入備份中的欄位，新增的文檔使用備份中原本的 _id；
+    已存在的文檔保留目前的 _id（_id 不可變更）。
+
+    Args:
+        db: 資料庫實例
+        collection: 集合名稱
+        path: 備份檔案路徑
+        batch_size: 每批寫入的文檔數量
+        concurrency: 同時進行的批量寫入數量
+
+    Returns:
+        Dict[str, Any]: 匯入統計
+    """
+    loop = asyncio.get_running_loop()
+    key_field = BACKUP_COLLECTIONS.get(collection)
+    reader = await loop.run_in_executor(None, _open_reader, path)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+    errors = []
+    started = time.monotonic()
+    documents = 0
+
+    async def write_batch(operations):
+        try:
+            await db[collection].bulk_write(operations, ordered=False)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            semaphore.release()
+
+    try:
+        while not errors:
+            # 先取得寫入名額再讀取下一批，控制記憶體中的批次數量
+            await semaphore.acquire()
+            lines = await loop.run_in_executor(None, _read_lines, reader, batch_size)
+            if not lines:
+                semaphore.release()
+                break
+
+            operations = []
+            for line in lines:
+                document = json_util.loads(line)
+                if key_field and key_field in document:
+                    # 保留原本的 _id，以 (時間, _id) 分頁的游標在還原後仍然有效；已存在的文檔 _id 不可變更
+                    document_id = document.pop("_id", None)
+                    update = {"$set": document}
+                    if document_id is not None:
+                        update["$setOnInsert"] = {"_id": document_id}
+                    operations.append(UpdateOne({key_field: document[key_field]}, update, upsert=True))
+                else:
+                    operations.append(ReplaceOne({"_id": document["_id"]}, document, upsert=True))
+
+            documents += len(operations)
+            task = asyncio.ensure_future(write_batch(operations))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        await loop.run_in_executor(None, reader.close)
+
+    if errors:
+        raise errors[0]
+
+    elapsed = time.monotonic() - started
+    stats = {
+        "collection": collection,
+        "documents": documents,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(documents / elapsed, 1) if elapsed > 0 else documents
+    }
+    logger.info(f"匯入 {collection}：{documents} 筆，{stats['docs_per_second']} docs/s")
+    return stats
+
+
+async def import_database(db, backup_dir: str, collections: Optional[List[str]] = None,
+                          batch_size: int = 1000, concurrency: int = 4) -> Dict[str, Dict[str, Any]]:
+    """從備份目錄匯入多個集合
+
+    Args:
+        db: 資料庫實例
+        backup_dir: 備份目錄
+        collections: 要匯入的集合，預設為備份中的所有集合
+        batch_size: 每批寫入的文檔數量
+        concurrency: 每個集合同時進行的批量寫入數量
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 各集合的匯入統計
+    """
+    with open(os.path.join(backup_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    entries = manifest["collections"]
+    if collections:
+        entries = {name: entry for name, entry in entries.items() if name in collections}
+    views = set(await db.list_collection_names(filter={"type": "view"}))
+    for name in views.intersection(entries):
+        logger.warning(f"{name} 為檢視，無法匯入，已略過")
+    entries = {name: entry for name, entry in entries.items() if name not in views}
+
+    results = await asyncio.gather(*[
+        import_collection(db, name, os.path.join(backup_dir, entry["file"]), batch_size, concurrency)
+        for name, entry in entries.items()
+    ])
+    return {result["collection"]: result for result in results}
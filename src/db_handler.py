@@ -12,15 +12,27 @@ Changes:
 - 新增資料庫索引優化
 - 加強資料完整性檢查
 - 改進文章儲存流程
+- 新增發文記錄儲存介面
+- 今日發文數量改由每日計數文檔讀取
+- 新增快取變更監聽註冊介面
+- 支援以設定選擇 SQLite 資料庫後端
+- 新增依保留設定清理舊資料的介面
+- 發文前以內容指紋檢查重複內容
+- 新增附加用戶對話的介面
+- 新增發文與文章的游標分頁串流讀取介面
+- 新增以單一操作儲存發文與文章的介面
+- 重複內容檢查改以所有發文與文章的指紋預熱
 """
 
 import logging
 import os
 from datetime import datetime, timedelta
 import pytz
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator
 from src.config import Config
 from src.database import Database
+from src.sqlite_database import SQLiteDatabase
+from src.content_fingerprint import DuplicateGuard, content_fingerprint
 
 class DatabaseHandler:
     """資料庫處理器"""
@@ -35,17 +47,51 @@ class DatabaseHandler:
         self.database = None
         self.logger = logging.getLogger(__name__)
         self.timezone = pytz.timezone("Asia/Taipei")
+        self.duplicate_guard = DuplicateGuard()
         
     async def initialize(self):
         """初始化資料庫連接"""
         try:
-            self.database = Database(self.config)
+            # 依設定選擇資料庫後端
+            if getattr(self.config, "DB_BACKEND", "mongodb") == "sqlite":
+                self.database = SQLiteDatabase(self.config)
+            else:
+                self.database = Database(self.config)
             await self.database.initialize()
             self.logger.info("資料庫連接成功")
+            
+            # 以所有發文與文章預熱重複內容檢查；失敗時每次發文前都查詢資料庫
+            if hasattr(self.database, 'iter_posts'):
+                try:
+                    self.duplicate_guard.warm(await self._collect_fingerprints())
+                except Exception as e:
+                    self.logger.warning(f"預熱重複內容檢查失敗，改為每次查詢資料庫：{str(e)}")
         except Exception as e:
             self.logger.error(f"資料庫連接失敗：{str(e)}")
             raise
             
+    async def _collect_fingerprints(self) -> List[str]:
+        """串流讀取所有發文與文章的內容指紋，與資料庫的唯一索引涵蓋相同範圍
+
+        Returns:
+            List[str]: 內容指紋
+        """
+        sources = [self.database.iter_posts]
+        # 合併發文記錄後文章即發文記錄
+        if not getattr(self.database, 'unified_posts', False):
+            sources.append(self.database.iter_articles)
+            
+        fingerprints = []
+        for iterate in sources:
+            async for document in iterate(batch_size=1000, projection={"fingerprint": 1, "content": 1}):
+                # 舊資料可能尚未記錄指紋
+                fingerprint = document.get("fingerprint")
+                if fingerprint is None and document.get("content"):
+                    fingerprint = content_fingerprint(document["content"])
+                if fingerprint:
+                    fingerprints.append(fingerprint)
+        return fingerprints
+            
     async def close(self):
         """關閉資料庫連接"""
         if self.database is not None:
@@ -59,6 +105,10 @@ class DatabaseHandler:
             int: 今日發文數量
         """
         try:
+            # 優先使用每日計數文檔
+            if hasattr(self.database, 'get_daily_post_count'):
+                return await self.database.get_daily_post_count()
+                
             today_start = datetime.now(self.timezone).replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
@@ -92,6 +142,40 @@ class DatabaseHandler:
             self.logger.error(f"重置每日發文計數時發生錯誤：{str(e)}")
             return 0
             
+    async def reconcile_daily_counters(self, days: int = 7) -> Dict[str, Dict[str, int]]:
+        """依文章記錄校正每日發文計數
+        
+        Args:
+            days: 要校正的天數（含今日）
+            
+        Returns:
+            Dict[str, Dict[str, int]]: 被修正的計數
+        """
+        try:
+            if hasattr(self.database, 'reconcile_daily_counters'):
+                return await self.database.reconcile_daily_counters(days)
+            return {}
+        except Exception as e:
+            self.logger.error(f"校正每日發文計數時發生錯誤：{str(e)}")
+            return {}
+            
+    async def cleanup_old_data(self, days: Optional[int] = None) -> int:
+        """依保留設定清理舊資料
+        
+        Args:
+            days: 文章保留的天數，預設使用保留設定
+            
+        Returns:
+            int: 刪除的資料筆數
+        """
+        try:
+            if days is None:
+                return await self.database.cleanup_old_data()
+            return await self.database.cleanup_old_data(days)
+        except Exception as e:
+            self.logger.error(f"清理舊資料時發生錯誤：{str(e)}")
+            return 0
+            
     async def increment_post_count(self):
         """增加發文計數"""
         try:
@@ -100,6 +184,24 @@ class DatabaseHandler:
         except Exception as e:
             self.logger.error(f"增加發文計數時發生錯誤：{str(e)}")
             
+    async def save_post(self, post_data: Dict[str, Any]) -> bool:
+        """儲存發文記錄
+        
+        Args:
+            post_data: 發文資料，需包含 post_id、content、timestamp
+            
+        Returns:
+            bool: 是否儲存成功
+        """
+        try:
+            success = await self.database.save_post(post_data)
+            if success:
+                self.duplicate_guard.add(post_data["content"])
+            return success
+        except Exception as e:
+            self.logger.error(f"儲存發文記錄時發生錯誤：{str(e)}")
+            return False
+            
     async def save_article(self, post_id: str, content: str, topics: List[str]) -> bool:
         """儲存文章
         
@@ -120,27 +222,117 @@ class DatabaseHandler:
             }
             
             await self.database.save_article(article)
+            self.duplicate_guard.add(content)
             self.logger.info(f"文章儲存成功: {post_id}")
             return True
         except Exception as e:
             self.logger.error(f"儲存文章時發生錯誤：{str(e)}")
             return False
             
-    async def get_user_history(self, user_id: str) -> Dict[str, Any]:
+    async def save_post_record(self, post_id: str, content: str, topics: List[str], **fields) -> bool:
+        """以單一操作儲存發文與文章
+        
+        Args:
+            post_id: 貼文 ID
+            content: 貼文內容
+            topics: 主題列表
+            **fields: 其他發文欄位，如 status、sentiment
+            
+        Returns:
+            bool: 是否儲存成功
+        """
+        try:
+            if not hasattr(self.database, 'save_post_record'):
+                # 不支援合併寫入的後端分別儲存
+                return (await self.save_post({"post_id": post_id, "content": content,
+                                              "timestamp": datetime.now(pytz.UTC), **fields})
+                        and await self.save_article(post_id, content, topics))
+                
+            success = await self.database.save_post_record({
+                **fields,
+                "post_id": post_id,
+                "content": content,
+                "topics": topics,
+                "timestamp": datetime.now(pytz.UTC),
+                "created_at": datetime.now(self.timezone)
+            })
+            if success:
+                self.duplicate_guard.add(content)
+            return success
+        except Exception as e:
+            self.logger.error(f"儲存發文記錄時發生錯誤：{str(e)}")
+            return False
+            
+    async def is_duplicate_content(self, content: str) -> bool:
+        """檢查內容是否已發布過
+        
+        Args:
+            content: 要發布的內容
+            
+        Returns:
+            bool: 是否重複；無法確認時返回 False
+        """
+        try:
+            if not hasattr(self.database, 'has_content_fingerprint'):
+                return False
+            return await self.duplicate_guard.is_duplicate(content, self.database.has_content_fingerprint)
+        except Exception as e:
+            self.logger.error(f"檢查重複內容時發生錯誤：{str(e)}")
+            return False
+            
+    def add_cache_listener(self, callback):
+        """註冊其他程序修改資料時的通知函數
+        
+        Args:
+            callback: 監聽函數，參數為 (collection, key, document)
+        """
+        if self.database is not None and hasattr(self.database, 'add_cache_listener'):
+            self.database.add_cache_listener(callback)
+            
+    async def get_user_history(self, user_id: str, last_n: Optional[int] = None) -> Dict[str, Any]:
         """獲取用戶歷史記錄
         
         Args:
             user_id: 用戶 ID
+            last_n: 最多返回的對話筆數
             
         Returns:
             Dict[str, Any]: 用戶歷史記錄
         """
         try:
-            return await self.database.get_user_history(user_id)
+            return await self.database.get_user_history(user_id, last_n)
         except Exception as e:
             self.logger.error(f"獲取用戶歷史記錄時發生錯誤：{str(e)}")
             return {"conversations": []}
             
+    async def append_user_interaction(self, user_id: str, entry: Dict[str, Any]) -> bool:
+        """附加一筆用戶對話
+        
+        Args:
+            user_id: 用戶 ID
+            entry: 對話記錄
+            
+        Returns:
+            bool: 是否成功
+        """
+        return await self.append_user_interactions({user_id: [entry]})
+        
+    async def append_user_interactions(self, interactions: Dict[str, List[Dict[str, Any]]]) -> bool:
+        """批量附加多位用戶的對話
+        
+        Args:
+            interactions: 用戶 ID -> 依時間排序的對話記錄
+            
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            await self.database.append_user_interactions(interactions)
+            return True
+        except Exception as e:
+            self.logger.error(f"附加用戶對話時發生錯誤：{str(e)}")
+            return False
+            
     async def get_personality_memory(self, context: Optional[str] = None) -> Dict[str, Any]:
         """獲取人設記憶
         
@@ -249,12 +441,41 @@ class DatabaseHandler:
             List: 文章列表
         """
         try:
-            posts = await self.database.db.posts.find().sort('timestamp', -1).limit(limit).to_list(length=limit)
-            return posts
+            return await self.database.get_recent_posts(limit)
         except Exception as e:
             self.logger.error(f"獲取最近文章時發生錯誤: {str(e)}")
             return [] 
 
+    async def iter_posts(self, batch_size: int = 100, projection: Optional[Dict[str, Any]] = None,
+                         ascending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """以游標分頁串流讀取所有發文，適合瀏覽歷史或回填資料
+
+        Args:
+            batch_size: 每頁數量
+            projection: 投影，例如 {"content": 1}
+            ascending: 是否由舊到新
+
+        Yields:
+            Dict[str, Any]: 發文
+        """
+        async for post in self.database.iter_posts(batch_size, projection, ascending):
+            yield post
+
+    async def iter_articles(self, batch_size: int = 100, projection: Optional[Dict[str, Any]] = None,
+                            ascending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """以游標分頁串流讀取所有文章
+
+        Args:
+            batch_size: 每頁數量
+            projection: 投影，例如 {"content": 1, "topics": 1}
+            ascending: 是否由舊到新
+
+        Yields:
+            Dict[str, Any]: 文章
+        """
+        async for article in self.database.iter_articles(batch_size, projection, ascending):
+            yield article
+
     async def bulk_get_speaking_patterns(self, pattern_types: list) -> Dict[str, Any]:
         """批量獲取說話模式
         
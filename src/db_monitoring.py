@@ -0,0 +1,485 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 資料庫指令監控模組，記錄實際的資料庫流量與耗時
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 使用 pymongo CommandListener 記錄實際的請求/回應大小、耗時與失敗次數
+- 統計以輕量計數器累計，由定期任務彙整
+- 各集合/指令與連線池取得連線的耗時分佈 (p50/p95/p99)
+- 超過門檻的慢指令依採樣率與速率限制記錄查詢形狀，供執行計畫分析
+- 請求/回應大小依採樣率量測並換算為估計值，游標指令另外累計返回的文檔數量
+"""
+
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import bson
+from pymongo import monitoring
+
+# 讀取與寫入指令
+READ_COMMANDS = {"find", "getMore", "aggregate", "count", "distinct"}
+WRITE_COMMANDS = {"insert", "update", "delete", "findAndModify"}
+
+# 回應中以游標返回文檔的指令
+CURSOR_COMMANDS = {"find", "aggregate", "getMore"}
+
+# 可用 explain 分析的指令
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# 耗時分佈的最小區間（微秒），每個區間為前一個的 2 倍
+HISTOGRAM_BASE_US = 50
+HISTOGRAM_BUCKETS = 24
+
+
+class LatencyHistogram:
+    """以 2 倍遞增區間記錄耗時分佈，百分位數以區間上限估算"""
+
+    def __init__(self):
+        """初始化耗時分佈"""
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.max_us = 0
+
+    def record(self, duration_us: int):
+        """記錄一次耗時
+
+        Args:
+            duration_us: 耗時（微秒）
+        """
+        index = 0
+        if duration_us > HISTOGRAM_BASE_US:
+            index = min(HISTOGRAM_BUCKETS - 1, math.ceil(math.log2(duration_us / HISTOGRAM_BASE_US)))
+        self.buckets[index] += 1
+        self.count += 1
+        self.max_us = max(self.max_us, duration_us)
+
+    def merge(self, other: "LatencyHistogram"):
+        """合併另一個耗時分佈
+
+        Args:
+            other: 要合併的耗時分佈
+        """
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.count += other.count
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percent: float) -> float:
+        """取得百分位數耗時
+
+        Args:
+            percent: 百分位，例如 95
+
+        Returns:
+            float: 耗時（毫秒）
+        """
+        if not self.count:
+            return 0.0
+        target = math.ceil(self.count * percent / 100)
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(HISTOGRAM_BASE_US * (2 ** index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        """取得耗時摘要"""
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_us / 1000
+        }
+
+
+def query_shape(value: Any) -> Any:
+    """將查詢條件的值替換為型別名稱，只保留欄位與運算子結構
+
+    Args:
+        value: 查詢條件
+
+    Returns:
+        Any: 查詢形狀
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # 陣列只保留第一個元素的形狀
+        return [query_shape(value[0])] if value else []
+    return type(value).__name__
+
+
+def explain_command(command_name: str, command: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """由原始指令建立可 explain 的指令（移除連線與工作階段相關欄位）
+
+    Args:
+        command_name: 指令名稱
+        command: 原始指令
+
+    Returns:
+        Optional[Dict[str, Any]]: 可 explain 的指令，無法分析時返回 None
+    """
+    fields = {
+        "find": ("filter", "sort", "projection", "limit", "skip", "hint"),
+        "aggregate": ("pipeline", "hint"),
+        "count": ("query", "limit", "skip", "hint"),
+        "distinct": ("key", "query"),
+        "update": (),
+        "delete": (),
+        "findAndModify": ("query", "sort", "update", "remove", "upsert", "new")
+    }[command_name]
+    explained = {command_name: command[command_name]}
+    for field in fields:
+        if field in command:
+            explained[field] = command[field]
+
+    if command_name == "aggregate":
+        # $out/$merge 的執行計畫無法以 executionStats 分析
+        if any("$out" in stage or "$merge" in stage for stage in command.get("pipeline", [])):
+            return None
+        explained["cursor"] = {}
+    elif command_name in ("update", "delete"):
+        # 批量寫入只分析第一筆
+        statements = command.get(command_name + "s") or []
+        if not statements:
+            return None
+        explained[command_name + "s"] = statements[:1]
+    return explained
+
+
+def _command_filter(command_name: str, command: Dict[str, Any]) -> Any:
+    """取得指令的查詢條件"""
+    if command_name == "find":
+        return command.get("filter", {})
+    if command_name == "aggregate":
+        return command.get("pipeline", [])
+    if command_name in ("update", "delete"):
+        statements = command.get(command_name + "s") or [{}]
+        return statements[0].get("q", {})
+    return command.get("query", {})
+
+
+def _command_collection(command_name: str, command: Dict[str, Any]) -> str:
+    """取得指令操作的集合名稱
+
+    Args:
+        command_name: 指令名稱
+        command: 指令內容
+
+    Returns:
+        str: 集合名稱，非集合指令返回 "$cmd"
+    """
+    if command_name == "getMore":
+        collection = command.get("collection")
+    elif command_name in READ_COMMANDS or command_name in WRITE_COMMANDS:
+        collection = command.get(command_name)
+    else:
+        collection = None
+    return collection if isinstance(collection, str) else "$cmd"
+
+
+def _new_counter() -> Dict[str, Any]:
+    """建立新的指令計數器"""
+    return {
+        "count": 0,
+        "failures": 0,
+        "bytes_sent": 0,
+        "bytes_received": 0,
+        "documents": 0,
+        "duration_us": 0,
+        "histogram": LatencyHistogram()
+    }
+
+
+class CommandTrafficListener(monitoring.CommandListener):
+    """資料庫指令流量監聽器
+
+    pymongo 會在背景執行緒中呼叫監聽函數，因此所有計數都以鎖保護；
+    監聽函數只做計數累加，彙整與輸出由定期任務透過 drain() 處理。
+    超過門檻的慢指令只記錄查詢形狀與指令內容，explain 由資料庫類別在事件循環中執行。
+    計算大小需要重新編碼指令與回應，因此只對採樣的指令量測，再以採樣率換算為估計值。
+    """
+
+    def __init__(self, slow_threshold_ms: float = 100, slow_sample_rate: float = 1.0,
+                 slow_max_per_minute: int = 10, size_sample_rate: float = 0.1):
+        """初始化指令流量監聽器
+
+        Args:
+            slow_threshold_ms: 慢指令門檻（毫秒），0 表示不記錄慢指令
+            slow_sample_rate: 慢指令的採樣率
+            slow_max_per_minute: 每分鐘最多記錄的慢指令數量
+            size_sample_rate: 量測請求/回應大小的採樣率，0 表示不量測
+        """
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.size_sample_rate = size_sample_rate
+        # (連線 ID, 請求 ID) -> (集合名稱, 指令名稱, 請求大小, 可分析的指令內容, 是否量測大小)
+        self._inflight: Dict[Tuple[Any, int], Tuple[str, str, int, Optional[Dict[str, Any]], bool]] = {}
+        # (集合名稱, 指令名稱) -> 計數器
+        self._counters = defaultdict(_new_counter)
+
+        # 慢指令記錄
+        self.slow_threshold_us = slow_threshold_ms * 1000
+        self.slow_sample_rate = slow_sample_rate
+        self.slow_max_per_minute = slow_max_per_minute
+        self._slow_ops = deque(maxlen=100)
+        self._slow_window_start = time.monotonic()
+        self._slow_window_count = 0
+        self.slow_ops_dropped = 0
+
+    def started(self, event):
+        """指令開始時記錄請求大小"""
+        try:
+            collection = _command_collection(event.command_name, event.command)
+            sampled = random.random() < self.size_sample_rate
+            request_size = len(bson.encode(event.command)) if sampled and event.command else 0
+            # 只保留指令的參照，不複製內容
+            command = event.command if (
+                self.slow_threshold_us > 0 and event.command_name in EXPLAINABLE_COMMANDS
+            ) else None
+            with self._lock:
+                self._inflight[(event.connection_id, event.request_id)] = (
+                    collection, event.command_name, request_size, command, sampled
+                )
+        except Exception as e:
+            self.logger.debug(f"記錄資料庫指令失敗：{str(e)}")
+
+    def succeeded(self, event):
+        """指令成功時記錄回應大小與耗時"""
+        try:
+            self._finish(event, event.reply, failed=False)
+        except Exception as e:
+            self.logger.debug(f"記錄資料庫指令失敗：{str(e)}")
+
+    def failed(self, event):
+        """指令失敗時記錄失敗次數與耗時"""
+        try:
+            self._finish(event, None, failed=True)
+        except Exception as e:
+            self.logger.debug(f"記錄資料庫指令失敗：{str(e)}")
+
+    def _finish(self, event, reply: Optional[Dict[str, Any]], failed: bool):
+        """累計單一指令的統計
+
+        Args:
+            event: 指令完成事件
+            reply: 指令回應，失敗時為 None
+            failed: 是否失敗
+        """
+        with self._lock:
+            collection, command_name, request_size, command, sampled = self._inflight.pop(
+                (event.connection_id, event.request_id), ("$cmd", event.command_name, 0, None, False)
+            )
+
+        # 編碼回應在鎖外進行，不阻塞其他執行緒的監聽函數
+        reply_size = len(bson.encode(reply)) if sampled and reply else 0
+        documents = 0
+        if reply and command_name in CURSOR_COMMANDS:
+            cursor = reply.get("cursor") or {}
+            documents = len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+        # 以採樣率換算為全部指令的估計大小
+        scale = 1 / self.size_sample_rate if sampled else 0
+
+        with self._lock:
+            counter = self._counters[(collection, command_name)]
+            counter["count"] += 1
+            counter["bytes_sent"] += round(request_size * scale)
+            counter["bytes_received"] += round(reply_size * scale)
+            counter["documents"] += documents
+            counter["duration_us"] += event.duration_micros
+            counter["histogram"].record(event.duration_micros)
+            if failed:
+                counter["failures"] += 1
+
+            if command is not None and not failed and event.duration_micros >= self.slow_threshold_us:
+                self._record_slow_op(collection, command_name, command, event.duration_micros)
+
+    def _record_slow_op(self, collection: str, command_name: str, command: Dict[str, Any], duration_us: int):
+        """依採樣率與每分鐘上限記錄慢指令（呼叫時已持有鎖）"""
+        if random.random() >= self.slow_sample_rate:
+            return
+        now = time.monotonic()
+        if now - self._slow_window_start >= 60:
+            self._slow_window_start = now
+            self._slow_window_count = 0
+        if self._slow_window_count >= self.slow_max_per_minute:
+            self.slow_ops_dropped += 1
+            return
+        self._slow_window_count += 1
+        self._slow_ops.append({
+            "collection": collection,
+            "command": command_name,
+            "shape": query_shape(_command_filter(command_name, command)),
+            "duration_ms": duration_us / 1000,
+            "time": time.time(),
+            "explain": explain_command(command_name, command)
+        })
+
+    def drain(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """取出並重置目前累計的統計
+
+        Returns:
+            Dict[Tuple[str, str], Dict[str, Any]]: (集合名稱, 指令名稱) -> 計數器
+        """
+        with self._lock:
+            counters = self._counters
+            self._counters = defaultdict(_new_counter)
+        return dict(counters)
+
+    def drain_slow_ops(self) -> List[Dict[str, Any]]:
+        """取出目前記錄的慢指令
+
+        Returns:
+            List[Dict[str, Any]]: 慢指令列表
+        """
+        with self._lock:
+            slow_ops = list(self._slow_ops)
+            self._slow_ops.clear()
+        return slow_ops
+
+
+def _find_key(value: Any, key: str) -> Any:
+    """在 explain 結果中尋找第一個指定的欄位（aggregate 的結果位於各階段之下）"""
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        items = value.values()
+    elif isinstance(value, list):
+        items = value
+    else:
+        return None
+    for item in items:
+        found = _find_key(item, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """列出執行計畫中的各階段，例如 ["FETCH", "IXSCAN"]"""
+    stages = []
+    while isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if "inputStage" in plan:
+            plan = plan["inputStage"]
+        elif plan.get("inputStages"):
+            plan = plan["inputStages"][0]
+        else:
+            plan = plan.get("queryPlan")
+    return stages
+
+
+def summarize_explain(result: Dict[str, Any]) -> Dict[str, Any]:
+    """整理 explain("executionStats") 的重點
+
+    Args:
+        result: explain 指令的結果
+
+    Returns:
+        Dict[str, Any]: 執行計畫階段、伺服器耗時與掃描的索引鍵/文檔數量
+    """
+    execution_stats = _find_key(result, "executionStats") or {}
+    return {
+        "stages": _plan_stages(_find_key(result, "winningPlan")),
+        "server_ms": execution_stats.get("executionTimeMillis"),
+        "keys_examined": execution_stats.get("totalKeysExamined"),
+        "docs_examined": execution_stats.get("totalDocsExamined"),
+        "returned": execution_stats.get("nReturned")
+    }
+
+
+def setup_slow_op_logger(log_dir: str = "logs/db_operations") -> logging.Logger:
+    """設置慢指令日誌，每行一筆 JSON
+
+    Args:
+        log_dir: 日誌目錄
+
+    Returns:
+        logging.Logger: 慢指令日誌
+    """
+    logger = logging.getLogger("db_slow_ops")
+    if not logger.handlers:
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.FileHandler(
+            os.path.join(log_dir, f"db_slow_ops_{datetime.now().strftime('%Y%m%d')}.log"), encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class PoolWaitListener(monitoring.ConnectionPoolListener):
+    """記錄從連線池取得連線的等待時間
+
+    取得連線的開始與完成事件在同一執行緒觸發，以執行緒區域變數記錄開始時間。
+    """
+
+    def __init__(self):
+        """初始化連線池監聽器"""
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.histogram = LatencyHistogram()
+        self.checkout_failures = 0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is None:
+            return
+        self._local.started = None
+        with self._lock:
+            self.histogram.record(int((time.perf_counter() - started) * 1_000_000))
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self._lock:
+            self.checkout_failures += 1
+
+    def drain(self) -> LatencyHistogram:
+        """取出並重置目前累計的等待時間分佈"""
+        with self._lock:
+            histogram = self.histogram
+            self.histogram = LatencyHistogram()
+        return histogram
+
+    # 其他連線池事件不需要記錄
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
@@ -0,0 +1,264 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 資料保留管理，依集合設定清理過期資料並只清除受影響的快取
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 依集合設定保留天數，可選擇使用 TTL 索引由資料庫自動刪除
+- 分批刪除並只查詢 _id 與鍵值欄位
+- 只從快取中移除被刪除的鍵值，避免清理後大量快取未命中
+- 刪除時同步扣除統計快照的文檔數量，TTL 模式下清理後重建統計快照
+- 查詢與刪除使用資料庫的集合政策（寫入確認與讀取偏好）
+- 合併發文記錄後 articles 為檢視，改由 posts 的保留設定管理
+- TTL 索引改為獨立命名的索引（ttl_<欄位>），不再修改結構版本管理的索引
+- 合併發文記錄後文章的保留設定套用到 posts 集合，不再略過
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pytz
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+from src.db_schema import INDEX_OPTIONS_CONFLICT
+
+# 保留設定：集合名稱 -> 設定（合併發文記錄後 articles 的設定套用到 posts 集合）
+# field: 判斷資料新舊的時間欄位（TTL 索引建立於此欄位）
+# key: 快取鍵值欄位；cache: Database 上對應的快取屬性名稱；保留天數 0 表示不清理
+RETENTION_POLICIES = {
+    "articles": {
+        "field": "created_at",
+        "key": "post_id",
+        "cache": "article_cache",
+        "days_env": "DB_RETENTION_ARTICLES_DAYS",
+        "default_days": "30"
+    },
+    "posts": {
+        "field": "timestamp",
+        "key": "post_id",
+        "cache": "posts_cache",
+        "days_env": "DB_RETENTION_POSTS_DAYS",
+        "default_days": "0"
+    }
+}
+
+# TTL 索引名稱的前綴，後接時間欄位名稱
+TTL_INDEX_PREFIX = "ttl_"
+
+
+class RetentionManager:
+    """資料保留管理器
+
+    保留天數為 0 的集合不會清理。啟用 TTL 索引時由資料庫在背景刪除過期資料，
+    本地只需依快取內容的時間欄位移除過期項目；無法使用 TTL 索引時改為分批刪除。
+    """
+
+    def __init__(self, database):
+        """初始化資料保留管理器
+
+        Args:
+            database: Database 實例
+        """
+        self.database = database
+        self.logger = logging.getLogger(__name__)
+        self.use_ttl = os.getenv("DB_RETENTION_USE_TTL", "false").lower() == "true"
+        self.batch_size = int(os.getenv("DB_RETENTION_BATCH_SIZE", "500"))
+        self.batch_pause = float(os.getenv("DB_RETENTION_BATCH_PAUSE", "0.1"))  # 每批刪除之間的間隔（秒）
+        self.retention_days = {
+            collection: int(os.getenv(policy["days_env"], policy["default_days"]))
+            for collection, policy in RETENTION_POLICIES.items()
+        }
+        # 已成功設定 TTL 索引的集合
+        self._ttl_collections = set()
+        self._ttl_checked = False
+
+    async def ensure_ttl_indexes(self):
+        """將保留設定套用為 TTL 索引，失敗的集合改用分批刪除"""
+        if not self.use_ttl or self._ttl_checked:
+            return
+
+        collections = [name for name, days in self.retention_days.items() if days > 0]
+        results = await asyncio.gather(
+            *[self._apply_ttl_index(collection) for collection in collections],
+            return_exceptions=True
+        )
+        for collection, result in zip(collections, results):
+            if result is True:
+                self._ttl_collections.add(collection)
+            else:
+                self.logger.warning(f"{collection} 無法使用 TTL 索引，改用分批刪除：{result}")
+        self._ttl_checked = True
+
+    def _target(self, collection: str) -> str:
+        """取得保留設定實際清理的集合
+
+        合併發文記錄後 articles 為 posts 的檢視，無法刪除或建立索引，文章存於 posts。
+
+        Args:
+            collection: 保留設定的集合名稱
+
+        Returns:
+            str: 實際清理的集合名稱
+        """
+        return self.database.articles_collection if collection == "articles" else collection
+
+    def _caches(self, collection: str) -> List[Any]:
+        """取得清理集合時需要同步移除的快取
+
+        合併發文記錄後 posts 的每筆記錄同時是發文與文章，兩個快取都需要移除。
+
+        Args:
+            collection: 保留設定的集合名稱
+
+        Returns:
+            List[Any]: 快取
+        """
+        if self._target(collection) == "posts" and self.database.unified_posts:
+            names = [RETENTION_POLICIES["articles"]["cache"], RETENTION_POLICIES["posts"]["cache"]]
+        else:
+            names = [RETENTION_POLICIES[collection]["cache"]]
+        return [getattr(self.database, name) for name in names]
+
+    async def _apply_ttl_index(self, collection: str) -> bool:
+        """設定單一集合的 TTL 索引
+
+        Args:
+            collection: 集合名稱
+
+        Returns:
+            bool: 是否設定成功
+        """
+        field = RETENTION_POLICIES[collection]["field"]
+        name = f"{TTL_INDEX_PREFIX}{field}"
+        expire_seconds = self.retention_days[collection] * 86400
+        target = self._target(collection)
+        try:
+            # 以獨立的升冪索引設定過期時間，不修改結構版本管理的降冪索引，
+            # 否則 ensure_schema 重新建立索引時會因選項不同而失敗
+            await self.database.db[target].create_index(
+                [(field, ASCENDING)], name=name, expireAfterSeconds=expire_seconds
+            )
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # 保留天數已變更，更新既有 TTL 索引的過期時間
+            await self.database.db.command({
+                "collMod": target,
+                "index": {"name": name, "expireAfterSeconds": expire_seconds}
+            })
+        return True
+
+    async def purge_collection(self, collection: str, cutoff: datetime) -> int:
+        """分批刪除集合中早於指定時間的資料
+
+        Args:
+            collection: 集合名稱
+            cutoff: 刪除早於此時間的資料
+
+        Returns:
+            int: 刪除的文檔數量
+        """
+        policy = RETENTION_POLICIES[collection]
+        field, key_field = policy["field"], policy["key"]
+        target = self._target(collection)
+        deleted_total = 0
+
+        while True:
+            cursor = self.database._collection(target).find(
+                {field: {"$lt": cutoff}}, {"_id": 1, key_field: 1}
+            ).sort(field, 1).limit(self.batch_size)
+            ids = []
+            keys = []
+            async for document in cursor:
+                ids.append(document["_id"])
+                if key_field in document:
+                    keys.append(document[key_field])
+            if not ids:
+                break
+
+            result = await self.database._collection(target).delete_many({"_id": {"$in": ids}})
+            deleted_total += result.deleted_count
+            self.evict_keys(collection, keys)
+            self.database._adjust_stats_snapshot(target, -result.deleted_count)
+
+            if len(ids) < self.batch_size:
+                break
+            # 讓出時間給其他資料庫操作
+            await asyncio.sleep(self.batch_pause)
+
+        return deleted_total
+
+    def evict_keys(self, collection: str, keys: List[Any]) -> int:
+        """只從快取中移除指定的鍵值
+
+        Args:
+            collection: 集合名稱
+            keys: 要移除的鍵值
+
+        Returns:
+            int: 實際移除的數量
+        """
+        evicted = set()
+        for cache in self._caches(collection):
+            evicted.update(key for key in keys if cache.pop(key, None) is not None)
+        return len(evicted)
+
+    def evict_expired(self, collection: str, cutoff: datetime) -> int:
+        """依快取內容的時間欄位移除過期的項目（TTL 索引模式使用，不查詢資料庫）
+
+        Args:
+            collection: 集合名稱
+            cutoff: 移除早於此時間的項目
+
+        Returns:
+            int: 移除的數量
+        """
+        field = RETENTION_POLICIES[collection]["field"]
+        expired = []
+        for cache in self._caches(collection):
+            for key, document in list(cache.items()):
+                value = document.get(field) if isinstance(document, dict) else None
+                if isinstance(value, datetime):
+                    if value.tzinfo is None:
+                        value = pytz.UTC.localize(value)
+                    if value < cutoff:
+                        expired.append(key)
+        return self.evict_keys(collection, expired)
+
+    async def run(self, days_override: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """依保留設定清理所有集合
+
+        Args:
+            days_override: 覆寫各集合的保留天數
+
+        Returns:
+            Dict[str, int]: 各集合刪除（或從快取移除）的數量
+        """
+        retention_days = {**self.retention_days, **(days_override or {})}
+        await self.ensure_ttl_indexes()
+
+        now = datetime.now(pytz.UTC)
+        results = {}
+        ttl_evicted = False
+        for collection, days in retention_days.items():
+            if days <= 0:
+                continue
+            cutoff = now - timedelta(days=days)
+            if collection in self._ttl_collections and days == self.retention_days[collection]:
+                # 資料由 TTL 索引刪除，只需清理本地快取
+                results[collection] = self.evict_expired(collection, cutoff)
+                ttl_evicted = True
+            else:
+                results[collection] = await self.purge_collection(collection, cutoff)
+            self.logger.info(f"資料保留清理 {collection}：{results[collection]} 筆（保留 {days} 天）")
+
+        # TTL 索引刪除的文檔不經過寫入路徑，統計快照需以完整計數重建
+        if ttl_evicted:
+            await self.database.rebuild_stats_snapshot()
+        return results
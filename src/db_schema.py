@@ -0,0 +1,259 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 資料庫結構版本管理，負責索引建立與資料遷移
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 以結構版本文檔記錄已套用的版本，版本相同時略過索引建立
+- 版本不同時並行建立各集合缺少的索引並依序執行資料遷移
+- v2：發文與文章的內容指紋唯一索引，並為既有資料補上指紋
+- v3：建立統計快照文檔，記錄各集合的文檔數量
+- v4：文章的 (persona, created_at) 複合索引，供發文分析依人設與時間範圍篩選
+- v5：發文 (timestamp, _id) 與文章 (created_at, _id) 複合索引，供游標分頁排序
+- 新增合併發文記錄的遷移：文章併入 posts，articles 改為相容的唯讀檢視；索引建立略過檢視
+- 結構定義的索引被加上 TTL 過期時間而選項衝突時，移除後依結構定義重建
+- v6：說話模式、人設記憶與發文的 updated_at 索引，供快取同步監聽器輪詢
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import pytz
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import OperationFailure
+
+from src.content_fingerprint import content_fingerprint
+
+# 結構版本，修改 INDEXES 或新增 MIGRATIONS 時必須遞增
+SCHEMA_VERSION = 6
+
+# 既有索引與要建立的索引鍵值相同但選項不同時的錯誤代碼
+INDEX_OPTIONS_CONFLICT = 85
+
+# 結構版本文檔所在的集合與 ID
+SCHEMA_COLLECTION = "schema_meta"
+SCHEMA_DOCUMENT_ID = "schema"
+
+# 統計快照：集合名稱 -> 快照中的數量欄位，由寫入路徑遞增維護
+STATS_SNAPSHOT_COLLECTION = "stats_snapshot"
+STATS_SNAPSHOT_ID = "counts"
+STATS_SNAPSHOT_FIELDS = {
+    "articles": "articles_count",
+    "posts": "posts_count",
+    "user_history": "users_count"
+}
+
+# 各集合的索引定義
+INDEXES: Dict[str, List[IndexModel]] = {
+    "articles": [
+        IndexModel([("created_at", DESCENDING)]),
+        IndexModel([("persona", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("post_id", ASCENDING)], unique=True),
+        # 舊資料沒有指紋，只對有指紋的文檔要求唯一
+        IndexModel([("fingerprint", ASCENDING)], unique=True,
+                   partialFilterExpression={"fingerprint": {"$exists": True}})
+    ],
+    "personality_memories": [
+        IndexModel([("context", ASCENDING)], unique=True),
+        IndexModel([("updated_at", ASCENDING)])
+    ],
+    "posts": [
+        IndexModel([("post_id", ASCENDING)], unique=True),
+        IndexModel([("timestamp", DESCENDING)]),
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("fingerprint", ASCENDING)], unique=True,
+                   partialFilterExpression={"fingerprint": {"$exists": True}}),
+        IndexModel([("updated_at", ASCENDING)])
+    ],
+    "speaking_patterns": [
+        IndexModel([("type", ASCENDING)], unique=True),
+        IndexModel([("updated_at", ASCENDING)])
+    ]
+}
+
+# 合併發文記錄後 posts 需要的文章索引
+UNIFIED_POSTS_INDEXES: List[IndexModel] = [
+    IndexModel([("created_at", DESCENDING)]),
+    IndexModel([("persona", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)])
+]
+
+# 合併後保留的舊文章集合名稱
+LEGACY_ARTICLES_COLLECTION = "articles_legacy"
+
+logger = logging.getLogger(__name__)
+
+
+async def _backfill_fingerprints(db):
+    """為既有的發文與文章補上內容指紋，重複內容只保留最早一筆的指紋"""
+    for collection, time_field in (("articles", "created_at"), ("posts", "timestamp")):
+        seen = set()
+        operations = []
+        updated = 0
+        cursor = db[collection].find({}, {"content": 1, "fingerprint": 1}).sort(time_field, ASCENDING)
+        async for document in cursor:
+            fingerprint = document.get("fingerprint")
+            if fingerprint is None and document.get("content"):
+                fingerprint = content_fingerprint(document["content"])
+                if fingerprint not in seen:
+                    operations.append(UpdateOne({"_id": document["_id"]}, {"$set": {"fingerprint": fingerprint}}))
+            if fingerprint:
+                seen.add(fingerprint)
+            if len(operations) >= 500:
+                await db[collection].bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            await db[collection].bulk_write(operations, ordered=False)
+            updated += len(operations)
+        logger.info(f"集合 {collection} 補上 {updated} 筆內容指紋")
+
+
+async def _create_indexes(db, collection: str, indexes: List[IndexModel]) -> List[str]:
+    """建立集合的索引
+
+    舊版的資料保留以 collMod 直接在結構定義的索引加上 TTL 過期時間，重新建立時會因選項不同
+    而失敗；這類索引會被移除後依結構定義重建，TTL 改由資料保留以獨立的索引設定。
+
+    Args:
+        db: 資料庫實例
+        collection: 集合名稱
+        indexes: 索引定義
+
+    Returns:
+        List[str]: 索引名稱
+    """
+    try:
+        return await db[collection].create_indexes(indexes)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+
+    existing = await db[collection].index_information()
+    keys = {tuple(index.document["key"].items()) for index in indexes}
+    for name, info in existing.items():
+        if "expireAfterSeconds" in info and tuple(info["key"]) in keys:
+            logger.warning(f"集合 {collection} 的索引 {name} 帶有 TTL 過期時間，依結構定義重建")
+            await db[collection].drop_index(name)
+    return await db[collection].create_indexes(indexes)
+
+
+async def build_stats_snapshot(db) -> Dict[str, int]:
+    """以完整計數重建統計快照
+
+    Args:
+        db: 資料庫實例
+
+    Returns:
+        Dict[str, int]: 快照中的各集合數量
+    """
+    collections = list(STATS_SNAPSHOT_FIELDS.keys())
+    counts = await asyncio.gather(*[db[collection].count_documents({}) for collection in collections])
+    snapshot = {STATS_SNAPSHOT_FIELDS[collection]: count for collection, count in zip(collections, counts)}
+    await db[STATS_SNAPSHOT_COLLECTION].update_one(
+        {"_id": STATS_SNAPSHOT_ID},
+        {"$set": {**snapshot, "rebuilt_at": datetime.now(pytz.UTC)}},
+        upsert=True
+    )
+    logger.info(f"統計快照已重建：{snapshot}")
+    return snapshot
+
+
+# 資料遷移：(版本, 說明, 遷移函數)，遷移函數參數為資料庫實例，必須可重複執行
+MIGRATIONS: List[Tuple[int, str, Callable[[Any], Awaitable[None]]]] = [
+    (2, "補上發文與文章的內容指紋", _backfill_fingerprints),
+    (3, "建立統計快照", build_stats_snapshot)
+]
+
+
+async def ensure_schema(db) -> bool:
+    """確保資料庫結構為最新版本
+
+    Args:
+        db: 資料庫實例 (AsyncIOMotorDatabase)
+
+    Returns:
+        bool: 是否有執行結構更新；版本相同時返回 False
+    """
+    meta = await db[SCHEMA_COLLECTION].find_one({"_id": SCHEMA_DOCUMENT_ID})
+    current_version = meta.get("version", 0) if meta else 0
+
+    if current_version >= SCHEMA_VERSION:
+        logger.debug(f"資料庫結構版本 {current_version} 為最新，略過索引建立")
+        return False
+
+    logger.info(f"更新資料庫結構版本：{current_version} -> {SCHEMA_VERSION}")
+
+    # 各集合的索引並行建立；檢視（合併發文記錄後的 articles）沒有索引
+    views = set(await db.list_collection_names(filter={"type": "view"}))
+    collections = [collection for collection in INDEXES if collection not in views]
+    results = await asyncio.gather(*[
+        _create_indexes(db, collection, INDEXES[collection]) for collection in collections
+    ])
+    for collection, names in zip(collections, results):
+        logger.info(f"集合 {collection} 索引：{', '.join(names)}")
+
+    # 依序執行尚未套用的資料遷移
+    for version, description, migrate in sorted(MIGRATIONS, key=lambda migration: migration[0]):
+        if version > current_version:
+            logger.info(f"執行資料遷移 v{version}：{description}")
+            await migrate(db)
+
+    # $max 避免較舊的程序把版本改回舊值
+    await db[SCHEMA_COLLECTION].update_one(
+        {"_id": SCHEMA_DOCUMENT_ID},
+        {
+            "$max": {"version": SCHEMA_VERSION},
+            "$set": {"updated_at": datetime.now(pytz.UTC)}
+        },
+        upsert=True
+    )
+    return True
+
+
+async def migrate_to_unified_posts(db) -> Dict[str, int]:
+    """將文章併入 posts，articles 改為 posts 的唯讀檢視
+
+    以 $merge 在伺服器端合併，已存在的發文欄位優先，文章只補上缺少的欄位
+    （created_at、topics、persona）。舊的 articles 集合改名為 articles_legacy 保留，
+    確認無誤後可自行刪除。可重複執行，已遷移時不做任何事。
+    若文章與另一筆發文的內容指紋相同，$merge 會因唯一索引失敗，需先處理重複資料。
+
+    Args:
+        db: 資料庫實例
+
+    Returns:
+        Dict[str, int]: 合併的文章數量與合併後的發文記錄數量
+    """
+    if await db.list_collection_names(filter={"name": "articles", "type": "view"}):
+        logger.info("articles 已是 posts 的檢視，略過合併")
+        return {"articles": 0, "posts": await db.posts.count_documents({})}
+
+    await _create_indexes(db, "posts", UNIFIED_POSTS_INDEXES)
+
+    articles = await db.articles.count_documents({})
+    await db.articles.aggregate([
+        {"$project": {"_id": 0}},
+        {"$merge": {
+            "into": "posts",
+            "on": "post_id",
+            "whenMatched": [{"$replaceWith": {"$mergeObjects": ["$$new", "$$ROOT"]}}],
+            "whenNotMatched": "insert"
+        }}
+    ]).to_list(length=None)
+
+    # 只有發文或只有文章的記錄補上另一方的時間欄位
+    await db.posts.update_many({"created_at": {"$exists": False}}, [{"$set": {"created_at": "$timestamp"}}])
+    await db.posts.update_many({"timestamp": {"$exists": False}}, [{"$set": {"timestamp": "$created_at"}}])
+
+    await db.articles.rename(LEGACY_ARTICLES_COLLECTION)
+    await db.create_collection("articles", viewOn="posts", pipeline=[{"$match": {"created_at": {"$exists": True}}}])
+
+    snapshot = await build_stats_snapshot(db)
+    logger.info(f"已合併 {articles} 筆文章到 posts，舊資料保留於 {LEGACY_ARTICLES_COLLECTION}")
+    return {"articles": articles, "posts": snapshot[STATS_SNAPSHOT_FIELDS["posts"]]}
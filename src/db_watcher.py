@@ -0,0 +1,271 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 資料庫快取同步監聽器，跨程序同步快取內容
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 使用 MongoDB change stream 精準更新或失效受影響的快取鍵值
+- 單機 mongod 不支援 change stream 時改用 updated_at 輪詢
+- 合併發文記錄後 posts 的變更同時套用到文章快取
+- 輪詢使用的 updated_at 索引改由結構版本管理建立，啟動輪詢時不再建立索引
+"""
+
+import asyncio
+import inspect
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pytz
+from pymongo.errors import OperationFailure, PyMongoError
+
+# 監聽的集合：集合名稱 -> (快取鍵值欄位, Database 上的快取屬性名稱)
+WATCHED_COLLECTIONS = {
+    "speaking_patterns": ("type", "pattern_cache"),
+    "personality_memories": ("context", "personality_cache"),
+    "posts": ("post_id", "posts_cache"),
+    "articles": ("post_id", "article_cache")
+}
+
+# 輪詢模式下可依 updated_at 偵測變更的集合（updated_at 索引由 db_schema 建立）
+POLLED_COLLECTIONS = ["speaking_patterns", "personality_memories", "posts"]
+
+# 不支援 change stream 的錯誤代碼（單機 mongod、不支援的儲存引擎）
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 40324, 136}
+
+
+class CacheWatcher:
+    """快取同步監聽器
+
+    監聽其他程序對資料庫的寫入，只更新或失效受影響的快取鍵值，
+    並通知已註冊的監聽函數（如說話模式模組重新套用資料）。
+    """
+
+    def __init__(self, database, poll_interval: float = 30.0):
+        """初始化快取同步監聽器
+
+        Args:
+            database: Database 實例
+            poll_interval: 輪詢模式的間隔秒數
+        """
+        self.database = database
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+        self.listeners: List[Callable] = []
+        self.mode = None  # "change_stream" 或 "polling"
+        self._task = None
+        self._running = False
+        self._resume_token = None
+        self._last_seen: Dict[str, datetime] = {}
+        self.stats = {
+            "events": 0,
+            "refreshed": 0,
+            "invalidated": 0,
+            "errors": 0
+        }
+
+    def add_listener(self, callback: Callable):
+        """註冊快取變更監聽函數
+
+        Args:
+            callback: 監聽函數，參數為 (collection, key, document)；
+                      document 為 None 表示文檔已刪除，可為同步或非同步函數
+        """
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def start(self):
+        """啟動監聽任務"""
+        if self._task is None or self._task.done():
+            self._running = True
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """停止監聽任務"""
+        self._running = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """優先使用 change stream，不支援時改用輪詢"""
+        try:
+            try:
+                await self._watch_change_stream()
+            except OperationFailure as e:
+                if e.code not in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    raise
+                self.logger.info(f"資料庫不支援 change stream（{e.code}），改用 updated_at 輪詢同步快取")
+            if self._running:
+                await self._poll_updates()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"快取同步監聽器停止運作：{str(e)}")
+
+    async def _watch_change_stream(self):
+        """透過 change stream 監聽資料庫變更"""
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(WATCHED_COLLECTIONS.keys())},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+        }}]
+
+        while self._running:
+            try:
+                async with self.database.db.watch(
+                    pipeline,
+                    full_document="updateLookup",
+                    resume_after=self._resume_token
+                ) as stream:
+                    if self.mode != "change_stream":
+                        self.mode = "change_stream"
+                        self.logger.info("快取同步監聽器已啟動（change stream）")
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        await self._handle_change(change)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    raise
+                self._on_stream_error(e)
+                await asyncio.sleep(self.poll_interval)
+            except PyMongoError as e:
+                self._on_stream_error(e)
+                await asyncio.sleep(self.poll_interval)
+
+    def _on_stream_error(self, error: Exception):
+        """change stream 中斷時的處理
+
+        Args:
+            error: 錯誤
+        """
+        self.stats["errors"] += 1
+        self.logger.warning(f"change stream 中斷，稍後重新連接：{str(error)}")
+        # 恢復點失效時無法得知中斷期間的變更，清除監聽中的快取
+        if getattr(error, "code", None) == 286:
+            self._resume_token = None
+            for _, cache_name in WATCHED_COLLECTIONS.values():
+                getattr(self.database, cache_name).clear()
+
+    async def _handle_change(self, change: Dict[str, Any]):
+        """處理單一 change stream 事件
+
+        Args:
+            change: change stream 事件
+        """
+        collection = change["ns"]["coll"]
+        key_field, _ = WATCHED_COLLECTIONS[collection]
+        self.stats["events"] += 1
+
+        # 合併發文記錄後文章存於 posts，posts 的變更也要套用到文章快取
+        collections = [collection]
+        if collection == self.database.articles_collection != "articles":
+            collections.append("articles")
+
+        document = change.get("fullDocument")
+        for target in collections:
+            if document is not None:
+                await self.apply_change(target, document.get(key_field), document)
+            else:
+                # 刪除事件只有 _id，從快取中找出對應的鍵值
+                doc_id = change.get("documentKey", {}).get("_id")
+                for key in self._find_cached_keys(target, doc_id):
+                    await self.apply_change(target, key, None)
+
+    def _find_cached_keys(self, collection: str, doc_id: Any) -> List[Any]:
+        """依 _id 找出快取中的鍵值
+
+        Args:
+            collection: 集合名稱
+            doc_id: 文檔 _id
+
+        Returns:
+            List[Any]: 快取鍵值列表
+        """
+        _, cache_name = WATCHED_COLLECTIONS[collection]
+        cache = getattr(self.database, cache_name)
+        return [
+            key for key, value in list(cache.items())
+            if isinstance(value, dict) and value.get("_id") == doc_id
+        ]
+
+    async def apply_change(self, collection: str, key: Any, document: Optional[Dict[str, Any]]):
+        """更新或失效單一快取鍵值並通知監聽函數
+
+        Args:
+            collection: 集合名稱
+            key: 快取鍵值
+            document: 最新文檔，None 表示已刪除
+        """
+        if key is None:
+            return
+
+        _, cache_name = WATCHED_COLLECTIONS[collection]
+        cache = getattr(self.database, cache_name)
+
+        # 本程序仍有待寫入的資料時以本地資料為準，寫入完成後會再收到事件
+        if self.database.write_queue.is_pending(collection, key):
+            return
+
+        if document is None:
+            if cache.pop(key, None) is not None:
+                self.stats["invalidated"] += 1
+        elif key in cache:
+            cache[key] = document
+            self.stats["refreshed"] += 1
+
+        for listener in self.listeners:
+            try:
+                result = listener(collection, key, document)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.logger.error(f"快取變更監聽函數執行失敗：{str(e)}")
+
+    async def _poll_updates(self):
+        """依 updated_at 輪詢變更的文檔"""
+        self.mode = "polling"
+        now = datetime.now(pytz.UTC)
+        for collection in POLLED_COLLECTIONS:
+            self._last_seen.setdefault(collection, now)
+        self.logger.info(f"快取同步監聽器已啟動（輪詢，每 {self.poll_interval} 秒）")
+
+        while self._running:
+            await asyncio.sleep(self.poll_interval)
+            for collection in POLLED_COLLECTIONS:
+                try:
+                    await self._poll_collection(collection)
+                except PyMongoError as e:
+                    self.stats["errors"] += 1
+                    self.logger.warning(f"輪詢 {collection} 變更失敗：{str(e)}")
+
+    async def _poll_collection(self, collection: str):
+        """輪詢單一集合的變更
+
+        Args:
+            collection: 集合名稱
+        """
+        key_field, _ = WATCHED_COLLECTIONS[collection]
+        since = self._last_seen[collection]
+
+        cursor = self.database.db[collection].find(
+            {"updated_at": {"$gt": since}}
+        ).sort("updated_at", 1)
+
+        async for document in cursor:
+            self.stats["events"] += 1
+            updated_at = document.get("updated_at")
+            if isinstance(updated_at, datetime):
+                if updated_at.tzinfo is None:
+                    updated_at = pytz.UTC.localize(updated_at)
+                self._last_seen[collection] = max(self._last_seen[collection], updated_at)
+            await self.apply_change(collection, document.get(key_field), document)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得監聽器統計"""
+        return {**self.stats, "mode": self.mode}
@@ -0,0 +1,217 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 磁碟快取，以 SQLite 保存 AI 分析結果，重新啟動後仍可使用
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 以模型、請求類型與正規化文本的雜湊作為鍵值
+- 依存取時間淘汰最久未使用的項目，總容量以位元組限制
+- 項目超過存活時間後視為過期
+- 並行的第一次存取只建立一次連接
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries (accessed_at);
+"""
+
+# 超過容量時淘汰到容量的這個比例，避免每次寫入都觸發淘汰
+EVICTION_TARGET_RATIO = 0.9
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def cache_key(model: str, kind: str, text: str) -> str:
+    """產生快取鍵值
+
+    文本先以 NFKC 正規化並合併空白，只差在全形半形或空白的文本共用同一個結果。
+
+    Args:
+        model: 模型名稱
+        kind: 請求類型（例如 sentiment）
+        text: 請求的文本
+
+    Returns:
+        str: 十六進位雜湊值
+    """
+    normalized = WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+    return hashlib.blake2b(f"{model}\0{kind}\0{normalized}".encode("utf-8"), digest_size=20).hexdigest()
+
+
+class DiskCache:
+    """以 SQLite 保存的鍵值快取
+
+    值以 JSON 儲存。所有 SQLite 操作在專用執行緒執行，不阻塞事件循環；
+    讀取時更新存取時間，總容量超過上限時刪除最久未使用的項目。
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: float, name: str = "disk_cache"):
+        """初始化磁碟快取
+
+        Args:
+            path: SQLite 檔案路徑
+            max_bytes: 容量上限（位元組）
+            ttl: 存活秒數
+            name: 快取名稱，用於日誌與統計
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self.conn = None
+        self._executor = None
+        self._connect_lock = asyncio.Lock()
+        self._total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "expired": 0}
+
+    def _connect(self):
+        """建立連接、清除過期項目並計算目前容量（於專用執行緒執行）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.executescript(SCHEMA)
+        expired = conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+        conn.commit()
+        self.stats["expired"] += expired
+        self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.conn = conn
+
+    async def _run(self, func, *args):
+        """在專用執行緒執行阻塞操作
+
+        Args:
+            func: 要執行的函數
+            *args: 函數參數
+
+        Returns:
+            Any: 函數返回值
+        """
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.name)
+        if self.conn is None:
+            # 並行的第一次呼叫只建立一次連接
+            async with self._connect_lock:
+                if self.conn is None:
+                    await loop.run_in_executor(self._executor, self._connect)
+                    self.logger.info(f"磁碟快取 {self.name} 已開啟：{self.path}（{self._total_bytes} bytes）")
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _get(self, key: str) -> Optional[str]:
+        """讀取項目並更新存取時間（於專用執行緒執行）"""
+        now = time.time()
+        row = self.conn.execute("SELECT value, size, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, size, created_at = row
+        if created_at < now - self.ttl:
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.conn.commit()
+            self._total_bytes -= size
+            self.stats["expired"] += 1
+            return None
+        self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        return value
+
+    def _set(self, key: str, value: str):
+        """寫入項目，超過容量時淘汰最久未使用的項目（於專用執行緒執行）"""
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        row = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, value, size, now, now)
+        )
+        self._total_bytes += size - (row[0] if row else 0)
+        if self._total_bytes > self.max_bytes:
+            self._evict(int(self.max_bytes * EVICTION_TARGET_RATIO))
+        self.conn.commit()
+
+    def _evict(self, target_bytes: int):
+        """依存取時間刪除項目直到容量低於目標（於專用執行緒執行）"""
+        cursor = self.conn.execute("SELECT key, size FROM entries ORDER BY accessed_at")
+        keys = []
+        for key, size in cursor:
+            if self._total_bytes <= target_bytes:
+                break
+            keys.append((key,))
+            self._total_bytes -= size
+        cursor.close()
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", keys)
+        self.stats["evictions"] += len(keys)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """讀取快取
+
+        Args:
+            key: 快取鍵值（由 cache_key 產生）
+
+        Returns:
+            Optional[Any]: 快取的值，不存在或已過期時返回 None
+        """
+        try:
+            value = await self._run(self._get, key)
+        except sqlite3.Error as e:
+            self.logger.error(f"讀取磁碟快取 {self.name} 失敗：{str(e)}")
+            return None
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(value)
+
+    async def set(self, key: str, value: Any):
+        """寫入快取
+
+        Args:
+            key: 快取鍵值（由 cache_key 產生）
+            value: 可序列化為 JSON 的值
+        """
+        try:
+            await self._run(self._set, key, json.dumps(value, ensure_ascii=False))
+            self.stats["writes"] += 1
+        except sqlite3.Error as e:
+            self.logger.error(f"寫入磁碟快取 {self.name} 失敗：{str(e)}")
+
+    async def close(self):
+        """關閉磁碟快取"""
+        if self._executor is None:
+            return
+        if self.conn is not None:
+            conn = self.conn
+            self.conn = None
+            await asyncio.get_running_loop().run_in_executor(self._executor, conn.close)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得磁碟快取統計"""
+        return {**self.stats, "bytes": self._total_bytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,115 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 多關鍵詞比對，以 Aho-Corasick 自動機一次掃描找出所有分類的關鍵詞
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 預先展開所有狀態轉移，掃描時每個字元只查一次表，與關鍵詞數量無關
+- 關鍵詞可屬於多個分類，支援分類層級的忽略英文大小寫
+"""
+
+import string
+from collections import Counter, deque
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+# 只轉換英文字母，文本長度不變，比對位置可對應回原文
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+ASCII_LETTERS = frozenset(string.ascii_letters)
+
+
+class KeywordMatcher:
+    """Aho-Corasick 多關鍵詞比對器
+
+    自動機以英文小寫的關鍵詞建立，掃描英文小寫的文本；需要區分大小寫且含英文字母的
+    關鍵詞在比對到時再與原文確認。
+    """
+
+    def __init__(self, groups: Dict[Hashable, Iterable[str]], ignore_case_labels: Iterable[Hashable] = ()):
+        """建立自動機
+
+        Args:
+            groups: 分類 -> 關鍵詞
+            ignore_case_labels: 忽略英文大小寫的分類
+        """
+        ignore_case_labels = set(ignore_case_labels)
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[Hashable, int, str, bool]]] = [[]]
+        self.keyword_count = 0
+
+        for label, keywords in groups.items():
+            ignore_case = label in ignore_case_labels
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                lowered = keyword.translate(ASCII_LOWER)
+                state = 0
+                for char in lowered:
+                    next_state = goto[state].get(char)
+                    if next_state is None:
+                        goto.append({})
+                        outputs.append([])
+                        next_state = goto[state][char] = len(goto) - 1
+                    state = next_state
+                # 區分大小寫且含英文字母的關鍵詞需要與原文確認
+                verify = not ignore_case and any(char in ASCII_LETTERS for char in keyword)
+                outputs[state].append((label, len(keyword), keyword, verify))
+                self.keyword_count += 1
+
+        # 以廣度優先計算失敗轉移，並將每個狀態的轉移表展開為完整的轉移
+        fail = [0] * len(goto)
+        self._transitions: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions = dict(self._transitions[fail[state]])
+            for char, next_state in goto[state].items():
+                fail[next_state] = self._transitions[fail[state]].get(char, 0)
+                outputs[next_state].extend(outputs[fail[next_state]])
+                queue.append(next_state)
+            transitions.update(goto[state])
+            self._transitions[state] = transitions
+        self._outputs = [tuple(output) if output else None for output in outputs]
+        self.state_count = len(goto)
+
+    def _scan(self, text: str):
+        """掃描文本，依序產生 (結束位置, 分類)"""
+        transitions = self._transitions
+        outputs = self._outputs
+        state = 0
+        for end, char in enumerate(text.translate(ASCII_LOWER), 1):
+            state = transitions[state].get(char, 0)
+            output = outputs[state]
+            if output is None:
+                continue
+            for label, length, keyword, verify in output:
+                if not verify or text[end - length:end] == keyword:
+                    yield end, label
+
+    def match(self, text: str) -> Set[Hashable]:
+        """找出文本包含的所有分類
+
+        Args:
+            text: 要比對的文本
+
+        Returns:
+            Set[Hashable]: 比對到的分類
+        """
+        if not text:
+            return set()
+        return {label for _, label in self._scan(text)}
+
+    def count(self, text: str) -> Dict[Hashable, int]:
+        """計算文本中各分類關鍵詞出現的次數
+
+        Args:
+            text: 要比對的文本
+
+        Returns:
+            Dict[Hashable, int]: 分類 -> 出現次數
+        """
+        if not text:
+            return {}
+        return dict(Counter(label for _, label in self._scan(text)))
+
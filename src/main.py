@@ -17,6 +17,13 @@ Changes:
 - 優化記憶體使用
 - 預先生成內容以提高回應速度
 - 引入獨立的說話模式模組
+- 定期校正每日發文計數
+- 可依設定定期清理過期資料
+- 統計摘要輸出並行查詢合併數量
+- 資料庫統計輸出實際流量、失敗次數與平均耗時
+- 統計摘要輸出各快取的記憶體用量與命中率
+- 統計摘要輸出指令耗時分佈與連線池等待時間
+- 統計摘要輸出發文總數，統計快照與估計數量不一致時發出警告
 """
 
 import asyncio
@@ -91,6 +98,9 @@ class ThreadsPosterApp:
         }
         # 資料庫統計輸出間隔 (秒)
         self.db_stats_interval = int(os.getenv("DB_STATS_INTERVAL", "3600"))  # 默認每小時
+        # 每日發文計數校正間隔 (秒)
+        self.counter_reconcile_interval = int(os.getenv("DB_COUNTER_RECONCILE_INTERVAL", "21600"))  # 默認每6小時
+        self.retention_interval = int(os.getenv("DB_RETENTION_INTERVAL", "0"))  # 0 表示不自動清理
         
     async def initialize(self):
         """初始化應用"""
@@ -144,6 +154,11 @@ class ThreadsPosterApp:
             # 設定定期輸出資料庫統計
             asyncio.create_task(self._schedule_db_stats_output())
             
+            # 設定定期校正每日發文計數
+            asyncio.create_task(self._schedule_counter_reconciliation())
+            if self.retention_interval > 0:
+                asyncio.create_task(self._schedule_retention())
+            
             self.logger.info("ThreadsPoster 初始化完成")
             return True
         except Exception as e:
@@ -161,6 +176,22 @@ class ThreadsPosterApp:
                 await self._output_db_stats()
                 self.stats["last_db_stats_time"] = now
     
+    async def _schedule_counter_reconciliation(self):
+        """定期依文章記錄校正每日發文計數"""
+        # 啟動時先校正一次
+        await self.db_handler.reconcile_daily_counters()
+        while self.running:
+            await asyncio.sleep(self.counter_reconcile_interval)
+            if self.running:
+                await self.db_handler.reconcile_daily_counters()
+                
+    async def _schedule_retention(self):
+        """定期依保留設定清理舊資料"""
+        while self.running:
+            await asyncio.sleep(self.retention_interval)
+            if self.running:
+                await self.db_handler.cleanup_old_data()
+                
     async def _output_db_stats(self):
         """輸出資料庫統計資訊"""
         try:
@@ -173,12 +204,27 @@ class ThreadsPosterApp:
             self.logger.info("========== 資料庫統計摘要 ==========")
             self.logger.info(f"文章總數: {stats.get('articles_count', 0)}")
             self.logger.info(f"用戶總數: {stats.get('users_count', 0)}")
+            if "posts_count" in stats:
+                self.logger.info(f"發文總數: {stats.get('posts_count', 0)}")
+            if stats.get("snapshot_drift"):
+                self.logger.warning(f"統計快照與估計數量不一致: {stats['snapshot_drift']}")
             
             # 輸出快取統計
             cache_stats = stats.get("cache", {})
             self.logger.info("快取使用情況:")
             for cache_name, size in cache_stats.items():
                 self.logger.info(f"  - {cache_name}: {size} 項")
+            cache_registry_stats = stats.get("performance", {}).get("caches", {})
+            if cache_registry_stats:
+                self.logger.info(
+                    f"快取記憶體用量: {cache_registry_stats.get('total_bytes', 0) / 1024:.1f} KB / "
+                    f"{cache_registry_stats.get('total_max_bytes', 0) / 1024:.1f} KB"
+                )
+                for cache_name, cache_info in cache_registry_stats.get("caches", {}).items():
+                    self.logger.info(
+                        f"  - {cache_name}: 命中率={cache_info.get('hit_rate', 0):.1f}%, "
+                        f"淘汰={cache_info.get('evictions', 0)}, {cache_info.get('bytes', 0) / 1024:.1f} KB"
+                    )
                 
             # 輸出流量統計
             traffic_stats = stats.get("traffic", {})
@@ -186,6 +232,8 @@ class ThreadsPosterApp:
                 self.logger.info("流量統計:")
                 self.logger.info(f"  - 總讀取操作: {traffic_stats.get('read_operations', 0)}")
                 self.logger.info(f"  - 總寫入操作: {traffic_stats.get('write_operations', 0)}")
+                self.logger.info(f"  - 失敗操作: {traffic_stats.get('failed_operations', 0)}")
+                self.logger.info(f"  - 平均耗時: {traffic_stats.get('avg_duration_ms', 0):.2f}ms")
                 self.logger.info(f"  - 快取命中率: {traffic_stats.get('cache_hit_rate', 0):.2f}%")
                 
                 # 格式化流量數據
@@ -202,6 +250,34 @@ class ThreadsPosterApp:
                 self.logger.info(f"  - 總發送流量: {sent}")
                 self.logger.info(f"  - 總接收流量: {received}")
                 
+                # 各集合流量
+                for collection, collection_stats in traffic_stats.get("collections", {}).items():
+                    self.logger.info(
+                        f"  - {collection}: 發送={format_bytes(collection_stats.get('bytes_sent', 0))}, "
+                        f"接收={format_bytes(collection_stats.get('bytes_received', 0))}"
+                    )
+                
+            # 耗時分佈（依 p95 排序，只列出最慢的幾項）
+            latency = stats.get("latency", {})
+            if latency:
+                self.logger.info("指令耗時分佈:")
+                for name, summary in sorted(latency.items(), key=lambda item: item[1]["p95_ms"], reverse=True)[:5]:
+                    self.logger.info(
+                        f"  - {name}: 次數={summary['count']}, p50={summary['p50_ms']:.1f}ms, "
+                        f"p95={summary['p95_ms']:.1f}ms, p99={summary['p99_ms']:.1f}ms"
+                    )
+                pool_wait = stats.get("pool_wait", {})
+                if pool_wait.get("count"):
+                    self.logger.info(f"  - 連線池等待: p95={pool_wait['p95_ms']:.1f}ms, 最長={pool_wait['max_ms']:.1f}ms")
+                    
+            # 並行查詢合併統計
+            single_flight = stats.get("single_flight")
+            if single_flight:
+                self.logger.info(
+                    f"查詢合併: 呼叫={single_flight.get('calls', 0)}, "
+                    f"實際查詢={single_flight.get('executions', 0)}, 合併={single_flight.get('coalesced', 0)}"
+                )
+                
             self.logger.info("=====================================")
             
         except Exception as e:
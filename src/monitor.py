@@ -13,12 +13,14 @@ Changes:
 - 優化發文內容日誌記錄，顯示完整文章
 - 調整發文上限為每日5次
 - 適配新的發文計劃系統
+- 修正發文後儲存發文記錄與文章的呼叫方式
+- 發文前檢查內容是否與已發布的文章重複
+- 發文與文章改以單一操作儲存
 """
 
 import logging
 import asyncio
 import signal
-from datetime import datetime
 from typing import Optional
 
 from src.database import Database
@@ -83,6 +85,12 @@ class Monitor:
                         await asyncio.sleep(300)  # 休息5分鐘後再試
                         continue
 
+                    # 已發布過的內容不再發布
+                    if await self.database.is_duplicate_content(content):
+                        self.logger.warning("內容與已發布的文章重複，略過發布")
+                        await asyncio.sleep(60)
+                        continue
+
                     # 使用 AI 處理器分析內容情感
                     sentiment = await self.ai_handler.analyze_sentiment(content)
                     self.logger.info("內容情感分析：%s", sentiment)
@@ -91,14 +99,8 @@ class Monitor:
                     post_id = await self.threads_handler.post_content(content)
                     
                     if post_id is not None:
-                        # 儲存發文記錄
-                        post_data = {
-                            "post_id": post_id,
-                            "content": content,
-                            "sentiment": sentiment,
-                            "timestamp": datetime.now()
-                        }
-                        if await self.database.save_article(post_id, content, []):
+                        # 發文與文章以單一操作儲存
+                        if await self.database.save_post_record(post_id, content, [], sentiment=sentiment):
                             # 更新發文計數
                             await self.database.increment_post_count()
                             
@@ -220,6 +222,12 @@ class LunaThreadsMonitor:
                         await asyncio.sleep(300)  # 休息5分鐘後再試
                         continue
                     
+                    # 已發布過的內容不再發布，不浪費 API 與資料庫請求
+                    if await self.db_handler.is_duplicate_content(content):
+                        self.logger.warning("內容與已發布的文章重複，略過發布")
+                        await asyncio.sleep(60)
+                        continue
+                    
                     # 發布文章
                     self.logger.info("正在發布文章...")
                     self.logger.info("文章內容: %s", content)
@@ -228,19 +236,8 @@ class LunaThreadsMonitor:
                     if post_id:
                         # 儲存發文記錄
                         self.logger.info("發文成功，ID: %s", post_id)
-                        await self.db_handler.save_post({
-                            "post_id": post_id,
-                            "content": content,
-                            "timestamp": datetime.now(),
-                            "status": "published"
-                        })
-                        
-                        # 儲存文章內容
-                        await self.db_handler.save_article({
-                            "post_id": post_id,
-                            "content": content,
-                            "created_at": datetime.now()
-                        })
+                        # 發文與文章以單一操作儲存
+                        await self.db_handler.save_post_record(post_id, content, [], status="published")
                         
                         # 更新發文計數並計算下次發文時間
                         await self.time_controller.wait_until_next_post()
@@ -9,6 +9,8 @@ Changes:
 - 添加操作計時功能
 - 添加數據庫操作統計
 - 添加API請求監控
+- 摘要加入各快取的容量與命中統計
+- 摘要加入內容驗證的失敗原因統計
 """
 
 import os
@@ -25,6 +27,8 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional, Callable
 import pytz
 from collections import defaultdict
+from src.cache_manager import cache_registry
+from src.content_validator import get_validation_stats
 
 class PerformanceMonitor:
     """性能監控器類別"""
@@ -436,7 +440,9 @@ class PerformanceMonitor:
                 "cache_misses": self.db_stats["cache_misses"],
                 "cache_hit_rate": (self.db_stats["cache_hits"] / max(1, self.db_stats["cache_hits"] + self.db_stats["cache_misses"])) * 100
             },
-            "db_operations": self.get_db_operations_report(10)  # 包含前10筆操作
+            "db_operations": self.get_db_operations_report(10),  # 包含前10筆操作
+            "caches": cache_registry.get_stats(),
+            "content_validation": get_validation_stats()
         }
         
     def reset_stats(self):
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+資料庫連線池與傳輸壓縮基準測試
+
+重放程式記錄的操作組合（logs/db_operations/op_mix.json），依序測試不同的連線池大小
+與傳輸壓縮格式，輸出吞吐量、延遲、伺服器連線數與網路傳輸量。
+請對本地測試用的 mongod 執行，測試資料庫會在結束時刪除。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+import pytz
+import motor.motor_asyncio
+
+# 添加專案根目錄到路徑，以便能夠導入相關模組
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(project_root)
+
+from src.database import resolve_compressors
+from src.db_monitoring import LatencyHistogram
+
+# 沒有操作組合檔案時使用的預設組合（集合.指令 -> 次數），接近發文程式的實際比例
+DEFAULT_OP_MIX = {
+    "posts.find": 30,
+    "articles.find": 20,
+    "articles.update": 15,
+    "posts.update": 10,
+    "daily_counters.find": 10,
+    "daily_counters.update": 10,
+    "articles.aggregate": 5
+}
+
+# 可重放的指令
+SUPPORTED_COMMANDS = {"find", "aggregate", "count", "update", "insert", "delete"}
+
+# 每個集合預先建立的文檔數量
+SEED_DOCUMENTS = 1000
+
+
+def load_op_mix(path):
+    """讀取操作組合
+
+    Args:
+        path: 操作組合檔案路徑，不存在時使用預設組合
+
+    Returns:
+        list: [(集合, 指令, 比重), ...]
+    """
+    ops = DEFAULT_OP_MIX
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            ops = json.load(f).get("ops", {}) or DEFAULT_OP_MIX
+        print(f"使用操作組合: {path}")
+    else:
+        print("使用預設操作組合")
+
+    mix = []
+    for name, count in ops.items():
+        collection, _, command = name.rpartition(".")
+        if command not in SUPPORTED_COMMANDS or not collection or collection.startswith("$"):
+            continue
+        mix.append((collection, command, count))
+    if not mix:
+        raise ValueError("操作組合中沒有可重放的指令")
+    return mix
+
+
+async def seed(db, collections):
+    """建立測試資料
+
+    Args:
+        db: 測試資料庫
+        collections: 集合名稱列表
+    """
+    now = datetime.now(pytz.UTC)
+    for collection in collections:
+        await db[collection].drop()
+        await db[collection].insert_many([
+            {
+                "key": i,
+                "content": "測試內容" * random.randint(10, 60),
+                "topics": random.sample(["遊戲", "動漫", "科技", "生活", "音樂"], 2),
+                "created_at": now - timedelta(minutes=i)
+            }
+            for i in range(SEED_DOCUMENTS)
+        ])
+        await db[collection].create_index("key")
+        await db[collection].create_index("created_at")
+
+
+async def run_op(db, collection, command):
+    """執行一次操作
+
+    Args:
+        db: 測試資料庫
+        collection: 集合名稱
+        command: 指令名稱
+    """
+    key = random.randrange(SEED_DOCUMENTS)
+    coll = db[collection]
+    if command == "find":
+        await coll.find_one({"key": key})
+    elif command == "aggregate":
+        since = datetime.now(pytz.UTC) - timedelta(hours=6)
+        await coll.aggregate([
+            {"$match": {"created_at": {"$gte": since}}},
+            {"$group": {"_id": {"$hour": "$created_at"}, "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+    elif command == "count":
+        await coll.count_documents({"key": {"$lt": key}})
+    elif command == "update":
+        await coll.update_one({"key": key}, {"$set": {"updated_at": datetime.now(pytz.UTC)}}, upsert=True)
+    elif command == "insert":
+        await coll.insert_one({"key": SEED_DOCUMENTS + key, "content": "新增內容", "created_at": datetime.now(pytz.UTC)})
+    elif command == "delete":
+        await coll.delete_one({"key": SEED_DOCUMENTS + key})
+
+
+async def server_status(client):
+    """取得伺服器的連線數與網路傳輸量
+
+    Args:
+        client: 資料庫客戶端
+
+    Returns:
+        dict: 目前連線數與收發位元組數（有壓縮時為實際傳輸量）
+    """
+    status = await client.admin.command("serverStatus")
+    network = status.get("network", {})
+    return {
+        "connections": status.get("connections", {}).get("current", 0),
+        "bytes_in": network.get("physicalBytesIn", network.get("bytesIn", 0)),
+        "bytes_out": network.get("physicalBytesOut", network.get("bytesOut", 0))
+    }
+
+
+async def run_config(args, mix, max_pool, min_pool, compressor):
+    """以單一設定執行測試
+
+    Args:
+        args: 命令行參數
+        mix: 操作組合
+        max_pool: 最大連線池大小
+        min_pool: 最小連線池大小
+        compressor: 傳輸壓縮格式，none 表示不壓縮
+
+    Returns:
+        dict: 測試結果
+    """
+    options = {"maxPoolSize": max_pool, "minPoolSize": min_pool}
+    if compressor != "none":
+        options["compressors"] = compressor
+    client = motor.motor_asyncio.AsyncIOMotorClient(args.uri, **options)
+    monitor = motor.motor_asyncio.AsyncIOMotorClient(args.uri, maxPoolSize=1)
+    db = client[args.db]
+
+    try:
+        # 暖機，讓連線池建立連線
+        for collection, command, _ in mix:
+            await run_op(db, collection, command)
+
+        weights = [count for _, _, count in mix]
+        histogram = LatencyHistogram()
+        before = await server_status(monitor)
+        remaining = args.ops
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                collection, command, _ = random.choices(mix, weights=weights)[0]
+                start = time.perf_counter()
+                await run_op(db, collection, command)
+                histogram.record(int((time.perf_counter() - start) * 1_000_000))
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - start
+        after = await server_status(monitor)
+
+        # 閒置一段時間後的連線數，反映 minPoolSize 在低流量時的成本
+        await asyncio.sleep(args.idle)
+        idle = await server_status(monitor)
+
+        summary = histogram.summary()
+        return {
+            "max_pool": max_pool,
+            "min_pool": min_pool,
+            "compressor": compressor,
+            "ops_per_second": round(args.ops / elapsed, 1),
+            "p50_ms": round(summary["p50_ms"], 2),
+            "p95_ms": round(summary["p95_ms"], 2),
+            "p99_ms": round(summary["p99_ms"], 2),
+            # 扣除監控用的單一連線
+            "connections": after["connections"] - 1,
+            "idle_connections": idle["connections"] - 1,
+            "bytes_in": after["bytes_in"] - before["bytes_in"],
+            "bytes_out": after["bytes_out"] - before["bytes_out"]
+        }
+    finally:
+        client.close()
+        monitor.close()
+
+
+def parse_list(value, cast=str):
+    """解析以逗號分隔的參數"""
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+async def main_async(args):
+    """執行所有設定組合的測試"""
+    mix = load_op_mix(args.mix)
+    compressors = (["none"] if "none" in parse_list(args.compressors) else []) + resolve_compressors(args.compressors)
+
+    setup_client = motor.motor_asyncio.AsyncIOMotorClient(args.uri)
+    try:
+        await seed(setup_client[args.db], sorted({collection for collection, _, _ in mix}))
+
+        results = []
+        for compressor in compressors:
+            for max_pool in parse_list(args.pool_sizes, int):
+                for min_pool in parse_list(args.min_pool_sizes, int):
+                    if min_pool > max_pool:
+                        continue
+                    result = await run_config(args, mix, max_pool, min_pool, compressor)
+                    results.append(result)
+                    print(
+                        f"compressor={compressor:6} maxPool={max_pool:3} minPool={min_pool:3} | "
+                        f"{result['ops_per_second']:8.1f} ops/s | p50={result['p50_ms']:.2f}ms "
+                        f"p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms | "
+                        f"連線={result['connections']} 閒置連線={result['idle_connections']} | "
+                        f"收={result['bytes_in']} B 發={result['bytes_out']} B"
+                    )
+    finally:
+        if not args.keep_data:
+            await setup_client.drop_database(args.db)
+        setup_client.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入: {args.output}")
+
+
+def main():
+    """主函數：解析命令行參數並執行基準測試"""
+    parser = argparse.ArgumentParser(description='資料庫連線池與傳輸壓縮基準測試')
+    parser.add_argument('--uri', default='mongodb://localhost:27017', help='測試用 mongod 的連線字串')
+    parser.add_argument('--db', default='threadsposter_benchmark', help='測試資料庫名稱（結束時刪除）')
+    parser.add_argument('--mix', default=os.getenv("DB_OP_MIX_PATH", "logs/db_operations/op_mix.json"),
+                        help='操作組合檔案')
+    parser.add_argument('--ops', type=int, default=2000, help='每組設定執行的操作數量')
+    parser.add_argument('--concurrency', type=int, default=8, help='並行的操作數量')
+    parser.add_argument('--pool-sizes', default='1,5,10,50', help='要測試的最大連線池大小')
+    parser.add_argument('--min-pool-sizes', default='0,10', help='要測試的最小連線池大小')
+    parser.add_argument('--compressors', default='none,zstd,snappy,zlib', help='要測試的傳輸壓縮格式')
+    parser.add_argument('--idle', type=float, default=2.0, help='測量閒置連線數前等待的秒數')
+    parser.add_argument('--output', help='將結果寫入 JSON 檔案')
+    parser.add_argument('--keep-data', action='store_true', help='結束時保留測試資料庫')
+
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
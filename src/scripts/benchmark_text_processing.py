@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+文本正規化基準測試
+
+以模擬的 AI 候選內容（中文夾雜英文單字、表情符號與重複標點）比較舊的多次替換清理方式
+與 text_processing 單次掃描的耗時。舊的實作複製於本檔案中作為對照。
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+# 添加專案根目錄到路徑，以便能夠導入相關模組
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(project_root)
+
+from src.text_processing import ADDRESS_REPLACEMENTS, ENGLISH_TO_CHINESE, TextNormalizer
+
+CHINESE_PHRASES = [
+    "今天終於把新遊戲破關了", "深夜還在追新番", "剛剛喝到超好喝的咖啡", "這週的漫展好多人",
+    "哥哥們推薦的手遊真的很好玩", "想找人一起開黑", "下雨天最適合在家看動畫", "新買的鍵盤手感超棒",
+    "弟弟說這個角色很難練", "突然好想吃拉麵", "明天又要上班了", "這個劇情也太感人了吧"
+]
+ENGLISH_WORDS = list(ENGLISH_TO_CHINESE) + ["RPG", "Switch", "coding", "weekend", "anime", "boss"]
+EMOJIS = ["✨", "🎮", "😊", "💕", "🌙", "🎵", "😭", "🔥"]
+PUNCTUATION = ["！", "!!!", "？？", "。", "～～", "...", "，", " "]
+
+
+def make_candidates(count: int, english_ratio: float = 0.4, seed: int = 42):
+    """產生模擬的候選內容
+
+    Args:
+        count: 候選數量
+        english_ratio: 每個片段後夾雜英文單字的機率
+        seed: 亂數種子
+
+    Returns:
+        list: 候選內容
+    """
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(count):
+        parts = []
+        while sum(len(part) for part in parts) < rng.randint(80, 320):
+            parts.append(rng.choice(CHINESE_PHRASES))
+            if rng.random() < english_ratio:
+                parts.append(f" {rng.choice(ENGLISH_WORDS)} ")
+            if rng.random() < 0.3:
+                parts.append(rng.choice(EMOJIS) * rng.randint(1, 2))
+            parts.append(rng.choice(PUNCTUATION))
+        candidates.append("".join(parts))
+    return candidates
+
+
+def legacy_sanitize_text(text, max_length=280):
+    """舊版 ai_handler.sanitize_text（對照用）"""
+    if not text:
+        return ""
+    text = re.sub(r'\s+', ' ', text).strip()
+    english_to_chinese = dict(ENGLISH_TO_CHINESE)
+    english_pattern = re.compile(r'\b[a-zA-Z]+\b')
+    for word in english_pattern.findall(text):
+        word_lower = word.lower()
+        if word_lower in english_to_chinese:
+            text = text.replace(word, english_to_chinese[word_lower])
+        else:
+            text = text.replace(word, '')
+    if len(text) > max_length:
+        truncate_pos = text.rfind('.', 0, max_length)
+        if truncate_pos == -1:
+            truncate_pos = text.rfind('!', 0, max_length)
+        if truncate_pos == -1:
+            truncate_pos = text.rfind('?', 0, max_length)
+        if truncate_pos == -1:
+            truncate_pos = max_length
+        text = text[:truncate_pos + 1]
+    if not text.endswith(('.', '!', '?', '。', '！', '？')):
+        text = text + '。'
+    return text
+
+
+def legacy_clean_content(content, max_length=280):
+    """舊版 AIHandler._clean_content（對照用）"""
+    if not content:
+        return None
+    content = ' '.join(content.split())
+    for phrase, replacement in ADDRESS_REPLACEMENTS.items():
+        content = content.replace(phrase, replacement)
+    english_to_chinese = dict(ENGLISH_TO_CHINESE)
+    english_pattern = re.compile(r'\b[a-zA-Z]+\b')
+    for word in english_pattern.findall(content):
+        word_lower = word.lower()
+        if word_lower in english_to_chinese:
+            content = content.replace(word, english_to_chinese[word_lower])
+        else:
+            content = content.replace(word, '')
+    content = re.sub(r'[!！]{2,}', '！', content)
+    content = re.sub(r'[?？]{2,}', '？', content)
+    content = re.sub(r'[.。]{2,}', '。', content)
+    content = re.sub(r'[~～]{2,}', '～', content)
+    emoji_pattern = re.compile("["
+        u"\U0001F600-\U0001F64F"
+        u"\U0001F300-\U0001F5FF"
+        u"\U0001F680-\U0001F6FF"
+        u"\U0001F1E0-\U0001F1FF"
+        u"\U00002702-\U000027B0"
+        u"\U000024C2-\U0001F251"
+        "]+", flags=re.UNICODE)
+    emoji_positions = [m.span() for m in emoji_pattern.finditer(content)]
+    if len(emoji_positions) > 2:
+        content = ''.join([
+            content[:emoji_positions[0][0]],
+            content[emoji_positions[0][0]:emoji_positions[0][1]],
+            content[emoji_positions[-1][0]:emoji_positions[-1][1]],
+            content[emoji_positions[-1][1]:]
+        ])
+    if len(content) > max_length:
+        content = content[:max_length]
+    if not any(content.endswith(p) for p in ['！', '？', '。', '～']):
+        content += '！'
+    return content
+
+
+def measure(func, candidates, repeat):
+    """量測處理所有候選內容的最短耗時
+
+    Args:
+        func: 清理函數
+        candidates: 候選內容
+        repeat: 重複次數
+
+    Returns:
+        float: 每個候選內容的平均耗時（微秒）
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for candidate in candidates:
+            func(candidate)
+        best = min(best, time.perf_counter() - start)
+    return best / len(candidates) * 1_000_000
+
+
+def main():
+    """主函數：解析命令行參數並執行基準測試"""
+    parser = argparse.ArgumentParser(description='文本正規化基準測試')
+    parser.add_argument('--candidates', type=int, default=2000, help='候選內容數量')
+    parser.add_argument('--repeat', type=int, default=5, help='重複次數（取最短耗時）')
+    parser.add_argument('--max-length', type=int, default=280, help='最大長度')
+    parser.add_argument('--english-ratio', type=float, default=0.4, help='夾雜英文單字的比例（0 到 1）')
+    args = parser.parse_args()
+
+    candidates = make_candidates(args.candidates, args.english_ratio)
+    sanitizer = TextNormalizer(collapse_punctuation=False)
+    content_normalizer = TextNormalizer(phrases=ADDRESS_REPLACEMENTS, max_emojis=2)
+    cases = [
+        ("sanitize_text", legacy_sanitize_text,
+         lambda text: sanitizer.normalize(text, args.max_length, valid_endings=('.', '!', '?', '。', '！', '？'))),
+        ("_clean_content", legacy_clean_content,
+         lambda text: content_normalizer.normalize(text, args.max_length, ending='！',
+                                                   valid_endings=('！', '？', '。', '～'))),
+    ]
+
+    average_length = sum(len(candidate) for candidate in candidates) / len(candidates)
+    print(f"候選內容：{len(candidates)} 筆，平均 {average_length:.0f} 字")
+    for name, legacy, current in cases:
+        legacy_us = measure(lambda text: legacy(text, args.max_length), candidates, args.repeat)
+        current_us = measure(current, candidates, args.repeat)
+        print(f"{name:15} | 舊版 {legacy_us:8.1f} µs/筆 | 單次掃描 {current_us:8.1f} µs/筆 | "
+              f"加速 {legacy_us / current_us:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
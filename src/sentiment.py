@@ -0,0 +1,177 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 本地詞典情感分析，以情感詞典為文本評分，不需呼叫 AI 服務
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 詞典詞彙與否定詞預先編譯為單一正規表示式，一次掃描完成比對
+- 支援否定詞反轉情感與雙重否定，並以子句為否定範圍
+- 返回與 AI 情感分析相同格式的百分比，另附信心值供決定是否改用 AI 分析
+- 單字情感詞排除常見的不相關複合詞並降低權重，至少兩個正負面詞才有信心值
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+# 詞典分類對應的情感欄位
+LEXICON_POLARITIES = {
+    "正面": "positive",
+    "中性": "neutral",
+    "負面": "negative"
+}
+
+# 否定詞，反轉之後的情感詞
+DEFAULT_NEGATORS = (
+    "一點也不", "不怎麼", "不太", "不是", "並不", "並沒有", "沒有", "從不", "毫不",
+    "無法", "不會", "不", "沒", "別", "未"
+)
+
+# 含有否定字但本身不是否定的詞，比對時略過，避免「特別開心」被視為否定
+DEFAULT_NEGATION_EXCEPTIONS = (
+    "特別", "別人", "分別", "區別", "不過", "不同", "不少", "不錯", "不得不",
+    "忍不住", "沒關係", "未來"
+)
+
+# 含有單字情感詞但本身不表達該情感的複合詞，比對時略過（「美國」不是「美」，「想念」不是「想」）
+DEFAULT_COMPOUND_EXCEPTIONS = (
+    "美國", "美元", "美金", "美洲", "美術", "美式", "美東", "美西", "歐美", "南美", "北美",
+    "棒球", "球棒", "棒子", "接棒", "冰棒",
+    "想念", "想法", "想像", "理想", "思想", "感想", "夢想"
+)
+
+# 否定詞影響範圍（否定詞之後的字元數）
+NEGATION_WINDOW = 4
+
+# 被否定的負面詞（例如「不難過」）只算微弱的正面
+NEGATED_NEGATIVE_WEIGHT = 0.5
+
+# 單字情感詞容易出現在不相關的詞中，只算一半的權重
+SINGLE_CHARACTER_WEIGHT = 0.5
+
+# 中性的基礎權重，避免只有一個情感詞時整段文本被判為 100%
+NEUTRAL_PRIOR = 0.5
+
+# 信心值達到 1 所需的正負面詞權重
+CONFIDENCE_EVIDENCE = 2.0
+
+# 至少比對到幾個正負面詞才有信心值，只有一個情感詞時一律改用 AI 分析
+MIN_POLAR_HITS = 2
+
+# 子句分隔符號，否定不會跨越子句
+CLAUSE_PATTERN = re.compile(r"[，。！？、；：,.!?;:\n~～…]+")
+
+# 無法判斷時的預設結果，與 AI 情感分析失敗時相同
+NEUTRAL_SCORES = {"positive": 33.33, "neutral": 33.33, "negative": 33.33}
+
+
+class LexiconSentimentAnalyzer:
+    """本地詞典情感分析器
+
+    將情感詞典、否定詞與例外詞依長度由長到短組成單一正規表示式，較長的詞優先比對
+    （「不開心」優先於否定詞「不」加上「開心」）。否定詞會反轉範圍內下一個情感詞，
+    連續兩個否定詞互相抵銷。單字情感詞以複合詞例外排除不相關的詞，且只算一半的權重。
+    """
+
+    def __init__(self, lexicons: Dict[str, Iterable[str]],
+                 negators: Iterable[str] = DEFAULT_NEGATORS,
+                 exceptions: Iterable[str] = DEFAULT_NEGATION_EXCEPTIONS,
+                 compounds: Iterable[str] = DEFAULT_COMPOUND_EXCEPTIONS,
+                 negation_window: int = NEGATION_WINDOW):
+        """初始化情感分析器
+
+        Args:
+            lexicons: 情感詞典，鍵為「正面」、「中性」、「負面」
+            negators: 否定詞
+            exceptions: 含否定字但不是否定的詞
+            compounds: 含單字情感詞但不表達該情感的複合詞
+            negation_window: 否定詞影響範圍（字元數）
+        """
+        self.negation_window = negation_window
+        self._terms: Dict[str, Optional[str]] = {}
+        for name, polarity in LEXICON_POLARITIES.items():
+            for term in lexicons.get(name, []):
+                # 同一個詞出現在多個分類時以先出現的分類為準
+                self._terms.setdefault(term.lower(), polarity)
+        self._negators = {negator.lower() for negator in negators}
+        # 例外詞對應 None，比對到時直接略過
+        for exception in (*exceptions, *compounds):
+            self._terms.setdefault(exception.lower(), None)
+
+        tokens = sorted(set(self._terms) | self._negators, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(token) for token in tokens), re.IGNORECASE)
+
+    def _score_clause(self, clause: str, weights: Dict[str, float]) -> Tuple[int, int]:
+        """為單一子句評分，累加到 weights
+
+        Args:
+            clause: 子句
+            weights: 各情感的累計權重
+
+        Returns:
+            Tuple[int, int]: (比對到的情感詞數量, 其中正負面詞的數量)
+        """
+        hits = 0
+        polar_hits = 0
+        negated = False
+        negation_end = 0
+        for match in self._pattern.finditer(clause):
+            token = match.group(0).lower()
+            if negated and match.start() > negation_end + self.negation_window:
+                negated = False
+            if token in self._negators and token not in self._terms:
+                negated = not negated
+                negation_end = match.end()
+                continue
+
+            polarity = self._terms[token]
+            if polarity is None:
+                continue
+            hits += 1
+            weight = SINGLE_CHARACTER_WEIGHT if len(token) == 1 else 1.0
+            if negated:
+                if polarity == "positive":
+                    polarity = "negative"
+                elif polarity == "negative":
+                    polarity = "positive"
+                    weight *= NEGATED_NEGATIVE_WEIGHT
+                negated = False
+            if polarity != "neutral":
+                polar_hits += 1
+            weights[polarity] += weight
+        return hits, polar_hits
+
+    def analyze(self, text: str) -> Tuple[Dict[str, float], float]:
+        """分析文本情感
+
+        Args:
+            text: 要分析的文本
+
+        Returns:
+            Tuple[Dict[str, float], float]: (正面、中性、負面百分比, 信心值 0-1)；
+            沒有比對到任何情感詞時返回平均分佈與信心值 0，正負面詞少於 MIN_POLAR_HITS 個時信心值為 0
+        """
+        weights = {"positive": 0.0, "neutral": 0.0, "negative": 0.0}
+        hits = 0
+        polar_hits = 0
+        for clause in CLAUSE_PATTERN.split(text or ""):
+            if clause:
+                clause_hits, clause_polar_hits = self._score_clause(clause, weights)
+                hits += clause_hits
+                polar_hits += clause_polar_hits
+
+        if hits == 0:
+            return dict(NEUTRAL_SCORES), 0.0
+
+        # 正負面詞越多、越一致，信心值越高
+        polar = weights["positive"] + weights["negative"]
+        confidence = 0.0
+        if polar_hits >= MIN_POLAR_HITS:
+            evidence = min(1.0, polar / CONFIDENCE_EVIDENCE)
+            confidence = evidence * abs(weights["positive"] - weights["negative"]) / polar
+
+        weights["neutral"] += NEUTRAL_PRIOR
+        total = sum(weights.values())
+        scores = {polarity: round(weight / total * 100, 2) for polarity, weight in weights.items()}
+        return scores, round(confidence, 2)
@@ -11,6 +11,9 @@ Changes:
 - 支援時間特定的表達方式
 - 加入情緒與主題相關表達模式
 - 新增資料庫持久化功能
+- 其他程序修改說話模式時自動套用
+- 新增句子驗證標準，不完整句子模式集中定義
+- 主題關鍵詞加入版本號，變更時遞增
 """
 
 import random
@@ -20,6 +23,20 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 import pytz
 
+# 不完整句子的結尾模式
+INCOMPLETE_PATTERNS = [
+    r'對我的$',
+    r'這麼$',
+    r'好想$',
+    r'不行$',
+    r'好棒$',
+    r'好可愛$',
+    r'好厲害$',
+    r'好喜歡$',
+    r'好期待$',
+    r'好興奮$'
+]
+
 class SpeakingPatterns:
     """說話模式管理器，負責根據不同場景、時間和情境生成適合的表達模式"""
     
@@ -58,6 +75,9 @@ class SpeakingPatterns:
             }
         }
         
+        # 主題關鍵詞每次被替換時遞增，供使用者判斷是否需要重建比對器
+        self.topics_keywords_version = 0
+        
         # 初始化說話風格，後續可以從資料庫加載
         self._initialize_default_speaking_styles()
         
@@ -69,6 +89,43 @@ class SpeakingPatterns:
         """
         self.db = db_handler
         
+        # 其他程序修改說話模式時同步更新
+        if hasattr(db_handler, 'add_cache_listener'):
+            db_handler.add_cache_listener(self._on_patterns_changed)
+            
+    def _on_patterns_changed(self, collection: str, key: Any, document: Optional[Dict[str, Any]]):
+        """資料庫中的說話模式被修改時套用最新內容
+        
+        Args:
+            collection: 集合名稱
+            key: 模式類型
+            document: 最新文檔，None 表示已刪除
+        """
+        if collection != "speaking_patterns" or document is None:
+            return
+            
+        # 模式類型 -> (文檔欄位, 屬性名稱)
+        fields = {
+            "speaking_styles": ("styles", "speaking_styles"),
+            "topics_keywords": ("keywords", "topics_keywords"),
+            "sentiment_dict": ("sentiments", "sentiment_dict"),
+            "time_specific_patterns": ("patterns", "time_specific_patterns")
+        }
+        if key not in fields:
+            return
+            
+        # 本地尚未保存的修改優先
+        if self.patterns_modified.get(key):
+            self.logger.warning(f"說話模式 {key} 已被其他程序修改，但本地有尚未保存的變更")
+            return
+            
+        field, attribute = fields[key]
+        if field in document:
+            setattr(self, attribute, document[field])
+            if attribute == "topics_keywords":
+                self.topics_keywords_version += 1
+            self.logger.info(f"已套用其他程序更新的說話模式：{key}")
+
     async def initialize(self):
         """初始化說話模式，從資料庫載入或使用預設值"""
         if self.db:
@@ -250,6 +307,7 @@ class SpeakingPatterns:
                 "心情", "感受", "情緒", "想法", "生活", "日常"
             ]
         }
+        self.topics_keywords_version += 1
         
         # 定義情感詞典
         self.sentiment_dict = {
@@ -367,6 +425,7 @@ class SpeakingPatterns:
                 
             if "topics_keywords" in patterns_data and "keywords" in patterns_data["topics_keywords"]:
                 self.topics_keywords = patterns_data["topics_keywords"]["keywords"]
+                self.topics_keywords_version += 1
                 self.logger.info("從資料庫載入主題關鍵詞成功")
                 
             if "sentiment_dict" in patterns_data and "sentiments" in patterns_data["sentiment_dict"]:
@@ -609,6 +668,33 @@ class SpeakingPatterns:
             
         return f"請你根據「{topic}」這個主題，以Luna的身分寫一篇完整的貼文。提示詞是：{prompt_text}。記得要符合人設特徵，並確保文章內容完整、有頭有尾。"
     
+    def get_sentence_validation_criteria(self) -> Dict[str, Any]:
+        """獲取 AI 處理器生成句子的驗證標準（需以開頭詞開頭）
+        
+        Returns:
+            Dict[str, Any]: 句子驗證標準
+        """
+        return {
+            "min_length": 15,
+            "max_length": 100,
+            "min_emoticons": 1,
+            "max_emoticons": 3,
+            "emoticons": "🎨🎭🎬💕💖💫💭💡🙈✨😊🎮🎵❤️😓🌙🌃",
+            "required_ending_chars": ["！", "。", "？", "～"],
+            "valid_starts": [
+                # 中文開頭詞
+                "欸", "啊", "咦", "哇", "唔", "呼",
+                "天啊", "不會吧", "我的天", "嘿嘿",
+                "大家好", "哇哦", "今天",
+                "好想", "好喜歡", "最近", "深夜",
+                # 日語開頭詞
+                "あれ", "ねえ", "えっと", "わあ",
+                "うーん", "あのね", "みなさん",
+                "今日", "こんにちは"
+            ],
+            "incomplete_patterns": INCOMPLETE_PATTERNS
+        }
+
     def get_content_validation_criteria(self) -> Dict[str, Any]:
         """獲取內容驗證標準
         
@@ -621,16 +707,5 @@ class SpeakingPatterns:
             "min_emoticons": 1,
             "max_emoticons": 2,
             "required_ending_chars": ["！", "。", "？", "～", "!", "?", "~"],
-            "incomplete_patterns": [
-                r'對我的$',
-                r'這麼$',
-                r'好想$',
-                r'不行$',
-                r'好棒$',
-                r'好可愛$',
-                r'好厲害$',
-                r'好喜歡$',
-                r'好期待$',
-                r'好興奮$'
-            ]
+            "incomplete_patterns": INCOMPLETE_PATTERNS
         } 
\ No newline at end of file
@@ -0,0 +1,1027 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: SQLite 資料庫類別，提供與 Database 相同的非同步介面
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 以 SQLite (WAL 模式) 實現 Database 的非同步介面，適用單一人設的小型部署
+- 所有阻塞操作在專用執行緒執行，不阻塞事件循環
+- 每日發文計數與文章在同一交易中寫入
+- 發文與文章記錄內容指紋，並以唯一索引避免重複內容
+- 用戶對話記錄支援附加並限制筆數
+- 發文與文章支援以 (時間, post_id) 游標分頁及串流讀取
+- 並行的第一次操作只建立一次連接
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import pytz
+
+from src.content_fingerprint import content_fingerprint
+from src.exceptions import DatabaseError
+from src.performance_monitor import performance_monitor, track_performance
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_id TEXT PRIMARY KEY,
+    timestamp TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts (timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_posts_timestamp_post_id ON posts (timestamp, post_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_fingerprint ON posts (json_extract(data, '$.fingerprint'))
+    WHERE json_extract(data, '$.fingerprint') IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS articles (
+    post_id TEXT PRIMARY KEY,
+    persona TEXT,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_created_at ON articles (created_at);
+CREATE INDEX IF NOT EXISTS idx_articles_persona_created_at ON articles (persona, created_at);
+CREATE INDEX IF NOT EXISTS idx_articles_created_at_post_id ON articles (created_at, post_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_fingerprint ON articles (json_extract(data, '$.fingerprint'))
+    WHERE json_extract(data, '$.fingerprint') IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS personality_memories (
+    context TEXT PRIMARY KEY,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS speaking_patterns (
+    type TEXT PRIMARY KEY,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS user_history (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS daily_counters (
+    id TEXT PRIMARY KEY,
+    persona TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# 各資料表的索引欄位：資料表 -> (主鍵欄位, 額外的索引欄位)
+TABLES = {
+    "posts": ("post_id", ("timestamp", "updated_at")),
+    "articles": ("post_id", ("persona", "created_at")),
+    "personality_memories": ("context", ("updated_at",)),
+    "speaking_patterns": ("type", ("updated_at",)),
+    "user_history": ("user_id", ())
+}
+
+
+def _to_utc_iso(value: datetime) -> str:
+    """將時間轉為可排序的 UTC ISO 字串，無時區資訊的時間視為 UTC
+
+    Args:
+        value: 時間
+
+    Returns:
+        str: UTC ISO 字串
+    """
+    if value.tzinfo is None:
+        value = pytz.UTC.localize(value)
+    return value.astimezone(pytz.UTC).isoformat(timespec="microseconds")
+
+
+def _json_default(value: Any) -> Any:
+    """JSON 序列化無法直接處理的型別"""
+    if isinstance(value, datetime):
+        return {"$date": _to_utc_iso(value)}
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    """還原 JSON 中的時間"""
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def _dumps(document: Dict[str, Any]) -> str:
+    """序列化文檔"""
+    return json.dumps(document, ensure_ascii=False, default=_json_default)
+
+
+def _loads(data: str) -> Dict[str, Any]:
+    """還原文檔"""
+    return json.loads(data, object_hook=_json_object_hook)
+
+
+# 分頁排序欄位：資料表 -> 時間欄位，以 (時間, post_id) 作為分頁游標
+PAGINATION_COLUMNS = {"posts": "timestamp", "articles": "created_at"}
+
+
+def _project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """依 MongoDB 投影格式保留或排除欄位"""
+    if projection is None:
+        return document
+    if any(value for key, value in projection.items() if key != "_id"):
+        return {key: document[key] for key, value in projection.items() if value and key in document}
+    return {key: value for key, value in document.items() if projection.get(key, 1)}
+
+
+def _column_value(value: Any) -> Any:
+    """轉換為索引欄位的值"""
+    if isinstance(value, datetime):
+        return _to_utc_iso(value)
+    return value
+
+
+class SQLiteDatabase:
+    """SQLite 資料庫，介面與 Database 相同"""
+
+    def __init__(self, config):
+        """初始化資料庫
+
+        Args:
+            config: 設定物件
+        """
+        self.config = config
+        self.path = getattr(config, "SQLITE_PATH", "data/threadsposter.db")
+        self.persona_id = getattr(config, "PERSONA_ID", "default")
+        memory_config = getattr(config, "MEMORY_CONFIG", {})
+        self.memory_max_history = memory_config.get("max_history", 10)
+        self.memory_max_records = memory_config.get("max_records", 50)
+        self.timezone = pytz.timezone("Asia/Taipei")
+        self.logger = logging.getLogger(__name__)
+        self.performance_monitor = performance_monitor
+        self.conn = None
+        # 所有 SQLite 操作都在同一個專用執行緒執行
+        self._executor = None
+        self._connect_lock = asyncio.Lock()
+
+    async def _run(self, func, *args):
+        """在專用執行緒執行阻塞操作
+
+        Args:
+            func: 要執行的函數
+            *args: 函數參數
+
+        Returns:
+            Any: 函數返回值
+        """
+        if self.conn is None:
+            await self.initialize()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    @track_performance("db_initialize")
+    async def initialize(self):
+        """初始化資料庫連接"""
+        try:
+            # 並行的第一次呼叫（包含 close() 之後由 _run 重新連接）只建立一次連接
+            async with self._connect_lock:
+                if self.conn is not None:
+                    return True
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+                loop = asyncio.get_running_loop()
+                self.conn = await loop.run_in_executor(self._executor, self._connect)
+            self.logger.info(f"SQLite 資料庫連接成功：{self.path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"資料庫連接失敗：{str(e)}")
+            raise DatabaseError(f"資料庫連接失敗：{str(e)}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """建立連接並初始化資料表（於專用執行緒執行）"""
+        if self.path != ":memory:":
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        return conn
+
+    async def close(self):
+        """關閉資料庫連接"""
+        if self.conn is not None:
+            try:
+                conn = self.conn
+                self.conn = None
+                await asyncio.get_running_loop().run_in_executor(self._executor, conn.close)
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                self.logger.info("資料庫連接已關閉")
+            except Exception as e:
+                self.logger.error(f"關閉資料庫連接時發生錯誤：{str(e)}")
+
+    def _counter_key(self, day: Optional[datetime] = None) -> str:
+        """取得每日計數的鍵值
+
+        Args:
+            day: 日期時間，預設為現在；以台北時間決定所屬日期
+
+        Returns:
+            str: 計數鍵值，格式為 "人設:YYYY-MM-DD"
+        """
+        if day is None:
+            day = datetime.now(self.timezone)
+        elif day.tzinfo is None:
+            day = pytz.UTC.localize(day)
+        return f"{self.persona_id}:{day.astimezone(self.timezone).strftime('%Y-%m-%d')}"
+
+    def _increment_counter(self, key: str, amount: int):
+        """增減每日發文計數（於專用執行緒、交易中執行）"""
+        self.conn.execute(
+            "INSERT INTO daily_counters (id, persona, day, count) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET count = count + excluded.count",
+            (key, self.persona_id, key.rsplit(":", 1)[1], amount)
+        )
+
+    def _merge_upsert(self, table: str, key: Any, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """合併更新單一文檔，行為與 MongoDB 的 $set upsert 相同（於專用執行緒執行）
+
+        Args:
+            table: 資料表名稱
+            key: 主鍵值
+            fields: 要更新的欄位
+
+        Returns:
+            Dict[str, Any]: 更新後的文檔
+        """
+        key_column, columns = TABLES[table]
+        row = self.conn.execute(
+            f"SELECT data FROM {table} WHERE {key_column} = ?", (key,)
+        ).fetchone()
+        document = _loads(row[0]) if row else {}
+        document.update({field: value for field, value in fields.items() if field != "_id"})
+        document[key_column] = key
+
+        names = [key_column, *columns, "data"]
+        values = [key, *[_column_value(document.get(column)) for column in columns], _dumps(document)]
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names[1:])
+        self.conn.execute(
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+            f"ON CONFLICT({key_column}) DO UPDATE SET {updates}",
+            values
+        )
+        return document
+
+    def _find_one(self, table: str, key: Any) -> Optional[Dict[str, Any]]:
+        """依主鍵讀取單一文檔（於專用執行緒執行）"""
+        key_column, _ = TABLES[table]
+        row = self.conn.execute(f"SELECT data FROM {table} WHERE {key_column} = ?", (key,)).fetchone()
+        return _loads(row[0]) if row else None
+
+    @track_performance("db_save_post")
+    async def save_post(self, post_data: dict) -> bool:
+        """儲存發文資料
+
+        Args:
+            post_data: 發文資料
+
+        Returns:
+            bool: 是否成功
+        """
+        for field in ["post_id", "content", "timestamp"]:
+            if field not in post_data:
+                self.logger.error(f"儲存發文失敗：缺少必要欄位 {field}")
+                self.performance_monitor.record_db_operation("insert", False)
+                return False
+
+        post_data["post_id"] = str(post_data["post_id"])
+        post_data["updated_at"] = datetime.now(pytz.UTC)
+        post_data.setdefault("fingerprint", content_fingerprint(post_data["content"]))
+
+        def save():
+            with self.conn:
+                self._merge_upsert("posts", post_data["post_id"], post_data)
+
+        try:
+            await self._run(save)
+            self.logger.info("成功儲存發文，ID：%s", post_data["post_id"])
+            self.performance_monitor.record_db_operation("insert", True, collection="posts",
+                                                      query=f"upsert(post_id={post_data['post_id']})")
+            return True
+        except Exception as e:
+            self.logger.error("儲存發文失敗：%s", str(e))
+            self.performance_monitor.record_db_operation("insert", False, collection="posts",
+                                                      query=f"upsert(post_id={post_data['post_id']})")
+            return False
+
+    @track_performance("db_get_post_count")
+    async def get_post_count(self) -> int:
+        """獲取今日發文數量
+
+        Returns:
+            int: 今日發文數量
+        """
+        return await self.get_daily_post_count()
+
+    @track_performance("db_get_daily_post_count")
+    async def get_daily_post_count(self, day: Optional[datetime] = None) -> int:
+        """獲取指定日期的發文數量
+
+        Args:
+            day: 日期時間，預設為今日（台北時間）
+
+        Returns:
+            int: 該日發文數量
+        """
+        key = self._counter_key(day)
+
+        def query():
+            row = self.conn.execute("SELECT count FROM daily_counters WHERE id = ?", (key,)).fetchone()
+            return row[0] if row else 0
+
+        try:
+            count = await self._run(query)
+            self.performance_monitor.record_db_operation("query", True, collection="daily_counters",
+                                                      query=f"find_one(_id={key})")
+            return count
+        except Exception as e:
+            self.logger.error(f"獲取每日發文計數時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="daily_counters",
+                                                      query=f"find_one(_id={key})")
+            raise DatabaseError(f"獲取每日發文計數失敗：{str(e)}")
+
+    @track_performance("db_increment_post_count")
+    async def increment_post_count(self):
+        """增加發文計數
+
+        每日計數已在 save_article 時與文章一併寫入，此方法僅保留相容性
+        """
+        self.logger.info("發文計數已增加")
+
+    @track_performance("db_reconcile_daily_counters")
+    async def reconcile_daily_counters(self, days: int = 7) -> Dict[str, Dict[str, int]]:
+        """依 articles 資料表重建最近幾天的每日發文計數
+
+        Args:
+            days: 要校正的天數（含今日）
+
+        Returns:
+            Dict[str, Dict[str, int]]: 被修正的計數，鍵為日期，值包含原計數與實際數量
+        """
+        today_start = datetime.now(self.timezone).replace(hour=0, minute=0, second=0, microsecond=0)
+        start_time = today_start - timedelta(days=days - 1)
+        keys = [self._counter_key(start_time + timedelta(days=offset)) for offset in range(days)]
+
+        def reconcile():
+            with self.conn:
+                actual = {}
+                rows = self.conn.execute(
+                    "SELECT created_at FROM articles WHERE created_at >= ? AND (persona = ? OR persona IS NULL)",
+                    (_to_utc_iso(start_time), self.persona_id)
+                )
+                for (created_at,) in rows:
+                    key = self._counter_key(datetime.fromisoformat(created_at))
+                    actual[key] = actual.get(key, 0) + 1
+
+                stored = dict(self.conn.execute(
+                    f"SELECT id, count FROM daily_counters WHERE id IN ({', '.join('?' for _ in keys)})", keys
+                ).fetchall())
+
+                corrections = {}
+                for key in keys:
+                    expected = actual.get(key, 0)
+                    if stored.get(key, 0) != expected:
+                        corrections[key.rsplit(":", 1)[1]] = {"stored": stored.get(key, 0), "actual": expected}
+                        self.conn.execute(
+                            "INSERT INTO daily_counters (id, persona, day, count) VALUES (?, ?, ?, ?) "
+                            "ON CONFLICT(id) DO UPDATE SET count = excluded.count",
+                            (key, self.persona_id, key.rsplit(":", 1)[1], expected)
+                        )
+                return corrections
+
+        try:
+            corrections = await self._run(reconcile)
+            if corrections:
+                self.logger.warning(f"已校正 {len(corrections)} 筆每日發文計數：{corrections}")
+            self.performance_monitor.record_db_operation("update", True, count=len(corrections),
+                                                      collection="daily_counters", query=f"reconcile(days={days})")
+            return corrections
+        except Exception as e:
+            self.logger.error(f"校正每日發文計數時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="daily_counters",
+                                                      query=f"reconcile(days={days})")
+            raise DatabaseError(f"校正每日發文計數失敗：{str(e)}")
+
+    @track_performance("db_get_post")
+    async def get_post(self, post_id: str) -> Optional[Dict[str, Any]]:
+        """獲取指定 ID 的發文資料
+
+        Args:
+            post_id: 發文 ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 發文資料，如果不存在則返回 None
+        """
+        try:
+            post = await self._run(self._find_one, "posts", post_id)
+            self.performance_monitor.record_db_operation("query", True, collection="posts",
+                                                      query=f"find_one(post_id={post_id})")
+            return post
+        except Exception as e:
+            self.logger.error("獲取發文資料失敗：%s", str(e))
+            self.performance_monitor.record_db_operation("query", False, collection="posts",
+                                                      query=f"find_one(post_id={post_id})")
+            return None
+
+    @track_performance("db_get_recent_posts")
+    async def get_recent_posts(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """獲取最近的發文列表
+
+        Args:
+            limit: 返回的最大數量
+
+        Returns:
+            List[Dict[str, Any]]: 發文列表
+        """
+        def query():
+            rows = self.conn.execute(
+                "SELECT data FROM posts ORDER BY timestamp DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [_loads(row[0]) for row in rows]
+
+        try:
+            posts = await self._run(query)
+            self.performance_monitor.record_db_operation("query", True, collection="posts",
+                                                      query=f"find().sort().limit({limit})")
+            return posts
+        except Exception as e:
+            self.logger.error("獲取最近發文列表失敗：%s", str(e))
+            self.performance_monitor.record_db_operation("query", False, collection="posts",
+                                                      query=f"find().sort().limit({limit})")
+            return []
+
+    async def get_page(self, table: str, after: Optional[Tuple[Any, Any]] = None, limit: int = 100,
+                       projection: Optional[Dict[str, Any]] = None,
+                       ascending: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, Any]]]:
+        """以 (時間, post_id) 游標讀取一頁發文或文章
+
+        Args:
+            table: 資料表名稱（posts 或 articles）
+            after: 上一頁返回的游標，None 表示第一頁
+            limit: 每頁數量
+            projection: 投影
+            ascending: 是否由舊到新
+
+        Returns:
+            Tuple: (文檔列表, 下一頁的游標；沒有下一頁時為 None)
+        """
+        column = PAGINATION_COLUMNS[table]
+        order = "ASC" if ascending else "DESC"
+
+        def query():
+            sql = f"SELECT {column}, post_id, data FROM {table}"
+            params = []
+            if after is not None:
+                sql += f" WHERE ({column}, post_id) {'>' if ascending else '<'} (?, ?)"
+                params.extend(after)
+            sql += f" ORDER BY {column} {order}, post_id {order} LIMIT ?"
+            params.append(limit)
+            return self.conn.execute(sql, params).fetchall()
+
+        try:
+            rows = await self._run(query)
+            self.performance_monitor.record_db_operation("query", True, count=len(rows), collection=table,
+                                                      query=f"find(keyset).sort({column}, post_id).limit({limit})")
+        except Exception as e:
+            self.logger.error(f"分頁讀取 {table} 失敗：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection=table,
+                                                      query=f"find(keyset).sort({column}, post_id).limit({limit})")
+            raise DatabaseError(f"分頁讀取失敗：{str(e)}", collection=table, operation="query")
+
+        next_after = (rows[-1][0], rows[-1][1]) if len(rows) == limit else None
+        return [_project(_loads(row[2]), projection) for row in rows], next_after
+
+    async def iter_documents(self, table: str, batch_size: int = 100,
+                             projection: Optional[Dict[str, Any]] = None, after: Optional[Tuple[Any, Any]] = None,
+                             ascending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """逐頁串流讀取所有發文或文章
+
+        Args:
+            table: 資料表名稱（posts 或 articles）
+            batch_size: 每頁數量
+            projection: 投影
+            after: 起始游標，None 表示從頭開始
+            ascending: 是否由舊到新
+
+        Yields:
+            Dict[str, Any]: 文檔
+        """
+        while True:
+            documents, after = await self.get_page(table, after, batch_size, projection, ascending)
+            for document in documents:
+                yield document
+            if after is None:
+                break
+
+    def iter_posts(self, batch_size: int = 100, projection: Optional[Dict[str, Any]] = None,
+                   ascending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """依 (timestamp, post_id) 串流讀取所有發文"""
+        return self.iter_documents("posts", batch_size, projection, ascending=ascending)
+
+    def iter_articles(self, batch_size: int = 100, projection: Optional[Dict[str, Any]] = None,
+                      ascending: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """依 (created_at, post_id) 串流讀取所有文章"""
+        return self.iter_documents("articles", batch_size, projection, ascending=ascending)
+
+    @track_performance("db_get_recent_fingerprints")
+    async def get_recent_fingerprints(self, limit: int = 1000) -> List[str]:
+        """獲取最近文章的內容指紋
+
+        Args:
+            limit: 返回的最大數量
+
+        Returns:
+            List[str]: 內容指紋列表
+        """
+        def query():
+            rows = self.conn.execute(
+                "SELECT json_extract(data, '$.fingerprint'), json_extract(data, '$.content') "
+                "FROM articles ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            # 舊資料可能尚未記錄指紋
+            return [fingerprint or content_fingerprint(content) for fingerprint, content in rows if fingerprint or content]
+
+        try:
+            fingerprints = await self._run(query)
+            self.performance_monitor.record_db_operation("query", True, count=len(fingerprints), collection="articles",
+                                                      query=f"find(fingerprint).limit({limit})")
+            return fingerprints
+        except Exception as e:
+            self.logger.error(f"獲取內容指紋時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="articles",
+                                                      query=f"find(fingerprint).limit({limit})")
+            raise DatabaseError(f"獲取內容指紋失敗：{str(e)}")
+
+    @track_performance("db_has_content_fingerprint")
+    async def has_content_fingerprint(self, fingerprint: str) -> bool:
+        """檢查是否已有相同內容指紋的發文或文章
+
+        Args:
+            fingerprint: 內容指紋
+
+        Returns:
+            bool: 是否存在
+        """
+        def query():
+            return any(
+                self.conn.execute(
+                    f"SELECT 1 FROM {table} WHERE json_extract(data, '$.fingerprint') = ? LIMIT 1", (fingerprint,)
+                ).fetchone()
+                for table in ("articles", "posts")
+            )
+
+        try:
+            found = await self._run(query)
+            self.performance_monitor.record_db_operation("query", True, collection="articles",
+                                                      query=f"find_one(fingerprint={fingerprint})")
+            return found
+        except Exception as e:
+            self.logger.error(f"檢查內容指紋時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="articles",
+                                                      query=f"find_one(fingerprint={fingerprint})")
+            raise DatabaseError(f"檢查內容指紋失敗：{str(e)}")
+
+    @track_performance("db_clear_cache")
+    async def clear_cache(self):
+        """清除所有快取；SQLite 後端直接讀取本地檔案，不使用快取"""
+        self.logger.info("快取已清除")
+
+    @track_performance("db_get_personality_memory")
+    async def get_personality_memory(self, context: str) -> Optional[Dict[str, Any]]:
+        """獲取人設記憶
+
+        Args:
+            context: 人設上下文
+
+        Returns:
+            Optional[Dict[str, Any]]: 人設記憶，如果不存在則返回 None
+        """
+        try:
+            memory = await self._run(self._find_one, "personality_memories", context)
+            self.performance_monitor.record_db_operation("query", True, collection="personality_memories",
+                                                      query=f"find_one(context={context})")
+            return memory
+        except Exception as e:
+            self.logger.error(f"獲取人設記憶時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="personality_memories",
+                                                      query=f"find_one(context={context})")
+            raise DatabaseError(f"獲取人設記憶失敗：{str(e)}")
+
+    @track_performance("db_save_personality_memory")
+    async def save_personality_memory(self, context: str, memory: Dict[str, Any]):
+        """儲存人設記憶
+
+        Args:
+            context: 人設上下文
+            memory: 人設記憶
+        """
+        memory = {**memory, "updated_at": datetime.now(pytz.UTC)}
+
+        def save():
+            with self.conn:
+                self._merge_upsert("personality_memories", context, memory)
+
+        try:
+            await self._run(save)
+            self.logger.info(f"人設記憶儲存成功：{context}")
+            self.performance_monitor.record_db_operation("update", True, collection="personality_memories",
+                                                      query=f"upsert(context={context})")
+        except Exception as e:
+            self.logger.error(f"儲存人設記憶時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="personality_memories",
+                                                      query=f"upsert(context={context})")
+            raise DatabaseError(f"儲存人設記憶失敗：{str(e)}")
+
+    @track_performance("db_save_article")
+    async def save_article(self, article: Dict[str, Any]):
+        """儲存文章，並在同一交易中增加每日發文計數
+
+        Args:
+            article: 文章資料
+        """
+        article.setdefault("persona", self.persona_id)
+        if "content" in article:
+            article.setdefault("fingerprint", content_fingerprint(article["content"]))
+        created_at = article.get("created_at")
+        if not isinstance(created_at, datetime):
+            created_at = datetime.now(self.timezone)
+            article["created_at"] = created_at
+
+        def save():
+            with self.conn:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO articles (post_id, persona, created_at, data) VALUES (?, ?, ?, ?)",
+                    (article["post_id"], article["persona"], _to_utc_iso(created_at),
+                     _dumps({k: v for k, v in article.items() if k != "_id"}))
+                )
+                # 同一篇文章重複儲存時不重複計數
+                if cursor.rowcount:
+                    self._increment_counter(self._counter_key(created_at), 1)
+
+        try:
+            await self._run(save)
+            self.logger.info(f"文章儲存成功：{article['post_id']}")
+            self.performance_monitor.record_db_operation("insert", True, collection="articles",
+                                                      query=f"insert_one(post_id={article['post_id']})")
+        except Exception as e:
+            self.logger.error(f"儲存文章時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("insert", False, collection="articles",
+                                                      query=f"insert_one(post_id={article['post_id']})")
+            raise DatabaseError(f"儲存文章失敗：{str(e)}")
+
+    @track_performance("db_get_article")
+    async def get_article(self, post_id: str) -> Optional[Dict[str, Any]]:
+        """獲取文章
+
+        Args:
+            post_id: 文章 ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 文章資料，如果不存在則返回 None
+        """
+        try:
+            article = await self._run(self._find_one, "articles", post_id)
+            self.performance_monitor.record_db_operation("query", True, collection="articles",
+                                                      query=f"find_one(post_id={post_id})")
+            return article
+        except Exception as e:
+            self.logger.error(f"獲取文章時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="articles",
+                                                      query=f"find_one(post_id={post_id})")
+            raise DatabaseError(f"獲取文章失敗：{str(e)}")
+
+    @track_performance("db_count_articles")
+    async def count_articles_between(self, start_time: datetime, end_time: datetime) -> int:
+        """計算指定時間範圍內的文章數量
+
+        Args:
+            start_time: 開始時間
+            end_time: 結束時間
+
+        Returns:
+            int: 文章數量
+        """
+        def query():
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM articles WHERE created_at >= ? AND created_at < ?",
+                (_to_utc_iso(start_time), _to_utc_iso(end_time))
+            ).fetchone()[0]
+
+        try:
+            count = await self._run(query)
+            self.performance_monitor.record_db_operation("query", True, collection="articles",
+                                                      query="count_documents(created_at)")
+            return count
+        except Exception as e:
+            self.logger.error(f"計算文章數量時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="articles",
+                                                      query="count_documents(created_at)")
+            raise DatabaseError(f"計算文章數量失敗：{str(e)}")
+
+    @track_performance("db_delete_oldest_articles")
+    async def delete_oldest_articles(self, count: int) -> int:
+        """刪除最舊的文章
+
+        Args:
+            count: 要刪除的文章數量
+
+        Returns:
+            int: 實際刪除的文章數量
+        """
+        def delete():
+            with self.conn:
+                rows = self.conn.execute(
+                    "SELECT post_id, created_at FROM articles ORDER BY created_at ASC LIMIT ?", (count,)
+                ).fetchall()
+                for post_id, created_at in rows:
+                    self.conn.execute("DELETE FROM articles WHERE post_id = ?", (post_id,))
+                    if created_at:
+                        self._increment_counter(self._counter_key(datetime.fromisoformat(created_at)), -1)
+                return len(rows)
+
+        try:
+            deleted_count = await self._run(delete)
+            self.performance_monitor.record_db_operation("update", True, count=deleted_count, collection="articles",
+                                                      query=f"delete_oldest({count})")
+            return deleted_count
+        except Exception as e:
+            self.logger.error(f"刪除文章時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="articles",
+                                                      query=f"delete_oldest({count})")
+            raise DatabaseError(f"刪除文章失敗：{str(e)}")
+
+    @track_performance("db_get_user_history")
+    async def get_user_history(self, user_id: str, last_n: Optional[int] = None) -> Dict[str, Any]:
+        """獲取用戶歷史記錄
+
+        Args:
+            user_id: 用戶 ID
+            last_n: 最多返回的對話筆數，預設為 MEMORY_CONFIG['max_history']
+
+        Returns:
+            Dict[str, Any]: 用戶歷史記錄
+        """
+        last_n = last_n or self.memory_max_history
+        try:
+            history = await self._run(self._find_one, "user_history", user_id)
+            if history and "conversations" in history:
+                history["conversations"] = history["conversations"][-last_n:]
+            self.performance_monitor.record_db_operation("query", True, collection="user_history",
+                                                      query=f"find_one(user_id={user_id})")
+            return history or {"conversations": []}
+        except Exception as e:
+            self.logger.error(f"獲取用戶歷史記錄時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="user_history",
+                                                      query=f"find_one(user_id={user_id})")
+            raise DatabaseError(f"獲取用戶歷史記錄失敗：{str(e)}")
+
+    @track_performance("db_save_user_history")
+    async def save_user_history(self, user_id: str, history: Dict[str, Any]):
+        """儲存用戶歷史記錄
+
+        Args:
+            user_id: 用戶 ID
+            history: 歷史記錄
+        """
+        def save():
+            with self.conn:
+                self._merge_upsert("user_history", user_id, history)
+
+        try:
+            await self._run(save)
+            self.logger.info(f"用戶歷史記錄儲存成功：{user_id}")
+            self.performance_monitor.record_db_operation("update", True, collection="user_history",
+                                                      query=f"upsert(user_id={user_id})")
+        except Exception as e:
+            self.logger.error(f"儲存用戶歷史記錄時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="user_history",
+                                                      query=f"upsert(user_id={user_id})")
+            raise DatabaseError(f"儲存用戶歷史記錄失敗：{str(e)}")
+
+    @track_performance("db_append_user_interaction")
+    async def append_user_interaction(self, user_id: str, entry: Dict[str, Any]):
+        """附加一筆用戶對話，只保留最近 MEMORY_CONFIG['max_records'] 筆
+
+        Args:
+            user_id: 用戶 ID
+            entry: 對話記錄
+        """
+        await self.append_user_interactions({user_id: [entry]})
+
+    @track_performance("db_append_user_interactions")
+    async def append_user_interactions(self, interactions: Dict[str, List[Dict[str, Any]]]):
+        """批量附加多位用戶的對話，在同一交易中寫入
+
+        Args:
+            interactions: 用戶 ID -> 依時間排序的對話記錄
+        """
+        now = datetime.now(pytz.UTC)
+
+        def append():
+            with self.conn:
+                for user_id, entries in interactions.items():
+                    history = self._find_one("user_history", user_id) or {}
+                    conversations = history.get("conversations", []) + [{"timestamp": now, **entry} for entry in entries]
+                    self._merge_upsert("user_history", user_id, {
+                        "conversations": conversations[-self.memory_max_records:],
+                        "updated_at": now
+                    })
+
+        try:
+            await self._run(append)
+            self.performance_monitor.record_db_operation("update", True, count=len(interactions),
+                                                      collection="user_history",
+                                                      query=f"append(users={len(interactions)})")
+        except Exception as e:
+            self.logger.error(f"附加用戶對話時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="user_history",
+                                                      query=f"append(users={len(interactions)})")
+            raise DatabaseError(f"附加用戶對話失敗：{str(e)}")
+
+    @track_performance("db_cleanup")
+    async def cleanup_old_data(self, days: int = 30):
+        """清理舊資料
+
+        Args:
+            days: 保留的天數，預設30天
+        """
+        cutoff_date = datetime.now(pytz.UTC) - timedelta(days=days)
+
+        def cleanup():
+            with self.conn:
+                return self.conn.execute(
+                    "DELETE FROM articles WHERE created_at < ?", (_to_utc_iso(cutoff_date),)
+                ).rowcount
+
+        try:
+            deleted_count = await self._run(cleanup)
+            self.logger.info(f"已清理 {deleted_count} 筆舊文章資料")
+            self.performance_monitor.record_db_operation("update", True, count=deleted_count, collection="articles",
+                                                      query=f"cleanup(days={days})")
+            return deleted_count
+        except Exception as e:
+            self.logger.error(f"清理舊資料時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="articles",
+                                                      query=f"cleanup(days={days})")
+            raise DatabaseError(f"清理舊資料失敗：{str(e)}")
+
+    async def get_database_stats(self) -> Dict[str, Any]:
+        """獲取資料庫統計資訊
+
+        Returns:
+            Dict[str, Any]: 資料庫統計資訊
+        """
+        def query():
+            articles_count = self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            users_count = self.conn.execute("SELECT COUNT(*) FROM user_history").fetchone()[0]
+            page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+            return articles_count, users_count, page_count * page_size
+
+        try:
+            articles_count, users_count, size_bytes = await self._run(query)
+            return {
+                "articles_count": articles_count,
+                "users_count": users_count,
+                "cache": {},
+                "storage": {
+                    "backend": "sqlite",
+                    "path": self.path,
+                    "size_bytes": size_bytes
+                },
+                "performance": self.performance_monitor.summary()
+            }
+        except Exception as e:
+            self.logger.error(f"獲取資料庫統計資訊時發生錯誤：{str(e)}")
+            return {"error": str(e)}
+
+    @track_performance("db_save_speaking_pattern")
+    async def save_speaking_pattern(self, pattern_type: str, data: Dict[str, Any]):
+        """保存說話模式
+
+        Args:
+            pattern_type: 模式類型，如 "speaking_styles", "topics_keywords" 等
+            data: 模式數據
+        """
+        def save():
+            with self.conn:
+                self._merge_upsert("speaking_patterns", pattern_type, {**data, "updated_at": datetime.now(pytz.UTC)})
+
+        try:
+            await self._run(save)
+            self.logger.info(f"說話模式保存成功：{pattern_type}")
+            self.performance_monitor.record_db_operation("update", True, collection="speaking_patterns",
+                                                      query=f"update_one(type={pattern_type})")
+        except Exception as e:
+            self.logger.error(f"保存說話模式時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, collection="speaking_patterns",
+                                                      query=f"update_one(type={pattern_type})")
+            raise DatabaseError(f"保存說話模式失敗：{str(e)}")
+
+    @track_performance("db_get_speaking_pattern")
+    async def get_speaking_pattern(self, pattern_type: str) -> Optional[Dict[str, Any]]:
+        """獲取說話模式
+
+        Args:
+            pattern_type: 模式類型，如 "speaking_styles", "topics_keywords" 等
+
+        Returns:
+            Optional[Dict[str, Any]]: 模式數據，如果不存在則返回 None
+        """
+        try:
+            pattern = await self._run(self._find_one, "speaking_patterns", pattern_type)
+            self.performance_monitor.record_db_operation("query", True, collection="speaking_patterns",
+                                                      query=f"find_one(type={pattern_type})")
+            return pattern
+        except Exception as e:
+            self.logger.error(f"獲取說話模式時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, collection="speaking_patterns",
+                                                      query=f"find_one(type={pattern_type})")
+            raise DatabaseError(f"獲取說話模式失敗：{str(e)}")
+
+    @track_performance("db_bulk_get_speaking_patterns")
+    async def bulk_get_speaking_patterns(self, pattern_types: list) -> Dict[str, Any]:
+        """批量獲取說話模式
+
+        Args:
+            pattern_types: 模式類型列表
+
+        Returns:
+            Dict[str, Any]: 模式數據字典
+        """
+        if not pattern_types:
+            return {}
+
+        def query():
+            rows = self.conn.execute(
+                f"SELECT type, data FROM speaking_patterns WHERE type IN ({', '.join('?' for _ in pattern_types)})",
+                list(pattern_types)
+            ).fetchall()
+            return {pattern_type: _loads(data) for pattern_type, data in rows}
+
+        try:
+            result = await self._run(query)
+            self.performance_monitor.record_db_operation("query", True, count=len(result),
+                                                      collection="speaking_patterns",
+                                                      query=f"find(types_in={pattern_types})")
+            return result
+        except Exception as e:
+            self.logger.error(f"批量獲取說話模式時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("query", False, count=len(pattern_types),
+                                                      collection="speaking_patterns",
+                                                      query=f"bulk_get(types={pattern_types})")
+            return {}
+
+    @track_performance("db_bulk_save_speaking_patterns")
+    async def bulk_save_speaking_patterns(self, patterns_data: Dict[str, Dict[str, Any]]) -> bool:
+        """批量保存說話模式
+
+        Args:
+            patterns_data: 模式數據字典，鍵為模式類型，值為數據
+
+        Returns:
+            bool: 是否全部保存成功
+        """
+        now = datetime.now(pytz.UTC)
+
+        def save():
+            with self.conn:
+                for pattern_type, data in patterns_data.items():
+                    self._merge_upsert("speaking_patterns", pattern_type, {**data, "updated_at": now})
+
+        try:
+            await self._run(save)
+            self.logger.info(f"成功批量保存 {len(patterns_data)} 個說話模式")
+            self.performance_monitor.record_db_operation("update", True, count=len(patterns_data),
+                                                      collection="speaking_patterns",
+                                                      query=f"bulk_write({list(patterns_data.keys())})")
+            return True
+        except Exception as e:
+            self.logger.error(f"批量保存說話模式時發生錯誤：{str(e)}")
+            self.performance_monitor.record_db_operation("update", False, count=len(patterns_data),
+                                                      collection="speaking_patterns",
+                                                      query=f"bulk_write({list(patterns_data.keys())})")
+            return False
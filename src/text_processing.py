@@ -0,0 +1,212 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 文本正規化，以單次掃描完成英文替換、稱呼替換、標點與空白整理及截斷
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 英文替換詞典集中於此模組，不再於各處重複定義
+- 所有規則預先編譯為單一正規表示式，一次掃描處理整段文本
+- 超過長度上限時於句尾標點截斷
+- 單一表情符號的比對包含變體選擇符、膚色與零寬連接符組成的整個序列
+"""
+
+import re
+from typing import Dict, Iterable, Optional
+
+# 英文單字替換詞典，沒有對應的英文單字會被移除
+ENGLISH_TO_CHINESE = {
+    'hey': '嗨',
+    'hello': '你好',
+    'hi': '嗨',
+    'ok': '好的',
+    'yes': '是的',
+    'no': '不',
+    'good': '好',
+    'bad': '不好',
+    'game': '遊戲',
+    'play': '玩',
+    'love': '愛',
+    'like': '喜歡',
+    'bye': '再見',
+    'see': '看',
+    'you': '你',
+    'me': '我',
+    'my': '我的',
+    'your': '你的',
+    'so': '非常',
+    'very': '很',
+    'happy': '開心',
+    'sad': '難過',
+    'cute': '可愛',
+    'cool': '酷',
+    'nice': '好',
+    'wow': '哇',
+    'omg': '天啊',
+    'lol': '哈哈',
+    'great': '棒',
+    'thanks': '謝謝',
+    'thank': '謝謝',
+    'welcome': '歡迎',
+}
+
+# 不當稱呼的替換
+ADDRESS_REPLACEMENTS = {
+    '哥哥們': '大家',
+    '哥哥': '朋友',
+    '弟弟們': '大家',
+    '弟弟': '朋友',
+}
+
+# 表情符號本身的字元（不含中日韓文字）
+EMOJI_BASE_CLASS = (
+    "\U0001F300-\U0001FAFF"  # 符號、圖示與表情
+    "\U0001F1E0-\U0001F1FF"  # 國旗
+    "\u2600-\u27BF"          # 雜項符號與裝飾符號
+    "\u2B50\u2B55"           # 星號、圓圈
+)
+# 表情符號連續出現的片段，另含變體選擇符與零寬連接符
+EMOJI_CLASS = EMOJI_BASE_CLASS + "\uFE0F\u200D"
+
+# 單一表情符號：膚色、變體選擇符 (U+FE0F) 與零寬連接符 (U+200D) 組成的序列視為一個，
+# 國旗為兩個區域指示符號
+_EMOJI_UNIT = f"[{EMOJI_BASE_CLASS}][\U0001F3FB-\U0001F3FF]?\uFE0F?"
+EMOJI_PATTERN = re.compile(f"[\U0001F1E6-\U0001F1FF]{{2}}|{_EMOJI_UNIT}(?:\u200D{_EMOJI_UNIT})*")
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# 連續重複的標點收斂為一個全形標點
+PUNCTUATION_COLLAPSE = {
+    '!': '！', '！': '！',
+    '?': '？', '？': '？',
+    '.': '。', '。': '。',
+    '~': '～', '～': '～',
+}
+
+# 截斷時可作為句尾的標點
+SENTENCE_ENDINGS = ('.', '!', '?', '。', '！', '？', '～')
+
+
+def _collapse_punctuation(token: str) -> str:
+    """將連續重複的標點收斂為一個全形標點，不同的標點保留順序"""
+    collapsed = []
+    for char in token:
+        mapped = PUNCTUATION_COLLAPSE[char]
+        if not collapsed or collapsed[-1] != mapped:
+            collapsed.append(mapped)
+    return "".join(collapsed)
+
+
+class TextNormalizer:
+    """文本正規化器
+
+    英文單字、稱呼、空白、重複標點與表情符號組成單一正規表示式，以一次 re.sub
+    掃描整段文本，每個規則只處理它比對到的片段，不會對整段文本重複替換。
+    正規表示式以前瞻的字元集合開頭，大部分中文字元只需一次檢查即可略過。
+    """
+
+    def __init__(self, substitutions: Optional[Dict[str, str]] = None,
+                 phrases: Optional[Dict[str, str]] = None,
+                 max_emojis: Optional[int] = None,
+                 collapse_punctuation: bool = True):
+        """初始化文本正規化器
+
+        Args:
+            substitutions: 英文單字替換詞典（小寫），預設為 ENGLISH_TO_CHINESE
+            phrases: 需要直接替換的詞語，較長的詞優先
+            max_emojis: 最多保留的表情符號組數，保留第一組與最後幾組，None 表示不限制
+            collapse_punctuation: 是否將連續重複的標點收斂為一個
+        """
+        self.substitutions = ENGLISH_TO_CHINESE if substitutions is None else substitutions
+        self.phrases = phrases or {}
+        self.max_emojis = max_emojis
+
+        punctuation = re.escape("".join(PUNCTUATION_COLLAPSE))
+        alternatives = [
+            # 只比對獨立的英文單字（與 \\b 相同），單字後的空白一併比對，移除單字時不會留下相連的空白
+            r"(?P<word>(?<!\w)[a-zA-Z]+(?!\w)\s*)",
+            # 單一半形空白不需處理，只比對需要整理的空白
+            r"(?P<space>\s{2,}|[^\S ])",
+        ]
+        first_chars = "a-zA-Z\\s"
+        if collapse_punctuation:
+            alternatives.append(f"(?P<punct>[{punctuation}]{{2,}})")
+            first_chars += punctuation
+        if max_emojis is not None:
+            # 不限制表情符號時不需要比對
+            alternatives.append(f"(?P<emoji>[{EMOJI_CLASS}]+)")
+            first_chars += EMOJI_CLASS
+        if self.phrases:
+            phrases_pattern = "|".join(re.escape(phrase) for phrase in sorted(self.phrases, key=len, reverse=True))
+            alternatives.insert(0, f"(?P<phrase>{phrases_pattern})")
+            first_chars += re.escape("".join({phrase[0] for phrase in self.phrases}))
+        self._pattern = re.compile(f"(?=[{first_chars}])(?:{'|'.join(alternatives)})")
+        self._emoji_run_pattern = re.compile(f"[{EMOJI_CLASS}]+")
+
+    def _limit_emojis(self, text: str, runs: int) -> str:
+        """只保留第一組與最後幾組表情符號，中間的移除（文字保留）
+
+        Args:
+            text: 文本
+            runs: 表情符號組數
+
+        Returns:
+            str: 處理後的文本
+        """
+        keep_last = self.max_emojis - 1
+        index = -1
+
+        def replace(match):
+            nonlocal index
+            index += 1
+            return match.group(0) if index == 0 or index >= runs - keep_last else ""
+
+        return self._emoji_run_pattern.sub(replace, text)
+
+    def normalize(self, text: str, max_length: int = 280, ending: str = '。',
+                  valid_endings: Iterable[str] = SENTENCE_ENDINGS) -> str:
+        """正規化文本
+
+        Args:
+            text: 原始文本
+            max_length: 最大長度，超過時於上限內最後一個句尾標點截斷，沒有句尾標點時直接截斷
+            ending: 結尾不是有效標點時補上的標點
+            valid_endings: 有效的結尾標點
+
+        Returns:
+            str: 正規化後的文本
+        """
+        if not text:
+            return ""
+
+        emoji_runs = 0
+
+        def replace(match):
+            nonlocal emoji_runs
+            kind = match.lastgroup
+            token = match.group(0)
+            if kind == "word":
+                word = token.rstrip()
+                replacement = self.substitutions.get(word.lower(), "")
+                return replacement + " " if replacement and len(token) > len(word) else replacement
+            if kind == "phrase":
+                return self.phrases[token]
+            if kind == "space":
+                return " "
+            if kind == "punct":
+                return _collapse_punctuation(token)
+            emoji_runs += 1
+            return token
+
+        result = self._pattern.sub(replace, text).strip()
+        if self.max_emojis is not None and emoji_runs > self.max_emojis:
+            result = self._limit_emojis(result, emoji_runs)
+
+        if len(result) > max_length:
+            cut = max(result.rfind(mark, 0, max_length) for mark in SENTENCE_ENDINGS)
+            result = result[:cut + 1] if cut > 0 else result[:max_length]
+
+        if not result.endswith(tuple(valid_endings)):
+            result += ending
+        return result
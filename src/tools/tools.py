@@ -10,6 +10,11 @@ Changes:
 - 創建統一工具入口
 - 整合各工具腳本功能
 - 使用src中的功能替代獨立工具腳本
+- 新增每日發文計數校正工具
+- 新增資料庫備份匯出與匯入工具
+- 新增發文分析工具（伺服器端聚合統計）
+- 新增合併發文記錄的遷移工具
+- 備份匯出/匯入、發文分析與合併發文記錄在 SQLite 後端時顯示僅支援 MongoDB 的提示
 """
 
 import os
@@ -24,8 +29,26 @@ sys.path.append(project_root)
 from src.config import Config
 from src.db_handler import DatabaseHandler
 from src.utils import check_latest_posts
+from src.db_backup import export_database, import_database, DEFAULT_BACKUP_DIR
+from src.analytics import PostAnalytics
+from src.db_schema import migrate_to_unified_posts, LEGACY_ARTICLES_COLLECTION
 from src.tools.test_time_settings import test_settings
 
+def require_mongodb(config, tool_name: str) -> bool:
+    """檢查資料庫後端是否為 MongoDB（直接操作 MongoDB 的工具不支援 SQLite 後端）
+    
+    Args:
+        config: 設定物件
+        tool_name: 工具名稱
+        
+    Returns:
+        bool: 是否為 MongoDB 後端
+    """
+    if config.DB_BACKEND == "sqlite":
+        print(f"{tool_name}僅支援 MongoDB，目前的資料庫後端為 SQLite（DB_BACKEND=sqlite），已略過")
+        return False
+    return True
+
 async def run_check_posts():
     """執行檢查最近文章功能"""
     config = Config()
@@ -37,6 +60,96 @@ async def run_check_posts():
     finally:
         await db.close()
 
+async def run_reconcile_counters(days: int):
+    """執行每日發文計數校正功能"""
+    config = Config()
+    db = DatabaseHandler(config)
+    await db.initialize()
+    
+    try:
+        corrections = await db.reconcile_daily_counters(days)
+        if corrections:
+            for day, counts in sorted(corrections.items()):
+                print(f"{day}: {counts['stored']} -> {counts['actual']}")
+        else:
+            print(f"最近 {days} 天的發文計數皆正確")
+    finally:
+        await db.close()
+
+async def run_export_backup(output_dir: str, compression: str, collections, batch_size: int):
+    """執行資料庫備份匯出功能"""
+    config = Config()
+    if not require_mongodb(config, "匯出資料庫備份"):
+        return
+    db = DatabaseHandler(config)
+    await db.initialize()
+    
+    try:
+        manifest = await export_database(db.database.db, output_dir, compression, collections, batch_size)
+        print(f"備份目錄: {manifest['path']}")
+        for name, stats in manifest["collections"].items():
+            print(f"{name}: {stats['documents']} 筆, {stats['file_bytes']} bytes, {stats['docs_per_second']} docs/s")
+    finally:
+        await db.close()
+
+async def run_import_backup(backup_dir: str, collections, batch_size: int):
+    """執行資料庫備份匯入功能"""
+    config = Config()
+    if not require_mongodb(config, "匯入資料庫備份"):
+        return
+    db = DatabaseHandler(config)
+    await db.initialize()
+    
+    try:
+        results = await import_database(db.database.db, backup_dir, collections, batch_size)
+        for name, stats in results.items():
+            print(f"{name}: {stats['documents']} 筆, {stats['docs_per_second']} docs/s")
+    finally:
+        await db.close()
+
+async def run_analytics(days: int):
+    """執行發文分析功能"""
+    config = Config()
+    if not require_mongodb(config, "發文分析"):
+        return
+    db = DatabaseHandler(config)
+    await db.initialize()
+    
+    try:
+        analytics = PostAnalytics(db.database.db, persona_id=db.database.persona_id)
+        result = await analytics.summary(days)
+        print(f"統計範圍: 最近 {days} 天")
+        length = result["content_length"]
+        print(f"文章數量: {length['count']}，平均字數: {length['avg']}（最短 {length['min']}，最長 {length['max']}）")
+        print("每小時發文數量:")
+        for hour, count in result["posts_per_hour"].items():
+            print(f"  {hour:02d}:00 {count}")
+        print("每日發文數量:")
+        for day, count in result["posts_per_day"].items():
+            print(f"  {day} {count}")
+        print("熱門主題:")
+        for topic in result["topics"]:
+            print(f"  {topic['topic']}: {topic['count']}")
+    finally:
+        await db.close()
+
+async def run_migrate_unified_posts():
+    """執行合併發文記錄的遷移"""
+    config = Config()
+    if not require_mongodb(config, "合併發文記錄"):
+        return
+    db = DatabaseHandler(config)
+    await db.initialize()
+    
+    try:
+        # 先寫入佇列中的資料，避免遷移期間有文章仍寫入舊集合
+        await db.database.write_queue.flush()
+        result = await migrate_to_unified_posts(db.database.db)
+        print(f"合併文章: {result['articles']} 筆，發文記錄: {result['posts']} 筆")
+        print(f"舊的文章集合保留為 {LEGACY_ARTICLES_COLLECTION}，請重新啟動程式以使用合併的發文記錄")
+    finally:
+        await db.close()
+
 def main():
     """主函數：解析命令行參數並執行相應工具"""
     parser = argparse.ArgumentParser(description='ThreadsPoster 系統工具')
@@ -44,6 +157,17 @@ def main():
     # 添加各個工具的命令行選項
     parser.add_argument('--check-posts', action='store_true', help='檢查最近的文章')
     parser.add_argument('--test-time', action='store_true', help='測試時間設定')
+    parser.add_argument('--reconcile-counters', action='store_true', help='依文章記錄校正每日發文計數')
+    parser.add_argument('--analytics', action='store_true', help='輸出發文時段、每日數量、主題與字數統計')
+    parser.add_argument('--days', type=int, default=7, help='校正計數或分析統計的天數（預設7天）')
+    parser.add_argument('--migrate-unified-posts', action='store_true',
+                        help='將文章併入 posts，articles 改為相容的唯讀檢視（請先停止主程式）')
+    parser.add_argument('--export-backup', action='store_true', help='匯出資料庫備份到備份目錄')
+    parser.add_argument('--import-backup', metavar='DIR', help='從指定的備份目錄匯入資料')
+    parser.add_argument('--backup-dir', default=DEFAULT_BACKUP_DIR, help='備份根目錄（預設 data/backups）')
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], default='gzip', help='備份壓縮格式')
+    parser.add_argument('--collections', nargs='+', help='只匯出/匯入指定的集合')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每批讀寫的文檔數量')
     parser.add_argument('--all', action='store_true', help='執行所有工具')
     
     args = parser.parse_args()
@@ -64,6 +188,31 @@ def main():
         test_settings()
         print("\n")
     
+    if args.reconcile_counters or args.all:
+        print("=== 校正每日發文計數 ===")
+        asyncio.run(run_reconcile_counters(args.days))
+        print("\n")
+    
+    if args.analytics:
+        print("=== 發文分析 ===")
+        asyncio.run(run_analytics(args.days))
+        print("\n")
+    
+    if args.migrate_unified_posts:
+        print("=== 合併發文記錄 ===")
+        asyncio.run(run_migrate_unified_posts())
+        print("\n")
+    
+    if args.export_backup:
+        print("=== 匯出資料庫備份 ===")
+        asyncio.run(run_export_backup(args.backup_dir, args.compression, args.collections, args.batch_size))
+        print("\n")
+    
+    if args.import_backup:
+        print("=== 匯入資料庫備份 ===")
+        asyncio.run(run_import_backup(args.import_backup, args.collections, args.batch_size))
+        print("\n")
+    
     print("工具執行完成")
 
 if __name__ == "__main__":
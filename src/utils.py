@@ -9,6 +9,7 @@ Changes:
 - 加強錯誤處理
 - 統一日誌路徑
 - 優化配置讀取
+- 文本清理改用文本正規化模組預先編譯的正規表示式
 """
 
 import json
@@ -20,6 +21,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Union, Tuple
 from src.config import Config
 from src.exceptions import ValidationError
+from src.text_processing import EMOJI_PATTERN, WHITESPACE_PATTERN
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -66,6 +68,9 @@ def format_time(dt: datetime, format_str: str = '%Y-%m-%d %H:%M:%S') -> str:
         logging.error(f"格式化時間時發生錯誤：{str(e)}")
         return ''
 
+LEADING_PUNCTUATION_PATTERN = re.compile(r'^[。!！?？\s]+')
+COMMA_PATTERN = re.compile('[，,]')
+
 def sanitize_text(text: str) -> str:
     """清理文本，保持原始文本的完整性。
     智能處理文本，盡可能保留原始內容。
@@ -73,25 +78,22 @@ def sanitize_text(text: str) -> str:
     if not text:
         return text
 
-    # 定義表情符號
-    emoji_pattern = r'[\U0001F300-\U0001F9FF]|[\u2600-\u26FF]|[\u2700-\u27BF]'
-    
     # 提取表情符號
-    emojis = re.findall(emoji_pattern, text)
+    emojis = EMOJI_PATTERN.findall(text)
     
     # 移除多餘的表情符號，只保留最後兩個
     if len(emojis) > 2:
         emojis = emojis[-2:]
     
     # 移除文本中的表情符號，但保留位置
-    text_without_emojis = re.sub(emoji_pattern, '', text)
+    text_without_emojis = EMOJI_PATTERN.sub('', text)
     
     # 基本清理
     text_without_emojis = text_without_emojis.strip()
-    text_without_emojis = re.sub(r'[\s]+', ' ', text_without_emojis)  # 清理多餘空格
+    text_without_emojis = WHITESPACE_PATTERN.sub(' ', text_without_emojis)  # 清理多餘空格
     
     # 移除開頭的標點符號
-    text_without_emojis = re.sub(r'^[。!！?？\s]+', '', text_without_emojis)
+    text_without_emojis = LEADING_PUNCTUATION_PATTERN.sub('', text_without_emojis)
     
     # 檢查結尾標點
     valid_endings = ['！', '。', '？', '～']
@@ -113,7 +115,7 @@ def sanitize_text(text: str) -> str:
     
     # 檢查是否包含完整句子
     if '，' in text_without_emojis or ',' in text_without_emojis:
-        parts = re.split('[，,]', text_without_emojis)
+        parts = COMMA_PATTERN.split(text_without_emojis)
         # 如果最後一部分太短，而且不是完整的句子
         if len(parts[-1].strip()) <= 5 and not any(word in parts[-1] for word in ['嗎', '呢', '吧', '啊']):
             text_without_emojis = ''.join(parts[:-1]) + '！'
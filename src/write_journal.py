@@ -0,0 +1,258 @@
+"""
+Version: 2025.04.02 (v1.2.1)
+Author: ThreadsPoster Team
+Description: 本地寫入日誌，資料庫無法連線時暫存寫入操作並於恢復後重放
+Copyright (c) 2025 Chiang, Chenwei. All rights reserved.
+License: MIT License
+Last Modified: 2025.04.02
+Changes:
+- 只附加寫入的分段日誌檔，每批寫入一次 fsync
+- 資料庫恢復連線後依序以批量寫入重放，以文檔鍵值 upsert
+- 重放時回報新增文檔的更新操作，由資料庫依此更新統計快照與每日計數
+- 重放進度逐批寫入進度檔，中斷後從上次完成的批次繼續
+- 無法寫入的記錄移到 rejected 目錄，不阻擋之後的重放
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# 分段檔名：journal-00000001.ndjson
+SEGMENT_PATTERN = re.compile(r"^journal-(\d{8})\.ndjson$")
+
+# MongoDB 違反唯一索引的錯誤代碼
+DUPLICATE_KEY_ERROR = 11000
+
+# 分段的重放進度檔副檔名，內容為 {集合名稱: 已完成的記錄數}
+PROGRESS_SUFFIX = ".progress"
+
+# 無法寫入的記錄移到日誌目錄下的此子目錄
+REJECTED_DIRECTORY = "rejected"
+
+
+class WriteJournal:
+    """本地寫入日誌 (write-ahead journal)
+
+    每筆記錄為 {"collection", "filter", "update"}，以 JSON 行寫入目前的分段檔，
+    超過大小時換到新的分段。重放時依分段順序執行，成功後刪除該分段。
+    $push 與 $inc 重放兩次會重複套用，因此每批寫入前先將已完成的記錄數寫入進度檔，
+    中斷後從進度檔繼續；只有中斷當下正在寫入的那一批可能重複套用。
+    違反唯一索引以外的寫入錯誤（例如文檔驗證失敗）重試也不會成功，該記錄會移到
+    rejected 目錄並計入 skipped，重放繼續進行。
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 1024 * 1024):
+        """初始化寫入日誌
+
+        Args:
+            directory: 日誌目錄
+            segment_max_bytes: 單一分段檔的最大位元組數
+        """
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        self._file = None
+        self._file_path = None
+        self.stats = {"appended": 0, "replayed": 0, "skipped": 0, "segments_replayed": 0}
+
+    def _segments(self) -> List[str]:
+        """依序列出所有分段檔"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory) if SEGMENT_PATTERN.match(name))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def has_entries(self) -> bool:
+        """是否有尚未重放的記錄"""
+        return any(os.path.getsize(path) > 0 for path in self._segments())
+
+    def _open_segment(self):
+        """開啟新的分段檔（於執行緒中執行）"""
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        sequence = int(SEGMENT_PATTERN.match(os.path.basename(segments[-1])).group(1)) + 1 if segments else 1
+        self._file_path = os.path.join(self.directory, f"journal-{sequence:08d}.ndjson")
+        # 已刪除的同名分段可能留下進度檔
+        if os.path.exists(self._file_path + PROGRESS_SUFFIX):
+            os.remove(self._file_path + PROGRESS_SUFFIX)
+        self._file = open(self._file_path, "a", encoding="utf-8")
+
+    def _close_segment(self):
+        """關閉目前的分段檔（於執行緒中執行）"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_path = None
+
+    def _append_lines(self, lines: List[str]):
+        """寫入並 fsync 一批記錄（於執行緒中執行）"""
+        if self._file is None or self._file.tell() >= self.segment_max_bytes:
+            self._close_segment()
+            self._open_segment()
+        self._file.write("".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def append(self, entries: List[Dict[str, Any]]):
+        """寫入一批記錄，返回時已寫入磁碟
+
+        Args:
+            entries: 寫入記錄，包含 collection、filter、update
+        """
+        if not entries:
+            return
+        lines = [
+            json_util.dumps(entry, json_options=json_util.CANONICAL_JSON_OPTIONS) + "\n"
+            for entry in entries
+        ]
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._append_lines, lines)
+        self.stats["appended"] += len(entries)
+
+    def _read_segment(self, path: str) -> List[Dict[str, Any]]:
+        """讀取分段檔的所有記錄（於執行緒中執行）；寫入中斷造成的不完整行會被略過"""
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json_util.loads(line))
+                except ValueError:
+                    self.logger.warning(f"略過寫入日誌中不完整的記錄：{path}")
+        return entries
+
+    def _read_progress(self, path: str) -> Dict[str, int]:
+        """讀取分段的重放進度（於執行緒中執行）"""
+        try:
+            with open(path + PROGRESS_SUFFIX, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            # 寫入中斷的進度檔以原子替換寫入，不應出現；無法判斷時從頭重放
+            self.logger.warning(f"寫入日誌進度檔無法讀取，從頭重放：{path}")
+            return {}
+
+    def _write_progress(self, path: str, progress: Dict[str, int]):
+        """以原子替換寫入分段的重放進度並 fsync（於執行緒中執行）"""
+        temp_path = path + PROGRESS_SUFFIX + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path + PROGRESS_SUFFIX)
+
+    def _remove_segment(self, path: str):
+        """刪除已重放的分段，再刪除進度檔（於執行緒中執行）"""
+        os.remove(path)
+        if os.path.exists(path + PROGRESS_SUFFIX):
+            os.remove(path + PROGRESS_SUFFIX)
+
+    def _reject_entry(self, path: str, entry: Dict[str, Any], error: Dict[str, Any]):
+        """將無法寫入的記錄連同錯誤附加到 rejected 目錄（於執行緒中執行）"""
+        directory = os.path.join(self.directory, REJECTED_DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        record = {**entry, "error": {"code": error.get("code"), "errmsg": error.get("errmsg")}}
+        with open(os.path.join(directory, os.path.basename(path)), "a", encoding="utf-8") as f:
+            f.write(json_util.dumps(record, json_options=json_util.CANONICAL_JSON_OPTIONS) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _replay_entries(self, db, path: str, entries: List[Dict[str, Any]], batch_size: int,
+                              on_upserted: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None) -> int:
+        """依序重放記錄，同一集合以有序批量寫入，保持同一文檔的操作順序
+
+        每批寫入前記錄各集合已完成的記錄數，重放中斷後從該處繼續。
+
+        Returns:
+            int: 重放的記錄數量
+        """
+        loop = asyncio.get_running_loop()
+        by_collection: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            by_collection.setdefault(entry["collection"], []).append(entry)
+        progress = await loop.run_in_executor(None, self._read_progress, path)
+
+        replayed = 0
+        for collection, collection_entries in by_collection.items():
+            start = progress.get(collection, 0)
+            if start:
+                self.logger.info(f"從上次的進度繼續重放 {collection}：已完成 {start} 筆")
+            while start < len(collection_entries):
+                if progress.get(collection, 0) != start:
+                    progress[collection] = start
+                    await loop.run_in_executor(None, self._write_progress, path, dict(progress))
+                batch = collection_entries[start:start + batch_size]
+                operations = [UpdateOne(entry["filter"], entry["update"], upsert=True) for entry in batch]
+                try:
+                    result = await db[collection].bulk_write(operations, ordered=True)
+                    upserted = [batch[index]["update"] for index in result.upserted_ids]
+                    replayed += len(batch)
+                    start += len(batch)
+                except BulkWriteError as e:
+                    upserted = [batch[item["index"]]["update"] for item in e.details.get("upserted", [])]
+                    if not e.details.get("writeErrors"):
+                        raise
+                    error = e.details["writeErrors"][0]
+                    # 違反唯一索引或其他寫入錯誤的記錄重試也不會成功，略過後繼續
+                    self.stats["skipped"] += 1
+                    if error.get("code") == DUPLICATE_KEY_ERROR:
+                        self.logger.error(f"重放 {collection} 違反唯一索引，略過：{error.get('errmsg')}")
+                    else:
+                        await loop.run_in_executor(None, self._reject_entry, path, batch[error["index"]], error)
+                        self.logger.error(
+                            f"重放 {collection} 寫入失敗，記錄已移到 {REJECTED_DIRECTORY} 目錄：{error.get('errmsg')}"
+                        )
+                    replayed += error["index"]
+                    start += error["index"] + 1
+                if on_upserted is not None and upserted:
+                    on_upserted(collection, upserted)
+        return replayed
+
+    async def replay(self, db, batch_size: int = 500,
+                     on_upserted: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None) -> int:
+        """重放所有分段，成功的分段會被刪除
+
+        Args:
+            db: 資料庫實例
+            batch_size: 每批寫入的記錄數量
+            on_upserted: 新增文檔時的回呼，參數為 (集合名稱, 新增文檔的更新操作)
+
+        Returns:
+            int: 重放的記錄數量
+        """
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            # 目前的分段也要重放，之後的寫入使用新的分段
+            await loop.run_in_executor(None, self._close_segment)
+            segments = self._segments()
+
+        replayed = 0
+        for path in segments:
+            entries = await loop.run_in_executor(None, self._read_segment, path)
+            replayed += await self._replay_entries(db, path, entries, batch_size, on_upserted)
+            await loop.run_in_executor(None, self._remove_segment, path)
+            self.stats["segments_replayed"] += 1
+
+        self.stats["replayed"] += replayed
+        if replayed:
+            self.logger.info(f"寫入日誌重放完成：{replayed} 筆，{len(segments)} 個分段")
+        return replayed
+
+    async def close(self):
+        """關閉目前的分段檔"""
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._close_segment)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得寫入日誌統計"""
+        return {**self.stats, "segments": len(self._segments())}
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+測試腳本 - 測試合併發文記錄後的資料保留清理
+"""
+
+import sys
+import asyncio
+import logging
+from datetime import datetime, timedelta
+import pytz
+
+from src.db_retention import RetentionManager
+
+# 設置日誌
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("test_db_retention")
+
+
+class FakeCursor:
+    """只支援 sort/limit 與非同步迭代的查詢游標"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, field, direction):
+        self.documents = sorted(self.documents, key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeCollection:
+    """以串列保存文檔，只支援 {field: {"$lt": value}} 查詢與依 _id 刪除"""
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self.indexes = []
+
+    def find(self, query, projection=None):
+        (field, condition), = query.items()
+        return FakeCursor([
+            document for document in self.documents
+            if field in document and document[field] < condition["$lt"]
+        ])
+
+    async def delete_many(self, query):
+        ids = set(query["_id"]["$in"])
+        before = len(self.documents)
+        self.documents = [document for document in self.documents if document["_id"] not in ids]
+        return type("DeleteResult", (), {"deleted_count": before - len(self.documents)})()
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+
+
+class FakeDatabase:
+    """合併發文記錄後的 Database：articles 為 posts 的檢視"""
+
+    def __init__(self, posts):
+        self.articles_collection = "posts"
+        self.collections = {"posts": FakeCollection(posts)}
+        self.db = self.collections
+        self.article_cache = {}
+        self.posts_cache = {}
+        self.snapshot_adjustments = []
+
+    @property
+    def unified_posts(self):
+        return self.articles_collection == "posts"
+
+    def _collection(self, name):
+        # articles 為檢視，刪除或建立索引都會失敗
+        assert name != "articles", "不應直接清理 articles 檢視"
+        return self.collections[name]
+
+    def _adjust_stats_snapshot(self, collection, amount):
+        self.snapshot_adjustments.append((collection, amount))
+
+    async def rebuild_stats_snapshot(self):
+        return {}
+
+
+def make_posts(now):
+    """建立合併後的發文記錄：同時有 created_at 與 timestamp"""
+    posts = []
+    for index, age in enumerate((1, 10, 40, 90)):
+        created_at = now - timedelta(days=age)
+        posts.append({"_id": index, "post_id": f"p{index}", "created_at": created_at, "timestamp": created_at})
+    return posts
+
+
+async def check_unified_purge():
+    """合併後以文章的保留設定清理 posts，並同步移除兩個快取"""
+    now = datetime.now(pytz.UTC)
+    database = FakeDatabase(make_posts(now))
+    for post in database.collections["posts"].documents:
+        database.article_cache[post["post_id"]] = post
+        database.posts_cache[post["post_id"]] = post
+
+    manager = RetentionManager(database)
+    manager.use_ttl = False
+    manager.retention_days = {"articles": 30, "posts": 0}
+
+    results = await manager.run()
+    remaining = [post["post_id"] for post in database.collections["posts"].documents]
+    assert results == {"articles": 2}, results
+    assert remaining == ["p0", "p1"], remaining
+    assert sorted(database.article_cache) == sorted(database.posts_cache) == ["p0", "p1"]
+    assert database.snapshot_adjustments == [("posts", -2)], database.snapshot_adjustments
+
+    # Database.cleanup_old_data 覆寫的文章保留天數同樣套用到 posts
+    results = await manager.run({"articles": 5})
+    remaining = [post["post_id"] for post in database.collections["posts"].documents]
+    assert results == {"articles": 1} and remaining == ["p0"], (results, remaining)
+
+
+async def check_unified_ttl():
+    """合併後文章的 TTL 索引建立在 posts 的 created_at"""
+    database = FakeDatabase(make_posts(datetime.now(pytz.UTC)))
+    manager = RetentionManager(database)
+    manager.use_ttl = True
+    manager.retention_days = {"articles": 30, "posts": 0}
+
+    await manager.ensure_ttl_indexes()
+    assert manager._ttl_collections == {"articles"}, manager._ttl_collections
+    keys, options = database.collections["posts"].indexes[0]
+    assert keys == [("created_at", 1)] and options == {"name": "ttl_created_at", "expireAfterSeconds": 30 * 86400}
+
+
+def test_unified_retention():
+    """測試合併發文記錄後的資料保留清理"""
+    logger.info("===== 測試合併發文記錄後的資料保留清理 =====")
+    asyncio.run(check_unified_purge())
+    logger.info("分批刪除測試通過")
+    asyncio.run(check_unified_ttl())
+    logger.info("TTL 索引測試通過")
+
+
+def main():
+    """主測試函數"""
+    logger.info("開始測試資料保留清理")
+
+    try:
+        test_unified_retention()
+    except AssertionError as e:
+        logger.error(f"測試失敗！{e}")
+        sys.exit(1)
+    logger.info("測試成功！合併後的文章保留設定套用到 posts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+測試腳本 - 測試本地詞典情感分析的評分與信心值
+"""
+
+import sys
+import logging
+
+from src.sentiment import LexiconSentimentAnalyzer, NEUTRAL_SCORES
+
+# 設置日誌
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("test_sentiment")
+
+# 與 AIHandler.sentiment_dict 相同類型的詞典，包含單字情感詞
+LEXICONS = {
+    "正面": ["開心", "喜歡", "可愛", "幸福", "好棒", "美", "棒", "讚", "愛"],
+    "中性": ["覺得", "好奇", "想", "猜"],
+    "負面": ["難過", "討厭", "失望", "不開心"]
+}
+
+# 本地結果的預設最低信心值（SENTIMENT_LOCAL_CONFIDENCE）
+LOCAL_CONFIDENCE = 0.5
+
+
+def test_sentiment():
+    """測試單字情感詞、否定詞與信心值"""
+    logger.info("===== 測試本地詞典情感分析 =====")
+    analyzer = LexiconSentimentAnalyzer(LEXICONS)
+
+    # 單字情感詞出現在不相關的複合詞中不計分
+    for text in ("美國總統", "想念你", "美國的棒球比賽"):
+        scores, confidence = analyzer.analyze(text)
+        assert scores == NEUTRAL_SCORES and confidence == 0.0, (text, scores, confidence)
+    logger.info("複合詞例外測試通過")
+
+    # 只有一個情感詞時信心不足，改用 AI 分析
+    for text in ("好美", "我愛你", "今天好開心", "我不難過"):
+        scores, confidence = analyzer.analyze(text)
+        assert confidence < LOCAL_CONFIDENCE, (text, confidence)
+        assert scores["positive"] > scores["negative"], (text, scores)
+    logger.info("單一情感詞信心值測試通過")
+
+    # 單字情感詞只算一半的權重
+    single, _ = analyzer.analyze("好美")
+    double, _ = analyzer.analyze("好開心")
+    assert single["positive"] < double["positive"], (single, double)
+    logger.info("單字情感詞權重測試通過")
+
+    # 多個一致的情感詞才使用本地結果
+    scores, confidence = analyzer.analyze("今天好開心，好幸福")
+    assert confidence >= LOCAL_CONFIDENCE and scores["positive"] > 50, (scores, confidence)
+    scores, confidence = analyzer.analyze("不開心又失望")
+    assert confidence >= LOCAL_CONFIDENCE and scores["negative"] > 50, (scores, confidence)
+    logger.info("多個情感詞測試通過")
+
+    # 否定：「不喜歡」為負面，雙重否定抵銷，「特別」不是否定
+    scores, _ = analyzer.analyze("我不喜歡下雨")
+    assert scores["negative"] > scores["positive"], scores
+    scores, _ = analyzer.analyze("不是不喜歡")
+    assert scores["positive"] > scores["negative"], scores
+    scores, _ = analyzer.analyze("特別開心")
+    assert scores["positive"] > scores["negative"], scores
+    logger.info("否定詞測試通過")
+
+    # 正負面互相抵銷時信心值為 0
+    _, confidence = analyzer.analyze("喜歡又討厭")
+    assert confidence == 0.0, confidence
+    logger.info("情感衝突測試通過")
+
+
+def main():
+    """主測試函數"""
+    logger.info("開始測試本地詞典情感分析")
+
+    try:
+        test_sentiment()
+    except AssertionError as e:
+        logger.error(f"測試失敗！{e}")
+        sys.exit(1)
+    logger.info("測試成功！本地詞典情感分析運作正常")
+
+
+if __name__ == "__main__":
+    main()
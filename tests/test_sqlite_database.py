@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+測試腳本 - 測試 SQLite 資料庫後端的存取功能
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytz
+
+from src.sqlite_database import SQLiteDatabase
+from src.content_fingerprint import content_fingerprint
+
+# 設置日誌
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("test_sqlite_database")
+
+async def check_sqlite_database():
+    """檢查 SQLite 資料庫後端的讀寫、計數與說話模式功能"""
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = SimpleNamespace(SQLITE_PATH=os.path.join(temp_dir, "test.db"), PERSONA_ID="test")
+        db = SQLiteDatabase(config)
+        await db.initialize()
+
+        try:
+            now = datetime.now(pytz.timezone("Asia/Taipei"))
+
+            # 發文記錄
+            assert await db.save_post({"post_id": "p1", "content": "第一篇", "timestamp": now - timedelta(minutes=5)})
+            assert await db.save_post({"post_id": "p2", "content": "第二篇", "timestamp": now})
+            assert await db.save_post({"post_id": "p1", "content": "第一篇", "timestamp": now - timedelta(minutes=5), "status": "published"})
+            posts = await db.get_recent_posts(10)
+            assert [post["post_id"] for post in posts] == ["p2", "p1"]
+            assert (await db.get_post("p1"))["status"] == "published"
+            # 游標分頁：每頁一筆仍能依序讀完
+            assert [post["post_id"] async for post in db.iter_posts(batch_size=1, projection={"post_id": 1})] == ["p2", "p1"]
+            assert [post async for post in db.iter_posts(batch_size=1, ascending=True, projection={"post_id": 1})] == [
+                {"post_id": "p1"}, {"post_id": "p2"}
+            ]
+            logger.info("發文記錄測試通過")
+
+            # 文章與每日計數
+            await db.save_article({"post_id": "p1", "content": "第一篇", "topics": [], "created_at": now})
+            await db.save_article({"post_id": "p2", "content": "第二篇", "topics": [], "created_at": now})
+            await db.save_article({"post_id": "p2", "content": "第二篇", "topics": [], "created_at": now})
+            assert await db.get_daily_post_count() == 2
+            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            assert await db.count_articles_between(today_start, today_start + timedelta(days=1)) == 2
+            assert (await db.get_article("p1"))["content"] == "第一篇"
+            logger.info("文章與每日計數測試通過")
+
+            # 內容指紋
+            fingerprints = await db.get_recent_fingerprints(10)
+            assert len(fingerprints) == 2
+            assert await db.has_content_fingerprint(content_fingerprint("第一篇！ "))
+            assert not await db.has_content_fingerprint(content_fingerprint("第三篇"))
+            await db.save_article({"post_id": "p3", "content": "第一篇", "topics": [], "created_at": now})
+            assert await db.get_article("p3") is None
+            assert await db.get_daily_post_count() == 2
+            logger.info("內容指紋測試通過")
+
+            # 計數校正
+            await db._run(lambda: db.conn.execute("UPDATE daily_counters SET count = 5"))
+            corrections = await db.reconcile_daily_counters(1)
+            assert list(corrections.values()) == [{"stored": 5, "actual": 2}]
+            assert await db.get_daily_post_count() == 2
+
+            # 刪除最舊文章同時扣除計數
+            assert await db.delete_oldest_articles(1) == 1
+            assert await db.get_daily_post_count() == 1
+            logger.info("計數校正與刪除測試通過")
+
+            # 說話模式
+            assert await db.bulk_save_speaking_patterns({
+                "speaking_styles": {"styles": {"base": {"開場白": ["嗨"]}}},
+                "topics_keywords": {"keywords": {"科技": ["AI"]}}
+            })
+            patterns = await db.bulk_get_speaking_patterns(["speaking_styles", "topics_keywords", "sentiment_dict"])
+            assert set(patterns) == {"speaking_styles", "topics_keywords"}
+            assert patterns["speaking_styles"]["styles"]["base"]["開場白"] == ["嗨"]
+            logger.info("說話模式測試通過")
+
+            # 人設記憶與用戶歷史
+            await db.save_personality_memory("base", {"心情": "開心"})
+            assert (await db.get_personality_memory("base"))["心情"] == "開心"
+            await db.save_user_history("u1", {"conversations": ["你好"]})
+            assert (await db.get_user_history("u1"))["conversations"] == ["你好"]
+            assert (await db.get_user_history("u2")) == {"conversations": []}
+            db.memory_max_records = 3
+            await db.append_user_interactions({"u1": [{"text": "a"}, {"text": "b"}], "u3": [{"text": "c"}]})
+            await db.append_user_interaction("u1", {"text": "d"})
+            assert [entry.get("text") for entry in (await db.get_user_history("u1"))["conversations"]] == ["a", "b", "d"]
+            assert [entry["text"] for entry in (await db.get_user_history("u1", 2))["conversations"]] == ["b", "d"]
+
+            stats = await db.get_database_stats()
+            assert stats["articles_count"] == 1
+            assert stats["users_count"] == 2
+            logger.info("人設記憶與用戶歷史測試通過")
+        finally:
+            await db.close()
+            logger.info("資料庫連接已關閉")
+
+def test_sqlite_database():
+    """測試 SQLite 資料庫後端的讀寫、計數與說話模式功能"""
+    logger.info("===== 測試 SQLite 資料庫後端 =====")
+    asyncio.run(check_sqlite_database())
+
+def main():
+    """主測試函數"""
+    logger.info("開始測試 SQLite 資料庫後端")
+
+    try:
+        test_sqlite_database()
+    except AssertionError as e:
+        logger.error(f"測試失敗！{e}")
+        sys.exit(1)
+    logger.info("測試成功！SQLite 資料庫後端運作正常")
+
+if __name__ == "__main__":
+    # 運行測試
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+測試腳本 - 比對 text_processing 單次掃描清理與舊版清理方式的結果
+
+舊版 ai_handler.sanitize_text 與 AIHandler._clean_content 的實作複製於
+src/scripts/benchmark_text_processing.py，舊版 utils.sanitize_text 複製於本檔案。
+"""
+
+import re
+import sys
+import asyncio
+import logging
+
+from src.ai_handler import AIHandler, sanitize_text as ai_sanitize_text
+from src.utils import sanitize_text as utils_sanitize_text
+from src.scripts.benchmark_text_processing import (
+    EMOJIS, legacy_clean_content, legacy_sanitize_text, make_candidates
+)
+
+# 設置日誌
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("test_text_processing")
+
+# 舊版 utils.sanitize_text 的表情符號範圍，只比對單一字元
+LEGACY_EMOJI_PATTERN = r'[\U0001F300-\U0001F9FF]|[☀-⛿]|[✀-➿]'
+# 舊版 _clean_content 使用的範圍，`\U000024C2-\U0001F251` 包含 CJK 文字與全形標點
+LEGACY_CLEAN_EMOJI_RUNS = re.compile(
+    "[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF"
+    "\U0001F1E0-\U0001F1FF\U00002702-\U000027B0\U000024C2-\U0001F251]+"
+)
+
+CORPUS_SIZE = 2000
+
+
+def legacy_utils_sanitize_text(text):
+    """舊版 utils.sanitize_text（對照用）"""
+    if not text:
+        return text
+
+    emojis = re.findall(LEGACY_EMOJI_PATTERN, text)
+    if len(emojis) > 2:
+        emojis = emojis[-2:]
+    text_without_emojis = re.sub(LEGACY_EMOJI_PATTERN, '', text)
+
+    text_without_emojis = text_without_emojis.strip()
+    text_without_emojis = re.sub(r'[\s]+', ' ', text_without_emojis)
+    text_without_emojis = re.sub(r'^[。!！?？\s]+', '', text_without_emojis)
+
+    valid_endings = ['！', '。', '？', '～']
+    while text_without_emojis and text_without_emojis[-1] in ['～', '~']:
+        text_without_emojis = text_without_emojis[:-1].strip()
+
+    has_valid_ending = any(text_without_emojis.endswith(p) for p in valid_endings)
+    if not has_valid_ending:
+        if text_without_emojis[-1] in ['，', ',', '、', '；', ';']:
+            text_without_emojis = text_without_emojis[:-1] + '！'
+        else:
+            text_without_emojis = text_without_emojis + '！'
+
+    if '，' in text_without_emojis or ',' in text_without_emojis:
+        parts = re.split('[，,]', text_without_emojis)
+        if len(parts[-1].strip()) <= 5 and not any(word in parts[-1] for word in ['嗎', '呢', '吧', '啊']):
+            text_without_emojis = ''.join(parts[:-1]) + '！'
+
+    result = text_without_emojis
+    if emojis:
+        result = result + ''.join(emojis)
+    return result
+
+
+def legacy_emoji_runs(text):
+    """計算舊版 _clean_content 在合併重複標點後找到的表情符號段落數"""
+    for pattern, replacement in ((r'[!！]{2,}', '！'), (r'[?？]{2,}', '？'), (r'[.。]{2,}', '。'), (r'[~～]{2,}', '～')):
+        text = re.sub(pattern, replacement, text)
+    return len(LEGACY_CLEAN_EMOJI_RUNS.findall(text))
+
+
+def clean_content(text):
+    """以未初始化的 AIHandler 呼叫 _clean_content（只使用 config）"""
+    handler = AIHandler.__new__(AIHandler)
+    handler.config = None
+    return asyncio.run(handler._clean_content(text))
+
+
+def assert_parity(name, old_func, new_func, texts):
+    """確認新舊實作在所有輸入上的結果相同
+
+    Args:
+        name: 比對名稱
+        old_func: 舊版實作
+        new_func: 新版實作
+        texts: 輸入內容
+    """
+    diffs = [(text, old_func(text), new_func(text)) for text in texts if old_func(text) != new_func(text)]
+    assert not diffs, (name, len(diffs), diffs[:3])
+    logger.info(f"{name}：{len(texts)} 筆結果相同")
+
+
+def test_utils_sanitize_text():
+    """測試 utils.sanitize_text 的表情符號處理"""
+    logger.info("===== 測試 utils.sanitize_text =====")
+    # 表情符號皆為單一字元時與舊版相同
+    candidates = make_candidates(CORPUS_SIZE, english_ratio=0.0, seed=7)
+    assert_parity("utils.sanitize_text", legacy_utils_sanitize_text, utils_sanitize_text, candidates)
+
+    # 變體選擇符與零寬連接符屬於同一個表情符號，不會被拆開或留在文字中
+    assert utils_sanitize_text("今天好開心❤️😊") == "今天好開心！❤️😊"
+    assert utils_sanitize_text("全家出遊👨‍👩‍👧好累") == "全家出遊好累！👨‍👩‍👧"
+    assert utils_sanitize_text("讚👍🏻") == "讚！👍🏻"
+    assert utils_sanitize_text("出發🇹🇼✈️😊") == "出發！✈️😊"
+    logger.info("表情符號序列測試通過")
+
+
+def test_ai_sanitize_text():
+    """測試 ai_handler.sanitize_text 與舊版的差異"""
+    logger.info("===== 測試 ai_handler.sanitize_text =====")
+    # 不含英文單字、長度未超過上限時與舊版相同
+    candidates = [text for text in make_candidates(CORPUS_SIZE, english_ratio=0.0, seed=11) if len(text) <= 280]
+    assert_parity("ai_handler.sanitize_text", legacy_sanitize_text, ai_sanitize_text, candidates)
+    assert ai_sanitize_text("晚安～") == legacy_sanitize_text("晚安～") == "晚安～。"
+
+    # 預期的差異：英文單字整字替換，不再改寫單字內的字母，也不留下多餘空白
+    assert legacy_sanitize_text("I love this game") == " 愛  遊戲。"
+    assert ai_sanitize_text("I love this game") == "愛 遊戲。"
+    assert legacy_sanitize_text("hello world") == "你好 。"
+    assert ai_sanitize_text("hello world") == "你好。"
+    logger.info("英文單字替換差異測試通過")
+
+
+def test_clean_content():
+    """測試 AIHandler._clean_content 與舊版的差異"""
+    logger.info("===== 測試 AIHandler._clean_content =====")
+    # 舊版與新版的表情符號段落都不超過兩段時結果相同
+    candidates = [
+        text for text in make_candidates(CORPUS_SIZE, english_ratio=0.0, seed=13)
+        if len(text) <= 280
+        and legacy_emoji_runs(text) <= 2
+        and sum(text.count(emoji) for emoji in EMOJIS) <= 2
+    ]
+    assert_parity("AIHandler._clean_content", legacy_clean_content, clean_content, candidates)
+
+    # 預期的差異：舊版範圍包含 CJK 文字，超過兩段時會刪掉中間的文字
+    text = "今天好開心😊 去玩 🎮 然後吃飯 ✨ 晚安 💕"
+    assert legacy_clean_content(text) == "今天好開心😊💕！"
+    assert clean_content(text) == "今天好開心😊 去玩  然後吃飯  晚安 💕！"
+
+    # 稱呼替換與舊版相同
+    assert clean_content("哥哥們好") == legacy_clean_content("哥哥們好") == "大家好！"
+    logger.info("表情符號段落差異測試通過")
+
+
+def main():
+    """主測試函數"""
+    logger.info("開始比對文本清理結果")
+
+    try:
+        test_utils_sanitize_text()
+        test_ai_sanitize_text()
+        test_clean_content()
+    except AssertionError as e:
+        logger.error(f"測試失敗！{e}")
+        sys.exit(1)
+    logger.info("測試成功！文本清理結果與舊版一致")
+
+
+if __name__ == "__main__":
+    main()